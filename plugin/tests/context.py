@@ -64,5 +64,16 @@ class Partial(str):
         return self in other
 
 
+def text_edit(start_line, start_char, end_line, end_char, text):
+    """Return a TextEdit dict."""
+    return {
+        "range": {
+            "start": {"line": start_line, "character": start_char},
+            "end": {"line": end_line, "character": end_char},
+        },
+        "newText": text,
+    }
+
+
 import vimliq.client
 import vimliq.clientmanager
@@ -0,0 +1,45 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test vimliq/base.py."""
+# Import everything exposed in our test context to this scope
+from context import *
+
+
+def _frame(body):
+    return vimliq.base.LspBaseMsg(body).to_bytes()
+
+
+def test_frame_parser_chunks():
+    data = _frame('{"a": 1}') + _frame('{"b": 2}')
+    parser = vimliq.base.FrameParser()
+    bodies = []
+    for idx in range(len(data)):
+        bodies.extend(parser.feed(data[idx:idx + 1]))
+    assert bodies == ['{"a": 1}', '{"b": 2}']
+
+
+def test_frame_parser_many():
+    parser = vimliq.base.FrameParser()
+    assert parser.feed(_frame("1") + _frame("22") + _frame("333")[:-1]) == ["1", "22"]
+    assert parser.feed(b"3") == ["333"]
+
+
+def test_frame_parser_no_length():
+    parser = vimliq.base.FrameParser()
+    with pytest.raises(vimliq.base.ServerDead):
+        parser.feed(b"Content-Type: x\r\n\r\n")
@@ -0,0 +1,53 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test vimliq/cache.py."""
+
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.cache
+
+
+def test_document_cache():
+    cache = vimliq.cache.DocumentCache()
+    cache.put("a", 1, (0, 1, 4), "value")
+    assert cache.get("a", 1, (0, 1, 4)) == "value"
+    assert cache.get("a", 2, (0, 1, 4)) is None
+    assert cache.get("b", 1, (0, 1, 4), "default") == "default"
+
+
+def test_document_cache_invalidate():
+    cache = vimliq.cache.DocumentCache()
+    cache.put("a", 1, "x", 1)
+    cache.put("a", 1, "y", 2)
+    cache.put("b", 1, "x", 3)
+    cache.invalidate("a")
+    assert len(cache) == 1
+    assert cache.get("b", 1, "x") == 3
+
+
+def test_document_cache_lru():
+    cache = vimliq.cache.DocumentCache(max_entries=2)
+    cache.put("a", 1, "x", 1)
+    cache.put("a", 1, "y", 2)
+    cache.get("a", 1, "x")
+    cache.put("a", 1, "z", 3)
+    assert cache.get("a", 1, "y") is None
+    assert cache.get("a", 1, "x") == 1
+    cache.invalidate("a")
+    assert len(cache) == 0
@@ -18,6 +18,7 @@
 
 """Test vimliq/client.py."""
 import collections
+import json
 
 # Import everything exposed in our test context to this scope
 from context import *
@@ -35,11 +36,13 @@ def v_current_file(monkeypatch):
 
 @pytest.fixture
 def client(monkeypatch):
-    rpcmock = mock.Mock(spec=vimliq.jsonrpc.JsonRpc)
+    rpcmock = mock.MagicMock(spec=vimliq.jsonrpc.JsonRpc)
     iomock = mock.Mock(spec=vimliq.base.StdIO)
     lsp_client = vimliq.client.VimLspClient("start")
     monkeypatch.setattr(lsp_client, "rpc", rpcmock)
     monkeypatch.setattr(lsp_client, "io", iomock)
+    monkeypatch.setattr(lsp_client, "_completion_limit", 200)
+    monkeypatch.setattr(lsp_client, "_event_queue", vimliq.inbox.Inbox())
 
     return lsp_client
 
@@ -50,10 +53,12 @@ def test_shutdown(client):
 
 
 def test_update_signs(client, monkeypatch, vim_mock):
-    monkeypatch.setattr(client, "_next_sign_id", mock.Mock(return_value=9))
+    monkeypatch.setattr("vimliq.vimutils.placed_sign_ids", mock.Mock(return_value={1}))
+    client.diagnostics["fake.py"] = vimliq.diagnostics.FileDiagnostics([
+        {"range": {"start": {"line": 1, "character": 0}, "end": {"line": 1, "character": 2}},
+         "message": "m"}])
     client.update_signs()
-    # TODO: uncomment when proper diagnostics
-    # vim_mock.command.assert_called_with("sign place 9 line=2 name=LspSign file=fake.py")
+    vim_mock.command.assert_called_with("sign place 2 line=2 name=LspSign file=fake.py")
 
 
 def test_display_diagnostics_help(client, monkeypatch, vim_mock):
@@ -65,6 +70,18 @@ def test_display_diagnostics_help(client, monkeypatch, vim_mock):
     # vim_mock.command.assert_any_call(Partial("fake msg"))
 
 
+def test_display_diagnostics_help_line(client, monkeypatch):
+    warning = mock.Mock()
+    monkeypatch.setattr("vimliq.vimutils.warning", warning)
+    monkeypatch.setattr("vimliq.vimutils.cursor", mock.Mock(return_value=(1, 0)))
+    client.diagnostics["fake.py"] = vimliq.diagnostics.FileDiagnostics([
+        {"range": {"start": {"line": line, "character": 4}, "end": {"line": line, "character": 5}},
+         "message": "m{}".format(line), "source": "pyflakes", "code": 7}
+        for line in (3, 1, 0)])
+    client.display_diagnostics_help()
+    warning.assert_called_once_with("LspDiagnostic: m1 | col: 4 | pyflakes:7")
+
+
 def test_clear_signs(client):
     client.clear_signs()
 
@@ -73,10 +90,79 @@ def test_display_diagnostics(client):
     client.display_diagnostics()
 
 
+def test_display_diagnostics_byte_col(client, monkeypatch, vim_mock):
+    monkeypatch.setattr(vim_mock.current, "buffer", _Buffer([u"\u00e9 = x"]))
+    display = mock.Mock()
+    monkeypatch.setattr("vimliq.quickfix.display", display)
+    client.diagnostics["fake.py"] = vimliq.diagnostics.FileDiagnostics([
+        {"range": {"start": {"line": 0, "character": 4}, "end": {"line": 0, "character": 5}},
+         "message": "m"}])
+    client.display_diagnostics()
+    assert display.call_args[0][0][0]["col"] == 5
+
+
+def test_symbol_qf_content_byte_col(client, monkeypatch, tmpdir):
+    monkeypatch.setattr("vimliq.vimutils.loaded_buffers", mock.Mock(return_value={}))
+    other = tmpdir.join("other.py")
+    other.write_binary(u"\u00e9 = foo()\n".encode("utf-8"))
+    qf_content = client._symbol_qf_content([{
+        "name": "foo",
+        "location": {"uri": "file://" + str(other),
+                     "range": {"start": {"line": 0, "character": 4},
+                               "end": {"line": 0, "character": 7}}}}])
+    assert qf_content == [{"filename": str(other), "lnum": 1, "col": 6, "text": "foo"}]
+
+
+def test_td_did_close_forgets_positions(client, monkeypatch):
+    client.isinitialized = True
+    monkeypatch.setattr("vimliq.vimutils.bufnr", mock.Mock(return_value=4))
+    forget = mock.Mock()
+    monkeypatch.setattr(client._positions, "forget", forget)
+    client.td_did_close()
+    forget.assert_called_once_with(4)
+
+
 def test_td_did_open(client):
     client.td_did_open()
 
 
+def test_handle_initialize_opens_loaded(client, monkeypatch):
+    current = _Buffer(["a = 1"])
+    other = _Buffer(["b = 2"])
+    other.number = 2
+    text = _Buffer(["notes"])
+    text.number = 3
+    monkeypatch.setattr("vimliq.vimutils.loaded_buffers", mock.Mock(
+        return_value={"fake.py": current, "other.py": other, "notes.txt": text}))
+    monkeypatch.setattr("vimliq.vimutils.buffer_filetype",
+                        lambda buf: "text" if buf is text else "python")
+    monkeypatch.setattr("vimliq.vimutils.buffer_changedtick", mock.Mock(return_value=7))
+    monkeypatch.setattr("vimliq.vimutils.changedtick", mock.Mock(return_value=5))
+    monkeypatch.setattr("vimliq.vimutils.current_source", mock.Mock(return_value="a = 1\n"))
+    monkeypatch.setattr("vimliq.vimutils.source", lambda buf: "\n".join(buf) + "\n")
+    client.handle_initialize({})
+    opened = [call[0][1]["textDocument"] for call in client.rpc.call_async.call_args_list
+              if call[0][0] == "textDocument/didOpen"]
+    assert [doc["uri"] for doc in opened] == ["file://fake.py", "file://other.py"]
+    assert opened[1]["text"] == "b = 2\n"
+    assert opened[1]["languageId"] == "python"
+    assert client._synced_ticks["file://other.py"] == 7
+
+
+def test_clear_display(client, monkeypatch):
+    client.diagnostics["fake.py"] = vimliq.diagnostics.FileDiagnostics([])
+    clear_signs = mock.Mock()
+    match_delete = mock.Mock()
+    monkeypatch.setattr("vimliq.vimutils.clear_signs", clear_signs)
+    monkeypatch.setattr("vimliq.vimutils.match_delete", match_delete)
+    monkeypatch.setattr("vimliq.vimutils.bufnr", mock.Mock(return_value=1))
+    monkeypatch.setattr("vimliq.vimutils.buffer_windows", mock.Mock(return_value=[1000]))
+    monkeypatch.setattr("vimliq.vimutils.window_match", mock.Mock(return_value=4))
+    client.clear_display()
+    clear_signs.assert_called_once_with("fake.py")
+    match_delete.assert_called_once_with(4, 1000)
+
+
 def test_td_did_change(client):
     client.td_did_change()
 
@@ -99,3 +185,530 @@ def test_definition(client):
 
 def test_symbols(client):
     client.symbols()
+
+
+def test_symbols_cached(client, monkeypatch):
+    client.isinitialized = True
+    monkeypatch.setattr("vimliq.vimutils.changedtick", mock.Mock(return_value=1))
+    client.td_did_open()
+    client.symbols()
+    assert client.rpc.call_async.call_count == 2
+    handler = client.rpc.call_async.call_args[1]["callback"]
+    handler([], None)
+    client.process()
+    client.symbols()
+    assert client.rpc.call_async.call_count == 2
+    # Nothing changed, nothing sent
+    client.td_did_change()
+    client.symbols()
+    assert client.rpc.call_async.call_count == 2
+    monkeypatch.setattr("vimliq.vimutils.changedtick", mock.Mock(return_value=2))
+    client.td_did_change()
+    client.symbols()
+    assert client.rpc.call_async.call_count == 4
+
+
+def test_current_symbol_error(client):
+    client.isinitialized = True
+    assert client.current_symbol() == ""
+    client.current_symbol()
+    assert client.rpc.call_async.call_count == 1
+    handler = client.rpc.call_async.call_args[1]["callback"]
+    handler(None, "Internal error")
+    client.process()
+    client.current_symbol()
+    assert client.rpc.call_async.call_count == 2
+
+
+COMPLETION_ITEMS = {"items": [
+    {"label": "first", "kind": 2, "detail": "first()", "documentation": "Doc of first"},
+    {"label": "second", "kind": 6},
+]}
+
+
+def test_parse_completion(client):
+    result = json.loads(client._parse_completion(COMPLETION_ITEMS))
+    assert result[0] == {"word": "first", "kind": "f", "menu": "first()", "info": "Doc of first"}
+    assert result[1] == {"word": "second", "kind": "v"}
+
+
+def test_parse_completion_lazy_doc(client, monkeypatch):
+    client.server_capabilities = {"completionProvider": {"resolveProvider": True}}
+    result = json.loads(client._parse_completion(COMPLETION_ITEMS))
+    assert "info" not in result[0]
+    assert result[1]["user_data"] == "1"
+
+
+def test_completion_resolve(client, monkeypatch):
+    client.isinitialized = True
+    client.server_capabilities = {"completionProvider": {"resolveProvider": True}}
+    client._parse_completion(COMPLETION_ITEMS)
+    show_mock = mock.Mock()
+    monkeypatch.setattr("vimliq.vimutils.show_completion_info", show_mock)
+    monkeypatch.setattr(
+        "vimliq.vimutils.selected_completion_data", mock.Mock(return_value="1"))
+    client.completion_resolve()
+    client.rpc.call_async.assert_called_once_with(
+        "completionItem/resolve", COMPLETION_ITEMS["items"][1], callback=mock.ANY)
+    handler = client.rpc.call_async.call_args[1]["callback"]
+    handler({"label": "second", "documentation": {"kind": "plaintext", "value": "Doc"}}, None)
+    client.process()
+    show_mock.assert_called_once_with("Doc")
+    # Second time the cached documentation is used
+    client.completion_resolve()
+    assert client.rpc.call_async.call_count == 1
+    assert show_mock.call_count == 2
+
+
+def test_completion_resolve_unsupported(client, monkeypatch):
+    client.isinitialized = True
+    client.server_capabilities = {"completionProvider": {"resolveProvider": False}}
+    lazy_mock = mock.Mock()
+    monkeypatch.setattr("vimliq.vimutils.use_lazy_completion_info", lazy_mock)
+    client.td_did_open()
+    assert not lazy_mock.called
+    result = json.loads(client._parse_completion(COMPLETION_ITEMS))
+    assert result[0]["info"] == "Doc of first"
+    popup_mock = mock.Mock()
+    monkeypatch.setattr("vimliq.vimutils.show_completion_popup", popup_mock)
+    client.completion_resolve()
+    popup_mock.assert_called_once_with()
+    assert client.rpc.call_async.call_count == 1
+
+
+def test_lazy_completion_info(client, monkeypatch):
+    client.isinitialized = True
+    client.server_capabilities = {"completionProvider": {"resolveProvider": True}}
+    lazy_mock = mock.Mock()
+    monkeypatch.setattr("vimliq.vimutils.use_lazy_completion_info", lazy_mock)
+    client.td_did_open()
+    lazy_mock.assert_called_once_with()
+
+
+@pytest.fixture
+def v_insert(monkeypatch):
+    monkeypatch.setattr("vimliq.vimutils.in_insert_mode", mock.Mock(return_value=True))
+    monkeypatch.setattr("vimliq.vimutils.changedtick", mock.Mock(return_value=3))
+    monkeypatch.setattr("vimliq.vimutils.cursor", mock.Mock(return_value=(0, 6)))
+    monkeypatch.setattr("vimliq.vimutils.line_before_cursor", mock.Mock(return_value="os.pa"))
+
+
+def test_auto_complete_trigger_character(client, v_insert, monkeypatch):
+    client.isinitialized = True
+    client.server_capabilities = {"completionProvider": {"triggerCharacters": ["."]}}
+    monkeypatch.setattr("vimliq.vimutils.line_before_cursor", mock.Mock(return_value="os."))
+    client.auto_complete_typed()
+    batch = client.rpc.batch.return_value.__enter__.return_value
+    batch.call_async.assert_called_with(
+        "textDocument/completion", mock.ANY, callback=mock.ANY)
+
+
+def test_auto_complete_popup(client, v_insert, vim_mock):
+    client.isinitialized = True
+    client.auto_complete()
+    batch = client.rpc.batch.return_value.__enter__.return_value
+    handler = batch.call_async.call_args[1]["callback"]
+    handler({"items": [{"label": "path"}, {"label": "pardir"}, {"label": "sep"}]}, None)
+    client.process()
+    vim_mock.eval.assert_called_with(
+        'complete(4, [{"word":"path"},{"word":"pardir"}])')
+
+
+def test_auto_complete_batched(client, v_insert, monkeypatch):
+    client.isinitialized = True
+    monkeypatch.setattr("vimliq.vimutils.current_source", mock.Mock(return_value="os.pa"))
+    client.auto_complete()
+    batch = client.rpc.batch.return_value.__enter__.return_value
+    methods = [call[0][0] for call in batch.call_async.call_args_list]
+    assert methods == ["textDocument/didChange", "textDocument/completion"]
+    assert not client.rpc.call_async.called
+
+
+def test_auto_complete_outdated(client, v_insert, vim_mock, monkeypatch):
+    client.isinitialized = True
+    client.auto_complete()
+    monkeypatch.setattr("vimliq.vimutils.changedtick", mock.Mock(return_value=4))
+    batch = client.rpc.batch.return_value.__enter__.return_value
+    handler = batch.call_async.call_args[1]["callback"]
+    handler({"items": [{"label": "path"}]}, None)
+    vim_mock.eval.reset_mock()
+    client.process()
+    assert not vim_mock.eval.called
+
+
+def test_hover_cached(client, monkeypatch):
+    client.isinitialized = True
+    popup_mock = mock.Mock()
+    monkeypatch.setattr("vimliq.vimutils.display_popup", popup_mock)
+    monkeypatch.setattr("vimliq.vimutils.word_range", mock.Mock(return_value=(0, 4, 9)))
+    client.hover()
+    handler = client.rpc.call_async.call_args[1]["callback"]
+    handler({"contents": [{"language": "python", "value": "func(a)"}, "Docstring."]}, None)
+    client.process()
+    popup_mock.assert_called_once_with("func(a)\n\nDocstring.")
+    client.hover()
+    assert client.rpc.call_async.call_count == 1
+    assert popup_mock.call_count == 2
+
+
+DEFINITION = [{"uri": "file:///fake.py",
+               "range": {"start": {"line": 1, "character": 4},
+                         "end": {"line": 1, "character": 8}}}]
+
+
+def test_prefetch_definition(client, monkeypatch):
+    client.isinitialized = True
+    client._prefetch_max_inflight = 1
+    jump_mock = mock.Mock()
+    monkeypatch.setattr("vimliq.vimutils.jump_to", jump_mock)
+    monkeypatch.setattr("vimliq.vimutils.word_range", mock.Mock(return_value=(0, 4, 9)))
+    client.prefetch_definition()
+    # Limited to one request in flight
+    client.prefetch_definition()
+    assert client.rpc.call_async.call_count == 1
+    handler = client.rpc.call_async.call_args[1]["callback"]
+    handler(DEFINITION, None)
+    client.process()
+    assert not jump_mock.called
+    client.definition()
+    assert client.rpc.call_async.call_count == 1
+    jump_mock.assert_called_once_with("/fake.py", 1, 4)
+
+
+def test_definition_while_prefetching(client, monkeypatch):
+    client.isinitialized = True
+    client._prefetch_max_inflight = 1
+    jump_mock = mock.Mock()
+    monkeypatch.setattr("vimliq.vimutils.jump_to", jump_mock)
+    monkeypatch.setattr("vimliq.vimutils.word_range", mock.Mock(return_value=(0, 4, 9)))
+    client.prefetch_definition()
+    client.definition()
+    assert client.rpc.call_async.call_count == 1
+    handler = client.rpc.call_async.call_args[1]["callback"]
+    handler(DEFINITION, None)
+    client.process()
+    jump_mock.assert_called_once_with("/fake.py", 1, 4)
+
+
+def test_prefetch_definition_error(client, monkeypatch):
+    client.isinitialized = True
+    client._prefetch_max_inflight = 1
+    monkeypatch.setattr("vimliq.vimutils.word_range", mock.Mock(return_value=(0, 4, 9)))
+    client.prefetch_definition()
+    handler = client.rpc.call_async.call_args[1]["callback"]
+    handler(None, vimliq.jsonrpc.JsonRpcError("failed"))
+    client.process()
+    assert not client._prefetch_inflight
+
+
+def test_prefetch_definition_error_jump(client, monkeypatch):
+    client.isinitialized = True
+    client._prefetch_max_inflight = 1
+    monkeypatch.setattr("vimliq.vimutils.word_range", mock.Mock(return_value=(0, 4, 9)))
+    client.prefetch_definition()
+    handler = client.rpc.call_async.call_args[1]["callback"]
+    # Waits for the prefetch reply
+    client.definition()
+    assert client.rpc.call_async.call_count == 1
+    handler(None, vimliq.jsonrpc.JsonRpcError("failed"))
+    client.process()
+    assert client.rpc.call_async.call_count == 2
+    assert client.rpc.call_async.call_args[0][0] == "textDocument/definition"
+    assert not client._prefetch_inflight
+
+
+def test_document_highlight(client, monkeypatch):
+    client.isinitialized = True
+    monkeypatch.setattr("vimliq.vimutils.word_range", mock.Mock(return_value=(0, 4, 9)))
+    monkeypatch.setattr("vimliq.vimutils.buffer_windows", mock.Mock(return_value=[1000]))
+    match_mock = mock.Mock(return_value=[3])
+    monkeypatch.setattr("vimliq.vimutils.match_add_pos", match_mock)
+    client.document_highlight_moved()
+    # Same word, nothing new to do
+    client.document_highlight_moved()
+    client.document_highlight()
+    handler = client.rpc.call_async.call_args[1]["callback"]
+    handler([{"range": {"start": {"line": 0, "character": 4},
+                        "end": {"line": 0, "character": 9}}},
+             {"range": {"start": {"line": 5, "character": 0},
+                        "end": {"line": 5, "character": 5}}}], None)
+    client.process()
+    match_mock.assert_called_once_with("LspDocumentHighlight", [[1, 5, 5], [6, 1, 5]], 1000)
+    assert client._doc_hl_matches == {1000: [3]}
+
+
+def test_document_highlight_cancel(client, monkeypatch):
+    client.isinitialized = True
+    monkeypatch.setattr("vimliq.vimutils.word_range", mock.Mock(return_value=(0, 4, 9)))
+    client.document_highlight_moved()
+    client.document_highlight()
+    request_id = client.rpc.call_async.return_value
+    monkeypatch.setattr("vimliq.vimutils.word_range", mock.Mock(return_value=(0, 12, 14)))
+    client.document_highlight_moved()
+    client.rpc.cancel.assert_called_once_with(request_id)
+
+
+def test_document_highlight_reenter(client, monkeypatch):
+    client.isinitialized = True
+    monkeypatch.setattr("vimliq.vimutils.word_range", mock.Mock(return_value=(0, 4, 9)))
+    monkeypatch.setattr(client, "_stop_document_highlight_timer", mock.Mock())
+    client.document_highlight_moved()
+    client.document_highlight()
+    request_id = client.rpc.call_async.return_value
+    client.document_highlight_leave()
+    client.rpc.cancel.assert_called_once_with(request_id)
+    assert client._stop_document_highlight_timer.called
+    # Back on the same word it is highlighted again
+    client.document_highlight_moved()
+    assert client._doc_hl_word == ("file://fake.py", (0, 4, 9))
+
+
+def test_document_highlight_reply_after_leave(client, monkeypatch, v_current_file):
+    client.isinitialized = True
+    monkeypatch.setattr("vimliq.vimutils.word_range", mock.Mock(return_value=(0, 4, 9)))
+    match_mock = mock.Mock(return_value=[3])
+    monkeypatch.setattr("vimliq.vimutils.match_add_pos", match_mock)
+    client.document_highlight_moved()
+    client.document_highlight()
+    handler = client.rpc.call_async.call_args[1]["callback"]
+    client.document_highlight_leave()
+    v_current_file.return_value = "other.py"
+    handler([{"range": {"start": {"line": 0, "character": 4},
+                        "end": {"line": 0, "character": 9}}}], None)
+    client.process()
+    assert not match_mock.called
+
+
+def test_td_did_change_unchanged(client, monkeypatch):
+    client.isinitialized = True
+    monkeypatch.setattr("vimliq.vimutils.changedtick", mock.Mock(return_value=5))
+    client.td_did_open()
+    client.td_did_change()
+    assert client.rpc.call_async.call_count == 1
+    monkeypatch.setattr("vimliq.vimutils.changedtick", mock.Mock(return_value=6))
+    client.td_did_change()
+    client.td_did_change()
+    assert client.rpc.call_async.call_count == 2
+
+
+class _Buffer(list):
+    number = 1
+
+
+def _formatted(client, monkeypatch, vim_mock, lines, edits):
+    """Request formatting of lines and handle a reply with edits."""
+    client.isinitialized = True
+    monkeypatch.setattr("vimliq.vimutils.changedtick", mock.Mock(return_value=3))
+    monkeypatch.setattr(vim_mock.current, "buffer", _Buffer(lines))
+    client.td_did_open()
+    client.formatting()
+    batch = client.rpc.batch.return_value.__enter__.return_value
+    assert batch.call_async.call_args[0][0] == "textDocument/formatting"
+    handler = batch.call_async.call_args[1]["callback"]
+    handler(edits, None)
+    client.process()
+
+
+FORMAT_EDITS = [{
+    "range": {"start": {"line": 0, "character": 0}, "end": {"line": 3, "character": 0}},
+    "newText": "a = 1\nb = 2\nc = 3\n"}]
+
+
+def test_formatting_incremental(client, monkeypatch, vim_mock):
+    client.server_capabilities = {"textDocumentSync": {"change": 2}}
+    version = client.td_version
+    _formatted(client, monkeypatch, vim_mock, ["a = 1", "b=2", "c = 3"], FORMAT_EDITS)
+    assert vim_mock.current.buffer == ["a = 1", "b = 2", "c = 3"]
+    method, params = client.rpc.call_async.call_args[0]
+    assert method == "textDocument/didChange"
+    assert params["textDocument"]["version"] == version + 2
+    assert params["contentChanges"] == [{
+        "range": {"start": {"line": 1, "character": 0}, "end": {"line": 2, "character": 0}},
+        "text": "b = 2\n"}]
+
+
+def test_formatting_full_sync(client, monkeypatch, vim_mock):
+    monkeypatch.setattr("vimliq.vimutils.source", mock.Mock(return_value="text"))
+    client.server_capabilities = {"textDocumentSync": 1}
+    _formatted(client, monkeypatch, vim_mock, ["a = 1", "b=2", "c = 3"], FORMAT_EDITS)
+    params = client.rpc.call_async.call_args[0][1]
+    assert params["contentChanges"] == [{"text": "text"}]
+
+
+def test_formatting_unchanged(client, monkeypatch, vim_mock):
+    _formatted(client, monkeypatch, vim_mock, ["a = 1", "b = 2", "c = 3"], FORMAT_EDITS)
+    # Only the didOpen
+    assert client.rpc.call_async.call_count == 1
+
+
+def test_rename(client, monkeypatch, vim_mock, tmpdir):
+    client.isinitialized = True
+    client.server_capabilities = {"textDocumentSync": 2}
+    monkeypatch.setattr("vimliq.vimutils.changedtick", mock.Mock(return_value=3))
+    buf = _Buffer(["foo = 1", "print(foo)"])
+    buf.name = "fake.py"
+    monkeypatch.setattr(vim_mock.current, "buffer", buf)
+    monkeypatch.setattr("vimliq.vimutils.loaded_buffers", mock.Mock(return_value={"fake.py": buf}))
+    display = mock.Mock()
+    monkeypatch.setattr("vimliq.quickfix.display", display)
+    other = tmpdir.join("other.py")
+    other.write("from fake import foo\n")
+    client.td_did_open()
+
+    client.rename("bar")
+    batch = client.rpc.batch.return_value.__enter__.return_value
+    assert batch.call_async.call_args[0][1]["newName"] == "bar"
+    handler = batch.call_async.call_args[1]["callback"]
+    handler({"changes": {
+        "file://fake.py": [text_edit(0, 0, 0, 3, "bar"), text_edit(1, 6, 1, 9, "bar")],
+        "file://" + str(other): [text_edit(0, 17, 0, 20, "bar")],
+    }}, None)
+    client.process()
+
+    assert buf == ["bar = 1", "print(bar)"]
+    assert other.read() == "from fake import bar\n"
+    # Both changes in one write
+    sent = [call[0] for call in batch.call_async.call_args_list[1:]]
+    assert [method for method, _ in sent] == [
+        "textDocument/didChange", "workspace/didChangeWatchedFiles"]
+    assert sent[0][1]["contentChanges"] == [{
+        "range": {"start": {"line": 0, "character": 0}, "end": {"line": 2, "character": 0}},
+        "text": "bar = 1\nprint(bar)\n"}]
+    assert sent[1][1] == {"changes": [{"uri": "file://" + str(other), "type": 2}]}
+    qf_content, title = display.call_args[0]
+    assert [(item["filename"], item["lnum"]) for item in qf_content] == [
+        ("fake.py", 1), ("fake.py", 2), (str(other), 1)]
+    assert title == "LspRename: 3 changes in 2 files"
+
+
+def test_rename_outdated(client, monkeypatch):
+    client._td_versions["file://fake.py"] = 4
+    warning = mock.Mock()
+    monkeypatch.setattr("vimliq.vimutils.warning", warning)
+    client.handle_rename({"documentChanges": [
+        {"textDocument": {"uri": "file://fake.py", "version": 3}, "edits": []}]})
+    warning.assert_called_once_with("Rename not applied, fake.py has changed")
+
+
+@pytest.fixture
+def signature_client(client, monkeypatch, vim_mock, v_insert):
+    client.isinitialized = True
+    client.server_capabilities = {"signatureHelpProvider": {"triggerCharacters": ["("]}}
+    monkeypatch.setattr(vim_mock.current, "buffer", _Buffer(["x = 1"]))
+    monkeypatch.setattr("vimliq.vimutils.cursor", mock.Mock(return_value=(1, 0)))
+    monkeypatch.setattr("vimliq.vimutils.echo_highlighted", mock.Mock())
+    monkeypatch.setattr(client, "_lsp_cursor", mock.Mock(return_value=(1, 0)))
+    monkeypatch.setattr(client, "_sig_delay", 50)
+    return client
+
+
+def _typed(monkeypatch, before):
+    monkeypatch.setattr("vimliq.vimutils.line_before_cursor", mock.Mock(return_value=before))
+
+
+def test_signature_help(signature_client, monkeypatch, vim_mock):
+    client = signature_client
+    _typed(monkeypatch, "f(")
+    vim_mock.eval.reset_mock()
+    client.signature_help_moved()
+    vim_mock.eval.assert_called_with("timer_start(50, 'LspSignatureHelpTimer')")
+    # No trigger character, no request
+    _typed(monkeypatch, "f(a")
+    client.signature_help_moved()
+    assert vim_mock.eval.call_count == 1
+
+    client.signature_help()
+    batch = client.rpc.batch.return_value.__enter__.return_value
+    assert batch.call_async.call_args[0][0] == "textDocument/signatureHelp"
+    handler = batch.call_async.call_args[1]["callback"]
+    handler({"signatures": [{"label": "f(a, b)",
+                             "parameters": [{"label": "a"}, {"label": "b"}]}]}, None)
+    client.process()
+    vimliq.vimutils.echo_highlighted.assert_called_with(
+        [("f(", None), ("a", "LspSignatureActiveParameter"), (", b)", None)])
+
+    # Next argument of the same call, shown without asking the server
+    _typed(monkeypatch, "f(a, ")
+    client.signature_help_moved()
+    vimliq.vimutils.echo_highlighted.assert_called_with(
+        [("f(a, ", None), ("b", "LspSignatureActiveParameter"), (")", None)])
+    methods = [call[0][0] for call in batch.call_async.call_args_list]
+    assert methods.count("textDocument/signatureHelp") == 1
+
+    # Out of the call
+    _typed(monkeypatch, "f(a, b)")
+    client.signature_help_moved()
+    vimliq.vimutils.echo_highlighted.assert_called_with([])
+
+
+def test_signature_help_keeps_message_line(signature_client, monkeypatch):
+    warning = mock.Mock()
+    monkeypatch.setattr("vimliq.vimutils.warning", warning)
+    signature_client.diagnostics["fake.py"] = vimliq.diagnostics.FileDiagnostics()
+    signature_client._sig_shown = True
+    signature_client.display_diagnostics_help()
+    assert not warning.called
+    signature_client._sig_shown = False
+    signature_client.display_diagnostics_help()
+    warning.assert_called_once_with("")
+
+
+def test_signature_help_cancel(signature_client, monkeypatch):
+    client = signature_client
+    _typed(monkeypatch, "f(")
+    client.signature_help()
+    batch = client.rpc.batch.return_value.__enter__.return_value
+    client.signature_help()
+    client.rpc.cancel.assert_called_once_with(batch.call_async.return_value)
+
+
+def test_signature_help_unsupported(signature_client, monkeypatch, vim_mock):
+    signature_client.server_capabilities = {}
+    _typed(monkeypatch, "f(")
+    vim_mock.eval.reset_mock()
+    signature_client.signature_help_moved()
+    assert not vim_mock.eval.called
+
+
+def test_handle_configuration():
+    result = vimliq.client.VimLspClient.handle_configuration({"items": [{}, {}]})
+    assert result == [None, None]
+
+
+def test_diagnostics_coalesced(client, monkeypatch):
+    handle_mock = mock.Mock()
+    monkeypatch.setattr(client, "handle_diagnostics", handle_mock)
+    handler = client._handler(client.handle_diagnostics,
+                              coalesce=vimliq.client._diagnostics_key)
+    for idx in range(3):
+        handler({"uri": "file:///a.py", "diagnostics": [idx]}, None)
+    handler({"uri": "file:///b.py", "diagnostics": []}, None)
+    client.process()
+    assert handle_mock.call_args_list == [
+        mock.call({"uri": "file:///a.py", "diagnostics": [2]}),
+        mock.call({"uri": "file:///b.py", "diagnostics": []}),
+    ]
+
+
+def test_persistent_cache(client, monkeypatch, tmpdir):
+    client.isinitialized = True
+    monkeypatch.setattr(client, "_persistent", vimliq.persistent.PersistentCache(
+        str(tmpdir.join("cache.sqlite"))))
+    monkeypatch.setattr("vimliq.vimutils.current_source_bytes", mock.Mock(return_value=b"x"))
+    monkeypatch.setattr("vimliq.vimutils.changedtick", mock.Mock(return_value=3))
+    update = mock.Mock()
+    monkeypatch.setattr(client._renderer, "update", update)
+    diag = {"range": {"start": {"line": 1, "character": 0}, "end": {"line": 1, "character": 2}},
+            "message": "m"}
+    client.td_did_open()
+    client.handle_diagnostics({"uri": "file://fake.py", "diagnostics": [diag]})
+    client.handle_symbols([], "file://fake.py", client._td_versions["file://fake.py"], False)
+
+    # Reopened with the same content
+    client.td_did_close()
+    client.diagnostics.clear()
+    client.td_did_open()
+    assert client.diagnostics["fake.py"].stale
+    assert client.diagnostics["fake.py"][0].message == "m"
+    assert client._doc_symbols.get("file://fake.py", client.td_version).stale
+    update.assert_called_with("fake.py")
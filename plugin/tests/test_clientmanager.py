@@ -48,7 +48,29 @@ def test_ClientManager_add_client(
     client_manager.add_client()
     assert client_manager.clients["python"]
     mock_.assert_called_once_with(expected)
-    mock_().start_server.assert_called_once_with()
+    mock_().start_server.assert_called_once_with(None)
+
+
+def test_ClientManager_add_client_standby(v_filetype, monkeypatch, vim_mock):
+    mock_ = mock.MagicMock()
+    monkeypatch.setattr("vimliq.client.VimLspClient", mock_)
+    pool = mock.Mock(enabled=True)
+    manager = vimliq.clientmanager.ClientManager(PYTHON_CLIENT, pool)
+    pool.fill.assert_called_once_with(["start"])
+    manager.add_client()
+    pool.take.assert_called_once_with(["start"])
+    mock_().start_server.assert_called_once_with(pool.take())
+
+
+def test_ClientManager_restart_client(client_manager, v_filetype, monkeypatch, vim_mock):
+    mock_ = mock.MagicMock()
+    monkeypatch.setattr("vimliq.client.VimLspClient", mock_)
+    old_client = mock.Mock()
+    client_manager.clients = {"python": old_client}
+    client_manager.restart_client()
+    old_client.clear_display.assert_called_once_with()
+    old_client.shutdown.assert_called_once_with()
+    assert client_manager.clients["python"] is mock_()
 
 
 def test_ClientManager_shutdown_all(client_manager):
@@ -59,6 +81,15 @@ def test_ClientManager_shutdown_all(client_manager):
     for client in [client_1, client_2]:
         client.shutdown.assert_called_once_with()
 
+
+def test_ClientManager_process(client_manager, v_filetype):
+    client_manager._standby = mock.Mock()
+    l_client = mock.Mock()
+    client_manager.clients = {"python": l_client}
+    client_manager.process()
+    client_manager._standby.check.assert_called_once_with()
+    l_client.process.assert_called_once_with()
+
 @pytest.mark.skipif(sys.version_info < (3,0), reason="Mock fails in python 2.7")
 def test_ClientManager_getattr(client_manager, v_filetype):
     client = mock.Mock()
@@ -0,0 +1,57 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test vimliq/completion.py."""
+
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.completion
+
+
+def labels(items):
+    return [item["label"] for item in items]
+
+
+def test_rank_filters_and_orders():
+    items = [
+        {"label": "isinstance"},
+        {"label": "is_instance_of"},
+        {"label": "print"},
+        {"label": "IsInstance"},
+    ]
+    result = vimliq.completion.rank(items, "isin")
+    assert labels(result) == ["isinstance", "IsInstance", "is_instance_of"]
+
+
+def test_rank_limit():
+    items = [{"label": "item{}".format(idx)} for idx in range(1000)]
+    assert len(vimliq.completion.rank(items, "item", limit=10)) == 10
+
+
+def test_rank_sort_text_and_preselect():
+    items = [
+        {"label": "b", "sortText": "2"},
+        {"label": "a", "sortText": "1"},
+        {"label": "c", "sortText": "3", "preselect": True},
+    ]
+    assert labels(vimliq.completion.rank(items, "")) == ["c", "a", "b"]
+
+
+def test_rank_filter_text():
+    items = [{"label": "foo(bar)", "filterText": "xyz"}, {"label": "foo"}]
+    assert labels(vimliq.completion.rank(items, "xy")) == ["foo(bar)"]
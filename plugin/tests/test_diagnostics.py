@@ -0,0 +1,65 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test vimliq/diagnostics.py."""
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.diagnostics
+
+
+def _diag(line, char, message="m", **kwargs):
+    diag = {"range": {"start": {"line": line, "character": char},
+                      "end": {"line": line, "character": char + 1}}, "message": message}
+    diag.update(kwargs)
+    return diag
+
+
+@pytest.fixture
+def diagnostics():
+    return vimliq.diagnostics.FileDiagnostics([
+        _diag(9, 0), _diag(2, 5, severity=1), _diag(2, 1, code="E1"), _diag(5, 0)])
+
+
+def test_sorted(diagnostics):
+    assert [(diag.line, diag.char) for diag in diagnostics] == [(2, 1), (2, 5), (5, 0), (9, 0)]
+    assert diagnostics[0].code == "E1"
+    assert diagnostics[1].severity == 1
+    assert diagnostics[1].end_char == 6
+
+
+def test_on_line(diagnostics):
+    assert [diag.char for diag in diagnostics.on_line(2)] == [1, 5]
+    assert diagnostics.on_line(3) == []
+
+
+def test_in_range(diagnostics):
+    assert [diag.line for diag in diagnostics.in_range(3, 9)] == [5, 9]
+
+
+def test_lines(diagnostics):
+    assert diagnostics.lines() == [2, 5, 9]
+    assert vimliq.diagnostics.EMPTY.lines() == []
+
+
+def test_messages_interned():
+    message = "".join(["W391 blank line", " at end of file"])
+    diagnostics = vimliq.diagnostics.FileDiagnostics([_diag(0, 0, message),
+                                                      _diag(1, 0, message[:])])
+    other = vimliq.diagnostics.FileDiagnostics([_diag(0, 0, "".join(["W391 blank line",
+                                                                       " at end of file"]))])
+    assert diagnostics[0].message is other[0].message
@@ -0,0 +1,62 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test vimliq/fuzzy.py."""
+
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.fuzzy
+
+
+@pytest.mark.parametrize("pattern,candidate", [
+    ("fb", "foo_bar"),
+    ("FB", "fooBar"),
+    ("ab", "xaxb_a"),
+    ("", "anything"),
+])
+def test_score_match(pattern, candidate):
+    assert vimliq.fuzzy.score(pattern, candidate) is not None
+
+
+@pytest.mark.parametrize("pattern,candidate", [
+    ("bf", "foo_bar"),
+    ("fooo", "foo"),
+    ("z", "foo"),
+])
+def test_score_no_match(pattern, candidate):
+    assert vimliq.fuzzy.score(pattern, candidate) is None
+
+
+def test_score_prefers_boundaries():
+    score = vimliq.fuzzy.score
+    assert score("gv", "get_value") > score("gv", "grove")
+    assert score("gv", "getValue") > score("gv", "grove")
+    assert score("get", "get_value") > score("get", "forget")
+
+
+def test_rank():
+    items = ["grove", "get_value", "unrelated", "getValue", "forget_v"]
+    result = vimliq.fuzzy.rank("gv", items, key=lambda item: item, limit=3)
+    assert result == ["get_value", "getValue", "grove"]
+
+
+def test_rank_bonus():
+    items = ["get_value", "getValue"]
+    result = vimliq.fuzzy.rank(
+        "gv", items, key=lambda item: item, limit=2, bonus=lambda item: len(item))
+    assert result[0] == "get_value"
@@ -0,0 +1,63 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test vimliq/inbox.py."""
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.inbox
+
+
+def test_order():
+    inbox = vimliq.inbox.Inbox()
+    for idx in range(3):
+        inbox.put(idx)
+    assert inbox.get_all() == [0, 1, 2]
+    assert inbox.empty()
+
+
+def test_coalesce_keeps_place():
+    inbox = vimliq.inbox.Inbox()
+    inbox.put("a1", key="a")
+    inbox.put("x")
+    inbox.put("a2", key="a")
+    inbox.put("b1", key="b")
+    assert inbox.get_all() == ["a2", "x", "b1"]
+    assert inbox.coalesced == 1
+    inbox.put("a3", key="a")
+    assert inbox.get_all() == ["a3"]
+
+
+def test_bounded():
+    inbox = vimliq.inbox.Inbox(max_size=2)
+    inbox.put("x")
+    inbox.put("a1", key="a")
+    inbox.put("y")
+    assert inbox.dropped == 1
+    # The dropped keyed event is not replaced
+    inbox.put("a2", key="a")
+    assert inbox.get_all() == ["x", "y"]
+    assert inbox.dropped == 2
+
+
+def test_bounded_keeps_replies():
+    inbox = vimliq.inbox.Inbox(max_size=2)
+    for idx in range(3):
+        inbox.put(idx)
+    # Nothing that can be dropped, go over the bound
+    assert inbox.get_all() == [0, 1, 2]
+    assert inbox.dropped == 0
@@ -0,0 +1,133 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test vimliq/ioloop.py."""
+import os
+import threading
+
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.ioloop
+
+pytestmark = pytest.mark.skipif(not vimliq.ioloop.available(), reason="selectors missing")
+
+
+class FakeServer(object):
+    """Pipes standing in for a server process."""
+
+    def __init__(self):
+        self.stdin_r, self.stdin_w = os.pipe()
+        self.stdout_r, self.stdout_w = os.pipe()
+        self.messages = []
+        self.event = threading.Event()
+        self.closed = threading.Event()
+
+    def connect(self, loop):
+        conn = loop.connection(self.stdout_r, self.stdin_w)
+        conn.start(self.on_message, lambda reason: self.closed.set())
+        return conn
+
+    def on_message(self, body):
+        self.messages.append(body)
+        self.event.set()
+
+    def reply(self, data):
+        os.write(self.stdout_w, data)
+
+    def read_sent(self, size):
+        data = b""
+        while len(data) < size:
+            data += os.read(self.stdin_r, size - len(data))
+        return data
+
+
+@pytest.fixture
+def loop():
+    return vimliq.ioloop.IOLoop()
+
+
+def test_receive(loop):
+    server = FakeServer()
+    server.connect(loop)
+    raw = vimliq.base.LspBaseMsg('{"id": 1}').to_bytes()
+    server.reply(raw[:10])
+    server.reply(raw[10:])
+    assert server.event.wait(5)
+    assert server.messages == ['{"id": 1}']
+
+
+def test_send(loop):
+    server = FakeServer()
+    conn = server.connect(loop)
+    conn.send_many(["a", "b"])
+    expected = vimliq.base.LspBaseMsg("a").to_bytes() + vimliq.base.LspBaseMsg("b").to_bytes()
+    assert server.read_sent(len(expected)) == expected
+
+
+def test_send_does_not_block(loop):
+    server = FakeServer()
+    conn = server.connect(loop)
+    body = "x" * (1024 * 1024)
+    # Much more than a pipe holds, the rest is written by the loop
+    conn.send(body)
+    expected = vimliq.base.LspBaseMsg(body).to_bytes()
+    assert server.read_sent(len(expected)) == expected
+
+
+def test_many_connections(loop):
+    servers = [FakeServer() for _ in range(4)]
+    for server in servers:
+        server.connect(loop)
+    for idx, server in enumerate(servers):
+        server.reply(vimliq.base.LspBaseMsg(str(idx)).to_bytes())
+    for idx, server in enumerate(servers):
+        assert server.event.wait(5)
+        assert server.messages == [str(idx)]
+
+
+def test_eof_closes(loop):
+    server = FakeServer()
+    conn = server.connect(loop)
+    os.close(server.stdout_w)
+    assert server.closed.wait(5)
+    assert conn.closed
+    with pytest.raises(vimliq.base.ServerDead):
+        conn.send("a")
+
+
+def test_jsonrpc_over_loop(loop):
+    server = FakeServer()
+    conn = loop.connection(server.stdout_r, server.stdin_w)
+    rpc = vimliq.jsonrpc.JsonRpc(conn)
+    done = threading.Event()
+    results = []
+
+    def callback(result, exception):
+        results.append(result)
+        done.set()
+
+    id_ = rpc.call_async("a", {}, callback=callback)
+    server.reply(vimliq.base.LspBaseMsg(
+        '{"jsonrpc": "2.0", "id": %s, "result": 5}' % id_).to_bytes())
+    assert done.wait(5)
+    assert results == [5]
+
+
+def test_not_available(monkeypatch):
+    monkeypatch.delattr("os.set_blocking")
+    assert not vimliq.ioloop.available()
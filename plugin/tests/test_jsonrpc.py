@@ -0,0 +1,175 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test vimliq/jsonrpc.py."""
+import json
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+# Import everything exposed in our test context to this scope
+from context import *
+
+
+class FakeTransport(object):
+    """Transport replying from a queue, raising ends the read thread."""
+
+    def __init__(self):
+        self.incoming = queue.Queue()
+        # One list of messages per write
+        self.writes = []
+        self._cond = threading.Condition()
+
+    @property
+    def sent(self):
+        return [msg for write in self.writes for msg in write]
+
+    def send_many(self, msgs):
+        with self._cond:
+            self.writes.append([json.loads(msg) for msg in msgs])
+            self._cond.notify()
+
+    def wait_sent(self, count):
+        with self._cond:
+            while len(self.sent) < count:
+                assert self._cond.wait(5)
+        return self.sent
+
+    def recv(self):
+        msg = self.incoming.get(timeout=5)
+        if isinstance(msg, Exception):
+            raise msg
+        return json.dumps(msg)
+
+
+@pytest.fixture
+def transport():
+    return FakeTransport()
+
+
+def _wait_for_reader(rpc, transport):
+    transport.incoming.put(EOFError())
+    rpc._read_thread.join(5)
+
+
+def test_receive_batch(transport):
+    rpc = vimliq.jsonrpc.JsonRpc(transport)
+    done = threading.Event()
+    results = []
+
+    def callback(result, exception):
+        results.append(result)
+        if len(results) == 2:
+            done.set()
+
+    id1 = rpc.call_async("a", {}, callback=callback)
+    id2 = rpc.call_async("b", {}, callback=callback)
+    notification = mock.Mock()
+    rpc.register_notification_handler("n", notification)
+    transport.incoming.put([
+        {"jsonrpc": "2.0", "id": id2, "result": 2},
+        {"jsonrpc": "2.0", "method": "n", "params": {"x": 1}},
+        "invalid",
+        {"jsonrpc": "2.0", "id": id1, "result": 1},
+    ])
+    assert done.wait(5)
+    _wait_for_reader(rpc, transport)
+    assert results == [2, 1]
+    notification.assert_called_once_with({"x": 1}, None)
+
+
+def test_call_fast_reply(transport, monkeypatch):
+    rpc = vimliq.jsonrpc.JsonRpc(transport)
+    send = rpc._send
+
+    def reply_at_once(method, params, id_=None):
+        # The reply is dispatched before _send returns
+        send(method, params, id_)
+        rpc._dispatch({"jsonrpc": "2.0", "id": id_, "result": 3})
+
+    monkeypatch.setattr(rpc, "_send", reply_at_once)
+    assert rpc.call("a", {}) == 3
+    assert rpc._sync_id is None
+    _wait_for_reader(rpc, transport)
+
+
+def test_send_batch(transport):
+    rpc = vimliq.jsonrpc.JsonRpc(transport)
+    params = {"textDocument": {"uri": "file:///a.py"}}
+    with rpc.batch() as batch:
+        batch.call_async("didChange", params, notify=True)
+        id_ = batch.call_async("completion", params, callback=mock.Mock())
+    transport.wait_sent(2)
+    assert transport.writes == [[
+        {"jsonrpc": "2.0", "method": "didChange", "params": params},
+        {"jsonrpc": "2.0", "method": "completion", "params": params, "id": id_},
+    ]]
+
+
+def test_send_batch_array(transport):
+    rpc = vimliq.jsonrpc.JsonRpc(transport, batch_arrays=True)
+    with rpc.batch() as batch:
+        batch.call_async("a", {}, notify=True)
+        batch.call_async("b", {}, notify=True)
+    assert transport.wait_sent(1) == [[
+        {"jsonrpc": "2.0", "method": "a", "params": {}},
+        {"jsonrpc": "2.0", "method": "b", "params": {}},
+    ]]
+
+
+def test_batch_not_sent_on_error(transport):
+    rpc = vimliq.jsonrpc.JsonRpc(transport)
+    with pytest.raises(ValueError):
+        with rpc.batch() as batch:
+            batch.call_async("a", {}, callback=mock.Mock())
+            raise ValueError()
+    _wait_for_reader(rpc, transport)
+    assert not transport.sent
+    assert not rpc._resp_map
+
+
+def test_server_request(transport):
+    rpc = vimliq.jsonrpc.JsonRpc(transport)
+    rpc.register_request_handler("workspace/configuration", lambda params: [None])
+    transport.incoming.put(
+        {"jsonrpc": "2.0", "id": 1, "method": "workspace/configuration", "params": {}})
+    assert transport.wait_sent(1) == [{"jsonrpc": "2.0", "id": 1, "result": [None]}]
+
+
+def test_server_request_not_found(transport):
+    rpc = vimliq.jsonrpc.JsonRpc(transport)
+    transport.incoming.put({"jsonrpc": "2.0", "id": 0, "method": "unknown", "params": {}})
+    transport.wait_sent(1)
+    assert transport.sent[0]["id"] == 0
+    assert transport.sent[0]["error"]["code"] == vimliq.jsonrpc.METHOD_NOT_FOUND
+
+
+def test_server_request_handler_fails(transport):
+    rpc = vimliq.jsonrpc.JsonRpc(transport)
+    rpc.register_request_handler("a", mock.Mock(side_effect=ValueError("bad")))
+    transport.incoming.put({"jsonrpc": "2.0", "id": "x", "method": "a"})
+    assert transport.wait_sent(1) == [{"jsonrpc": "2.0", "id": "x", "error": {
+        "code": vimliq.jsonrpc.INTERNAL_ERROR, "message": "bad"}}]
+
+
+def test_send_after_connection_lost(transport):
+    rpc = vimliq.jsonrpc.JsonRpc(transport)
+    _wait_for_reader(rpc, transport)
+    with pytest.raises(vimliq.jsonrpc.JsonRpcException):
+        rpc.call_async("a", {}, notify=True)
@@ -0,0 +1,95 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test vimliq/outbox.py."""
+import json
+
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.outbox
+
+
+def _change(uri, version):
+    return {"jsonrpc": "2.0", "method": "textDocument/didChange", "params": {
+        "textDocument": {"uri": uri, "version": version},
+        "contentChanges": [{"text": str(version)}]}}
+
+
+def _request(id_, uri=None):
+    params = {"textDocument": {"uri": uri}} if uri else {}
+    return {"jsonrpc": "2.0", "id": id_, "method": "textDocument/completion",
+            "params": params}
+
+
+def _take(outbox):
+    return [json.loads(body) for body in outbox.take()]
+
+
+def test_requests_first():
+    outbox = vimliq.outbox.Outbox()
+    outbox.put([_change("a", 1), _request(1), _change("b", 1), _request(2)])
+    assert _take(outbox) == [_request(1), _request(2), _change("a", 1), _change("b", 1)]
+    assert not outbox.take()
+
+
+def test_promote_same_document():
+    outbox = vimliq.outbox.Outbox()
+    outbox.put([_change("a", 1), _change("b", 1), _request(1, "b")])
+    assert _take(outbox) == [_change("b", 1), _request(1, "b"), _change("a", 1)]
+
+
+def test_promote_before_batch_array():
+    outbox = vimliq.outbox.Outbox()
+    outbox.put([_change("a", 5), _change("b", 1)])
+    outbox.put([[_change("a", 6), _request(1, "a")]])
+    bodies = _take(outbox)
+    assert bodies == [_change("a", 5), [_change("a", 6), _request(1, "a")], _change("b", 1)]
+
+
+def test_cancel_first():
+    outbox = vimliq.outbox.Outbox()
+    cancel = {"jsonrpc": "2.0", "method": "$/cancelRequest", "params": {"id": 1}}
+    outbox.put([_change("a", 1), cancel])
+    assert _take(outbox) == [cancel, _change("a", 1)]
+
+
+def test_collapse_did_change():
+    outbox = vimliq.outbox.Outbox()
+    outbox.put([_change("a", 1), _change("b", 1), _change("a", 2)])
+    assert _take(outbox) == [_change("a", 2), _change("b", 1)]
+    assert outbox.collapsed == 1
+    # Not collapsed with a change that has been taken
+    outbox.put([_change("a", 3)])
+    assert _take(outbox) == [_change("a", 3)]
+
+
+def test_no_collapse_over_other_notification():
+    outbox = vimliq.outbox.Outbox()
+    close = {"jsonrpc": "2.0", "method": "textDocument/didClose",
+             "params": {"textDocument": {"uri": "a"}}}
+    outbox.put([_change("a", 1), close, _change("a", 2)])
+    assert _take(outbox) == [_change("a", 1), close, _change("a", 2)]
+
+
+def test_take_size(monkeypatch):
+    monkeypatch.setattr("vimliq.outbox.TAKE_SIZE", 1)
+    outbox = vimliq.outbox.Outbox()
+    outbox.put([_change("a", 1), _change("b", 1)])
+    assert _take(outbox) == [_change("a", 1)]
+    outbox.put([_request(1)])
+    assert _take(outbox) == [_request(1), _change("b", 1)]
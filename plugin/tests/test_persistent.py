@@ -0,0 +1,80 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test vimliq/persistent.py."""
+import os
+
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.persistent
+
+
+@pytest.fixture
+def db_path(tmpdir):
+    return os.path.join(str(tmpdir), "cache", "cache.sqlite")
+
+
+def test_get_put(db_path):
+    cache = vimliq.persistent.PersistentCache(db_path)
+    assert cache.get("/a.py", "h1", "diagnostics") is None
+    cache.put("/a.py", "h1", "diagnostics", [{"message": "m"}])
+    assert cache.get("/a.py", "h1", "diagnostics") == [{"message": "m"}]
+    # Other content or kind
+    assert cache.get("/a.py", "h2", "diagnostics") is None
+    assert cache.get("/a.py", "h1", "symbols") is None
+
+
+def test_replaced_by_new_content(db_path):
+    cache = vimliq.persistent.PersistentCache(db_path)
+    cache.put("/a.py", "h1", "diagnostics", [1])
+    cache.put("/a.py", "h2", "diagnostics", [2])
+    assert cache.get("/a.py", "h1", "diagnostics") is None
+    assert cache.get("/a.py", "h2", "diagnostics") == [2]
+    assert len(cache) == 1
+
+
+def test_persists(db_path):
+    cache = vimliq.persistent.PersistentCache(db_path)
+    cache.put("/a.py", "h1", "symbols", [1])
+    cache.close()
+    cache = vimliq.persistent.PersistentCache(db_path)
+    assert cache.get("/a.py", "h1", "symbols") == [1]
+
+
+def test_evict_least_recently_used(db_path, monkeypatch):
+    now = [0]
+    monkeypatch.setattr("time.time", lambda: now[0])
+    cache = vimliq.persistent.PersistentCache(db_path, max_bytes=30)
+    for idx, path in enumerate(["/a", "/b", "/c"]):
+        now[0] = idx
+        cache.put(path, "h", "symbols", "x" * 8)
+    now[0] = 10
+    cache.get("/a", "h", "symbols")
+    now[0] = 11
+    cache.put("/d", "h", "symbols", "x" * 8)
+    assert cache.get("/b", "h", "symbols") is None
+    assert cache.get("/a", "h", "symbols") == "x" * 8
+    assert len(cache) == 3
+
+
+def test_failure_disables(tmpdir):
+    # A directory can not be opened as database
+    cache = vimliq.persistent.PersistentCache(str(tmpdir))
+    assert not cache.enabled
+    cache.put("/a", "h", "symbols", [1])
+    assert cache.get("/a", "h", "symbols") is None
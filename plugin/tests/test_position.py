@@ -0,0 +1,77 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test vimliq/position.py."""
+
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.position as position
+
+# "\u00e5" is 2 bytes in UTF-8 and one UTF-16 unit, the emoji is 4 bytes and two UTF-16 units
+LINE = u"x = '\u00e5\U0001F600' + y"
+
+
+@pytest.mark.parametrize("character,byte_col,encoding", [
+    (0, 0, position.UTF16),
+    (5, 5, position.UTF16),
+    (6, 7, position.UTF16),
+    (8, 11, position.UTF16),
+    (14, 17, position.UTF16),
+    (7, 11, position.UTF32),
+    (11, 11, position.UTF8),
+])
+def test_to_byte(character, byte_col, encoding):
+    assert position.to_byte(LINE, character, encoding) == byte_col
+    assert position.to_byte(LINE.encode("utf-8"), character, encoding) == byte_col
+
+
+@pytest.mark.parametrize("byte_col,character", [
+    (0, 0),
+    (5, 5),
+    (7, 6),
+    (11, 8),
+    (17, 14),
+    (20, 17),
+])
+def test_to_lsp(byte_col, character):
+    assert position.to_lsp(LINE, byte_col, position.UTF16) == character
+
+
+def test_ascii_fast_path():
+    assert position.line_table("plain ascii", position.UTF16) is None
+    assert position.line_table(b"plain ascii", position.UTF16) is None
+
+
+def test_buffer_tables_cached(vim_mock):
+    encoder = position.PositionEncoder()
+    buf = mock.MagicMock()
+    buf.number = 1
+    buf.__len__.return_value = 1
+    buf.__getitem__.return_value = LINE
+    vim_mock.eval.return_value = "5"
+    cols = encoder.buffer(buf)
+    assert cols.to_byte(0, 8) == 11
+    assert cols.to_lsp(0, 11) == 8
+    assert encoder.buffer(buf) is cols
+    assert buf.__getitem__.call_count == 1
+    vim_mock.eval.return_value = "6"
+    assert encoder.buffer(buf) is not cols
+
+
+def test_unsupported_encoding():
+    assert position.PositionEncoder("utf-7").encoding == position.UTF16
@@ -60,6 +60,8 @@ def vim_static():
     mp.setattr("vimliq.vimutils.filetype", mock.Mock(return_value=f_type))
     mp.setattr("vimliq.vimutils.current_file", mock.Mock(return_value=f_path))
     mp.setattr("vimliq.vimutils.current_source", mock.Mock(return_value=f_content))
+    yield
+    mp.undo()
 
 
 # This is the client manager used by all tests
@@ -125,9 +127,9 @@ def test_reference(LSP, vim_mock):
         try:
             LSP.process()
             print(vim_mock.eval.mock_calls)
-            vim_mock.eval.assert_called_with(Partial('"filename":"{}"'.format(f_path)))
-            vim_mock.eval.assert_called_with(Partial('"lnum":{}'.format(VAR_LINE)))
-            vim_mock.eval.assert_called_with(Partial('"col":{}'.format(VAR_COL)))
+            vim_mock.eval.assert_any_call(Partial('"filename":"{}"'.format(f_path)))
+            vim_mock.eval.assert_any_call(Partial('"lnum":{}'.format(VAR_LINE)))
+            vim_mock.eval.assert_any_call(Partial('"col":{}'.format(VAR_COL)))
             break
         except AssertionError as exc:
             exception = exc
@@ -164,8 +166,8 @@ def test_diagnostics(LSP, vim_mock):
         try:
             LSP.process()
             print(LSP.diagnostics)
-            assert LSP.diagnostics[f_path][0]["range"]["start"]["line"] == 9
-            assert LSP.diagnostics[f_path][0]["message"] == "W391 blank line at end of file"
+            assert LSP.diagnostics[f_path][0].line == 9
+            assert LSP.diagnostics[f_path][0].message == "W391 blank line at end of file"
             break
         except (KeyError, AssertionError) as exc:
             exception = exc
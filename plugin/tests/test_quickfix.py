@@ -0,0 +1,63 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test vimliq/quickfix.py."""
+
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.quickfix
+
+
+@pytest.fixture
+def v_quickfix(monkeypatch):
+    set_mock = mock.Mock()
+    monkeypatch.setattr("vimliq.vimutils.set_quickfix", set_mock)
+    monkeypatch.setattr("vimliq.vimutils.open_quickfix", mock.Mock())
+    monkeypatch.setattr("vimliq.vimutils.quickfix_id", mock.Mock(return_value=7))
+    return set_mock
+
+
+def test_small_list_set_at_once(v_quickfix):
+    stream = vimliq.quickfix.QuickfixStream(chunk_size=10, interval=1)
+    stream.start([{"lnum": i} for i in range(5)], "title")
+    v_quickfix.assert_called_once_with([{"lnum": i} for i in range(5)], title="title")
+    assert not stream.active
+
+
+def test_large_list_streamed(v_quickfix):
+    items = [{"lnum": i} for i in range(25)]
+    stream = vimliq.quickfix.QuickfixStream(chunk_size=10, interval=1)
+    stream.start(items)
+    assert stream.active
+    stream.tick()
+    stream.tick()
+    assert not stream.active
+    v_quickfix.assert_has_calls([
+        mock.call(items[:10], title=""),
+        mock.call(items[10:20], action="a", qf_id=7),
+        mock.call(items[20:], action="a", qf_id=7),
+    ])
+
+
+def test_replaced_list_cancels(v_quickfix, monkeypatch):
+    stream = vimliq.quickfix.QuickfixStream(chunk_size=10, interval=1)
+    stream.start([{"lnum": i} for i in range(25)])
+    monkeypatch.setattr("vimliq.vimutils.quickfix_id", mock.Mock(return_value=8))
+    stream.tick()
+    assert not stream.active
+    assert v_quickfix.call_count == 1
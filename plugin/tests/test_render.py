@@ -0,0 +1,88 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test vimliq/render.py."""
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.diagnostics
+import vimliq.render
+
+
+def _diags(*lines):
+    return vimliq.diagnostics.FileDiagnostics([
+        {"range": {"start": {"line": line, "character": 0},
+                   "end": {"line": line, "character": 1}}, "message": "m"}
+        for line in lines])
+
+
+@pytest.fixture
+def signs(monkeypatch):
+    placed = []
+    monkeypatch.setattr("vimliq.vimutils.bufnr", mock.Mock(return_value=3))
+    monkeypatch.setattr("vimliq.vimutils.clear_signs", mock.Mock())
+    monkeypatch.setattr("vimliq.vimutils.placed_sign_ids", mock.Mock(return_value=set()))
+    monkeypatch.setattr("vimliq.vimutils.place_sign",
+                        lambda id_, line, name, filename: placed.append(line))
+    return placed
+
+
+def test_hidden_deferred(signs, monkeypatch):
+    ranges = mock.Mock(return_value=[])
+    monkeypatch.setattr("vimliq.vimutils.visible_ranges", ranges)
+    highlight = mock.Mock()
+    renderer = vimliq.render.DiagnosticRenderer({"a.py": _diags(0)}, highlight)
+    renderer.update("a.py")
+    assert not signs and not highlight.called
+    ranges.return_value = [(1, 10)]
+    renderer.shown("a.py")
+    assert signs == [1]
+    highlight.assert_called_once_with("a.py")
+    # Only once
+    renderer.shown("a.py")
+    assert signs == [1]
+
+
+def test_visible_first(signs, monkeypatch):
+    monkeypatch.setattr("vimliq.vimutils.visible_ranges", mock.Mock(return_value=[(50, 60)]))
+    diagnostics = {"a.py": _diags(200, 0, 1, 2, 54, 54)}
+    renderer = vimliq.render.DiagnosticRenderer(diagnostics, per_tick=2)
+    renderer.update("a.py")
+    assert signs == [55]
+    renderer.tick()
+    assert signs == [55, 1, 2]
+    renderer.tick()
+    renderer.tick()
+    assert signs == [55, 1, 2, 3, 201]
+
+
+def test_new_diagnostics_replace_pending(signs, monkeypatch):
+    monkeypatch.setattr("vimliq.vimutils.visible_ranges", mock.Mock(return_value=[(1, 1)]))
+    diagnostics = {"a.py": _diags(5)}
+    renderer = vimliq.render.DiagnosticRenderer(diagnostics)
+    renderer.update("a.py")
+    diagnostics["a.py"] = _diags(7)
+    renderer.update("a.py")
+    renderer.tick()
+    assert signs == [8]
+
+
+def test_sign_ids_skip_used(signs, monkeypatch):
+    renderer = vimliq.render.DiagnosticRenderer({})
+    assert renderer._next_sign_id({1, 2}) == 3
+    renderer._sign_id = vimliq.render.MAX_SIGN_ID
+    assert renderer._next_sign_id({1}) == 2
@@ -0,0 +1,69 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test vimliq/signature.py."""
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.signature as signature
+
+
+@pytest.mark.parametrize("lines,expected", [
+    (["foo("], ((0, 3), "foo", 0)),
+    (["x = obj.method(a, b"], ((0, 14), "obj.method", 1)),
+    # Nested calls and brackets
+    (["f(a, g(b), [1, 2"], ((0, 1), "f", 2)),
+    (["f(a, g(b, "], ((0, 6), "g", 1)),
+    # Commas and brackets in strings
+    (["f('a, (b', \"c\\\", d"], ((0, 1), "f", 1)),
+    # Over several lines
+    (["result = call(", "    first,", "    sec"], ((0, 13), "call", 1)),
+    (["f()(x, "], ((0, 3), "", 1)),
+    # Not in a call
+    (["f(a)"], None),
+    (["x = (1, "], None),
+    ([""], None),
+])
+def test_find_call(lines, expected):
+    assert signature.find_call(lines) == expected
+
+
+HELP = {
+    "signatures": [
+        {"label": "f(a)", "parameters": [{"label": "a"}]},
+        {"label": "f(a, b=1, *args)",
+         "parameters": [{"label": "a"}, {"label": "b=1"}, {"label": [10, 15]}]},
+    ],
+    "activeSignature": 0,
+}
+
+
+@pytest.mark.parametrize("active,expected", [
+    (0, [("f(", None), ("a", "LspSignatureActiveParameter"), (")", None)]),
+    # The first signature has too few parameters
+    (1, [("f(a, ", None), ("b=1", "LspSignatureActiveParameter"), (", *args)", None)]),
+    (2, [("f(a, b=1, ", None), ("*args", "LspSignatureActiveParameter"), (")", None)]),
+    (3, [("f(a)", None)]),
+])
+def test_chunks(active, expected):
+    assert signature.chunks(HELP, active) == expected
+
+
+def test_chunks_empty():
+    assert signature.chunks({}, 0) == []
+    assert signature.chunks({"signatures": []}, 0) == []
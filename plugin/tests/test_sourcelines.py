@@ -0,0 +1,73 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test vimliq/sourcelines.py."""
+import time
+
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.sourcelines
+
+
+@pytest.fixture
+def source_file(tmpdir):
+    path = tmpdir.join("source.py")
+    path.write("first\n    second\r\nthird")
+    return str(path)
+
+
+def test_get_line(source_file):
+    lines = vimliq.sourcelines.SourceLines()
+    assert lines.get_line(source_file, 2) == "third"
+    assert lines.get_line(source_file, 1) == "    second"
+    assert lines.get_line(source_file, 0) == "first"
+    assert lines.get_line(source_file, 3) is None
+
+
+def test_fill_text(source_file):
+    lines = vimliq.sourcelines.SourceLines()
+    qf_content = [
+        {"filename": source_file, "lnum": 2},
+        {"filename": source_file, "lnum": 9},
+        {"filename": "/does/not/exist", "lnum": 1},
+        {"filename": source_file, "lnum": 1, "text": "keep"},
+    ]
+    lines.fill_text(qf_content)
+    assert qf_content[0]["text"] == "second"
+    assert "text" not in qf_content[1]
+    assert "text" not in qf_content[2]
+    assert qf_content[3]["text"] == "keep"
+
+
+def test_changed_file_remapped(source_file):
+    lines = vimliq.sourcelines.SourceLines()
+    assert lines.get_line(source_file, 0) == "first"
+    with open(source_file, "w") as file_:
+        file_.write("changed content\n")
+    os.utime(source_file, (time.time() + 10, time.time() + 10))
+    assert lines.get_line(source_file, 0) == "changed content"
+
+
+def test_lru_eviction(tmpdir):
+    lines = vimliq.sourcelines.SourceLines(max_files=2)
+    for name in ["a", "b", "c"]:
+        path = tmpdir.join(name)
+        path.write(name)
+        assert lines.get_line(str(path), 0) == name
+    assert len(lines._files) == 2
+    assert str(tmpdir.join("a")) not in lines._files
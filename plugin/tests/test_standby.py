@@ -0,0 +1,104 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test vimliq/standby.py."""
+import os
+
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.standby
+
+
+@pytest.fixture
+def std_io(monkeypatch):
+    mock_ = mock.Mock(side_effect=lambda cmd: mock.Mock(pid=id(cmd)))
+    monkeypatch.setattr("vimliq.base.StdIO", mock_)
+    return mock_
+
+
+def test_disabled(std_io):
+    pool = vimliq.standby.StandbyPool()
+    pool.fill(["pyls"])
+    assert pool.take(["pyls"]) is None
+    assert not std_io.called
+
+
+def test_take_refills(std_io, monkeypatch):
+    monkeypatch.setattr("vimliq.standby.rss", lambda pid: 0)
+    pool = vimliq.standby.StandbyPool(1)
+    pool.fill(["pyls"])
+    assert std_io.call_count == 1
+    first = pool._standby[("pyls",)][0]
+    first.alive.return_value = True
+    io = pool.take(["pyls"])
+    assert io is first
+    io.connect.assert_called_once_with()
+    # A replacement is started right away
+    assert std_io.call_count == 2
+    assert len(pool._standby[("pyls",)]) == 1
+
+
+def test_take_skips_dead(std_io, monkeypatch):
+    monkeypatch.setattr("vimliq.standby.rss", lambda pid: 0)
+    pool = vimliq.standby.StandbyPool(1)
+    pool.fill(["pyls"])
+    dead = pool._standby[("pyls",)][0]
+    dead.alive.return_value = False
+    # The replacement is not in the pool yet when take looks
+    assert pool.take(["pyls"]) is None
+    dead.close.assert_called_once_with()
+
+
+def test_memory_cap(std_io, monkeypatch):
+    monkeypatch.setattr("vimliq.standby.rss", lambda pid: 300 * 1024 * 1024)
+    pool = vimliq.standby.StandbyPool(2, max_mb=500)
+    pool.fill(["pyls"])
+    pool.fill(["rls"])
+    # pyls servers reach the cap, none are started for rls
+    assert std_io.call_count == 2
+    monkeypatch.setattr("vimliq.standby.rss", lambda pid: 600 * 1024 * 1024)
+    pool.check()
+    assert pool.memory() == 0
+    pool.close()
+
+
+def test_memory_cap_newest(std_io, monkeypatch):
+    monkeypatch.setattr("vimliq.standby.rss", lambda pid: 0)
+    pool = vimliq.standby.StandbyPool(2)
+    pool.fill(["rls"])
+    pool.fill(["pyls"])
+    rls = list(pool._standby[("rls",)])
+    rls[1].alive.return_value = True
+    # Refilling rls makes its replacement the newest server
+    pool.take(["rls"])
+    replacement = pool._standby[("rls",)][-1]
+    replacement.pid = -2
+    monkeypatch.setattr("vimliq.standby.rss", lambda pid: 300 * 1024 * 1024 if pid == -2 else 0)
+    monkeypatch.setattr("vimliq.standby.CHECK_INTERVAL", 0)
+    pool._max_bytes = 100 * 1024 * 1024
+    pool.check()
+    replacement.close.assert_called_once_with()
+    assert len(pool._standby[("pyls",)]) == 2
+    assert pool._standby[("rls",)] == [rls[1]]
+    pool.close()
+
+
+def test_rss():
+    assert vimliq.standby.rss(os.getpid()) > 0 or not os.path.exists("/proc")
+    assert vimliq.standby.rss(-1) == 0
@@ -0,0 +1,109 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test vimliq/symbols.py."""
+
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.symbols
+
+
+def symbol_info(name, line=0):
+    return {
+        "name": name,
+        "kind": 12,
+        "location": {
+            "uri": "file:///fake.py",
+            "range": {"start": {"line": line, "character": 0},
+                      "end": {"line": line, "character": 1}},
+        },
+    }
+
+
+def test_workspace_symbol_index():
+    index = vimliq.symbols.WorkspaceSymbolIndex()
+    assert not index.covers("ge")
+    index.update("Ge", [symbol_info("get_value"), symbol_info("getter"), symbol_info("gen")])
+    assert index.covers("ge")
+    assert index.covers("gETV")
+    assert not index.covers("g")
+    assert [sym["name"] for sym in index.search("getv", 10)] == ["get_value"]
+    index.invalidate()
+    assert not index.covers("ge")
+
+
+def document_symbol(name, start, end, children=()):
+    return {
+        "name": name,
+        "kind": 5,
+        "range": {"start": {"line": start, "character": 0},
+                  "end": {"line": end, "character": 0}},
+        "selectionRange": {"start": {"line": start, "character": 0},
+                           "end": {"line": start, "character": 1}},
+        "children": list(children),
+    }
+
+
+def test_document_symbols_hierarchical():
+    result = [
+        document_symbol("A", 0, 10, [
+            document_symbol("method", 2, 5),
+            document_symbol("other", 6, 9),
+        ]),
+        document_symbol("func", 12, 14),
+    ]
+    doc_symbols = vimliq.symbols.DocumentSymbols(1, result)
+    assert len(doc_symbols) == 4
+    assert doc_symbols.containing(0, 4) == "A"
+    assert doc_symbols.containing(3, 0) == "A.method"
+    assert doc_symbols.containing(5, 8) == "A"
+    assert doc_symbols.containing(7, 0) == "A.other"
+    assert doc_symbols.containing(11, 0) is None
+    assert doc_symbols.containing(13, 0) == "func"
+    assert [qf["lnum"] for qf in doc_symbols.qf_content("fake.py")] == [1, 3, 7, 13]
+
+
+def test_document_symbols_qf_col():
+    doc_symbols = vimliq.symbols.DocumentSymbols(1, [document_symbol("func", 2, 4)])
+    assert doc_symbols.qf_content("fake.py")[0]["col"] == 1
+    cols = mock.Mock()
+    cols.to_byte.return_value = 5
+    assert doc_symbols.qf_content("fake.py", cols)[0]["col"] == 6
+    cols.to_byte.assert_called_once_with(2, 0)
+
+
+def test_document_symbols_flat():
+    method = symbol_info("method", 3)
+    method["location"]["range"]["end"]["line"] = 5
+    method["containerName"] = "A"
+    klass = symbol_info("A", 1)
+    klass["location"]["range"]["end"]["line"] = 8
+    doc_symbols = vimliq.symbols.DocumentSymbols(1, [method, klass])
+    assert doc_symbols.containing(4, 0) == "A.method"
+    assert doc_symbols.containing(7, 0) == "A"
+
+
+def test_document_symbol_cache():
+    cache = vimliq.symbols.DocumentSymbolCache(max_documents=1)
+    cache.put("file:///a.py", 1, [symbol_info("a")])
+    assert cache.get("file:///a.py", 1) is not None
+    assert cache.get("file:///a.py", 2) is None
+    cache.put("file:///b.py", 1, [])
+    assert cache.get("file:///a.py", 1) is None
+    cache.invalidate("file:///b.py")
+    assert cache.get("file:///b.py", 1) is None
@@ -0,0 +1,81 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test vimliq/textedit.py."""
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.textedit as textedit
+
+
+@pytest.mark.parametrize("lines,edits,expected", [
+    # Whole document replaced, ending after the last newline
+    (["a", "b"], [text_edit(0, 0, 2, 0, "a\nc\nd\n")], ["a", "c", "d"]),
+    # Edits on the same line, in any order
+    (["x=1+2"],
+     [text_edit(0, 3, 0, 3, " "), text_edit(0, 1, 0, 1, " "), text_edit(0, 2, 0, 2, " ")],
+     ["x = 1 +2"]),
+    # Inserts at the same position keep their order
+    (["ab"], [text_edit(0, 1, 0, 1, "1"), text_edit(0, 1, 0, 1, "2")], ["a12b"]),
+    # Joining and splitting lines
+    (["a", "b", "c"], [text_edit(0, 1, 1, 0, " "), text_edit(2, 0, 2, 1, "c\nd")],
+     ["a b", "c", "d"]),
+    # Removing lines
+    (["a", "", "", "b"], [text_edit(1, 0, 3, 0, "\n")], ["a", "", "b"]),
+])
+def test_merge(lines, edits, expected):
+    assert textedit.merge(lines, edits, "utf-16") == expected
+
+
+@pytest.mark.parametrize("encoding,character", [
+    ("utf-8", 4), ("utf-16", 2), ("utf-32", 1),
+])
+def test_merge_encoding(encoding, character):
+    # The emoji is 4 bytes, 2 UTF-16 units and 1 code point
+    lines = [u"\U0001F600x"]
+    assert textedit.merge(lines, [text_edit(0, character, 0, character, u"y")], encoding) == [
+        u"\U0001F600yx"]
+
+
+def test_apply_touches_changed_lines():
+    old = ["line {}".format(idx) for idx in range(10000)]
+    new = list(old)
+    new[10] = "changed"
+    new[5000:5002] = ["inserted", "line 5000", "line 5001"]
+    # Old line 8999, after the insert above
+    del new[9000]
+
+    buf = mock.MagicMock()
+    buf.__getitem__.return_value = old
+    changes = textedit.apply(buf, [text_edit(0, 0, 10000, 0, "\n".join(new) + "\n")], "utf-16")
+    assert buf.__setitem__.call_count == 3
+    # Last first, so the line numbers are valid in order
+    assert [change["range"]["start"]["line"] for change in changes] == [8999, 5000, 10]
+    assert changes[-1] == {
+        "range": {"start": {"line": 10, "character": 0}, "end": {"line": 11, "character": 0}},
+        "text": "changed\n"}
+
+    lines = list(old)
+    textedit.apply(lines, [text_edit(0, 0, 10000, 0, "\n".join(new) + "\n")], "utf-16")
+    assert lines == new
+
+
+def test_apply_unchanged():
+    lines = ["a", "b"]
+    assert textedit.apply(lines, [text_edit(0, 0, 2, 0, "a\nb\n")], "utf-16") == []
+    assert textedit.apply(lines, [], "utf-16") == []
@@ -0,0 +1,64 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Test vimliq/vimutils.py."""
+
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.vimutils
+
+
+@pytest.fixture
+def buf():
+    buf = mock.MagicMock()
+    buf.number = 3
+    buf.__iter__.side_effect = lambda: iter([u"first", u"s\u00e5"])
+    return buf
+
+
+def test_current_source_cached(vim_mock, buf, monkeypatch):
+    monkeypatch.setattr(vim_mock.current, "buffer", buf)
+    vim_mock.eval.return_value = "10"
+    assert vimliq.vimutils.current_source() == u"first\ns\u00e5\n"
+    assert vimliq.vimutils.current_source_bytes() == u"first\ns\u00e5\n".encode("utf-8")
+    vimliq.vimutils.current_source()
+    assert buf.__iter__.call_count == 1
+    vim_mock.eval.return_value = "11"
+    vimliq.vimutils.current_source()
+    assert buf.__iter__.call_count == 2
+    vimliq.vimutils.forget_source(3)
+    vimliq.vimutils.current_source()
+    assert buf.__iter__.call_count == 3
+
+
+def test_visible_ranges(vim_mock, monkeypatch):
+    monkeypatch.setattr(vim_mock, "eval", mock.Mock(return_value=[
+        {"bufnr": "3", "topline": "1", "botline": "40"},
+        {"bufnr": "4", "topline": "1", "botline": "9"},
+        {"bufnr": "3", "topline": "100", "botline": "140"},
+    ]))
+    assert vimliq.vimutils.visible_ranges(3) == [(1, 40), (100, 140)]
+
+
+def test_match_add_pos_chunks(vim_mock, monkeypatch):
+    eval_mock = mock.Mock(side_effect=["4", "5"])
+    monkeypatch.setattr(vim_mock, "eval", eval_mock)
+    positions = [[line, 1, 3] for line in range(1, 11)]
+    assert vimliq.vimutils.match_add_pos("Group", positions, 1000) == [4, 5]
+    assert "[9,1,3],[10,1,3]]" in eval_mock.call_args_list[1][0][0]
+    assert "[8,1,3]]" in eval_mock.call_args_list[0][0][0]
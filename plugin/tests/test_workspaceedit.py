@@ -0,0 +1,83 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""Test vimliq/workspaceedit.py."""
+import os
+
+# Import everything exposed in our test context to this scope
+from context import *
+
+import vimliq.workspaceedit as workspaceedit
+
+
+def test_file_edits():
+    edits, versions = workspaceedit.file_edits(
+        {"changes": {"file:///a.py": [text_edit(0, 0, 0, 1, "x")]}})
+    assert list(edits) == ["file:///a.py"]
+    assert versions == {}
+
+    edits, versions = workspaceedit.file_edits({"documentChanges": [
+        {"textDocument": {"uri": "file:///a.py", "version": 3},
+         "edits": [text_edit(0, 0, 0, 1, "x")]},
+        {"kind": "create", "uri": "file:///b.py"},
+        {"textDocument": {"uri": "file:///c.py", "version": None}, "edits": []},
+    ]})
+    assert list(edits) == ["file:///a.py", "file:///c.py"]
+    assert versions == {"file:///a.py": 3, "file:///c.py": None}
+
+
+@pytest.mark.parametrize("content,edits,expected", [
+    (b"foo = 1\nprint(foo)\nbar = 2\n",
+     [text_edit(1, 6, 1, 9, "baz"), text_edit(0, 0, 0, 3, "baz")],
+     b"baz = 1\nprint(baz)\nbar = 2\n"),
+    # Line endings are kept
+    (b"foo\r\nx\r\nfoo\r\n", [text_edit(2, 0, 2, 3, "bar"), text_edit(0, 0, 0, 3, "bar")],
+     b"bar\r\nx\r\nbar\r\n"),
+    # No newline at the end
+    (b"x\nfoo", [text_edit(1, 0, 1, 3, "bar")], b"x\nbar"),
+    # Edits spanning lines and at the end of the file
+    (b"a\nb\nc\n", [text_edit(0, 1, 1, 1, " b"), text_edit(3, 0, 3, 0, "d\n")], b"a b\nc\nd\n"),
+    (b"", [text_edit(0, 0, 0, 0, "new\n")], b"new\n"),
+])
+def test_rewrite_file(tmpdir, content, edits, expected):
+    path = os.path.join(str(tmpdir), "mod.py")
+    with open(path, "wb") as file_:
+        file_.write(content)
+    os.chmod(path, 0o640)
+    workspaceedit.rewrite_file(path, edits, "utf-16")
+    with open(path, "rb") as file_:
+        assert file_.read() == expected
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    # No temporary file left
+    assert os.listdir(str(tmpdir)) == ["mod.py"]
+
+
+def test_rewrite_file_missing(tmpdir):
+    with pytest.raises((IOError, OSError)):
+        workspaceedit.rewrite_file(os.path.join(str(tmpdir), "gone.py"), [], "utf-16")
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_locations():
+    edits = [text_edit(0, 10, 0, 13, "longer"), text_edit(0, 0, 0, 3, "longer"),
+             text_edit(1, 0, 2, 0, ""), text_edit(3, 4, 3, 7, "x")]
+    result = workspaceedit.locations("file:///a.py", edits)
+    starts = [(loc["range"]["start"]["line"], loc["range"]["start"]["character"])
+              for loc in result]
+    # Same line edits shift the next, the removed line moves the last up
+    assert starts == [(0, 0), (0, 13), (1, 0), (2, 4)]
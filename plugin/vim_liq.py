@@ -23,6 +23,7 @@ import os
 import vim
 
 import vimliq.clientmanager
+import vimliq.standby
 import vimliq.vimutils as V
 
 plugin_dir = os.path.dirname(__file__)
@@ -95,7 +96,9 @@ if os.path.isfile(server_file):
             # Make relative paths absolute
             for _, client in supported_clients.items():
                 client["cmd"] = client["cmd"].replace("{{ PLUGIN_DIR }}", plugin_dir)
-            LSP = vimliq.clientmanager.ClientManager(supported_clients)
+            standby = vimliq.standby.StandbyPool(int(vim.eval("g:langIQ_standby_pool")),
+                                                 int(vim.eval("g:langIQ_standby_max_mb")))
+            LSP = vimliq.clientmanager.ClientManager(supported_clients, standby)
         except ValueError:
             log.error("Failed to load json file.")
 else:
@@ -41,7 +41,64 @@ endif
 if !exists("g:langIQ_disablehighlight")
     let g:langIQ_disablehighlight = 0
 endif
+if !exists("g:langIQ_quickfix_chunk")
+    let g:langIQ_quickfix_chunk = 1000
+endif
+if !exists("g:langIQ_quickfix_interval")
+    let g:langIQ_quickfix_interval = 20
+endif
+if !exists("g:langIQ_workspace_symbol_min_chars")
+    let g:langIQ_workspace_symbol_min_chars = 2
+endif
+if !exists("g:langIQ_completion_limit")
+    let g:langIQ_completion_limit = 200
+endif
+if !exists("g:langIQ_autocomplete")
+    let g:langIQ_autocomplete = 0
+endif
+if !exists("g:langIQ_autocomplete_delay")
+    let g:langIQ_autocomplete_delay = 200
+endif
+if !exists("g:langIQ_prefetch_definition")
+    let g:langIQ_prefetch_definition = 0
+endif
+if !exists("g:langIQ_prefetch_max_inflight")
+    let g:langIQ_prefetch_max_inflight = 1
+endif
+if !exists("g:langIQ_document_highlight")
+    let g:langIQ_document_highlight = 0
+endif
+if !exists("g:langIQ_document_highlight_delay")
+    let g:langIQ_document_highlight_delay = 100
+endif
+if !exists("g:langIQ_signature_help")
+    let g:langIQ_signature_help = 0
+endif
+if !exists("g:langIQ_signature_help_delay")
+    let g:langIQ_signature_help_delay = 50
+endif
+if !exists("g:langIQ_persistent_cache")
+    let g:langIQ_persistent_cache = 0
+endif
+if !exists("g:langIQ_cache_max_mb")
+    let g:langIQ_cache_max_mb = 50
+endif
+if !exists("g:langIQ_standby_pool")
+    let g:langIQ_standby_pool = 0
+endif
+if !exists("g:langIQ_standby_max_mb")
+    let g:langIQ_standby_max_mb = 500
+endif
+if !exists("g:langIQ_event_queue_size")
+    let g:langIQ_event_queue_size = 1000
+endif
+if !exists("g:langIQ_jsonrpc_batch")
+    let g:langIQ_jsonrpc_batch = 0
+endif
 let g:vim_lsp_logdir = expand("<sfile>:h")."/log/"
+if !exists("g:langIQ_cache_dir")
+    let g:langIQ_cache_dir = g:vim_lsp_logdir."cache/"
+endif
 let g:vim_lsp_log_to_file = 0
 let g:vim_lsp_debug = 1
 
@@ -50,6 +107,8 @@ let g:completor_python_omni_trigger = '\w{3,}$|
                                       \^\s*from\s+[\w\.]*(?:\s+import\s+(?:\w*(?:,\s*)?)*)?|
                                       \^\s*import\s+(?:[\w\.]*(?:,\s*)?)*'
 sign define LspSign text=>>
+highlight default link LspDocumentHighlight Search
+highlight default link LspSignatureActiveParameter Search
 
 " --------------------------------
 " Add our plugin to the path
@@ -93,11 +152,50 @@ function! TdReferences()
 endfunction
 
 
+function! TdHover()
+    py LSP.hover()
+endfunction
+
+
 function! TdSymbols()
     py LSP.symbols()
 endfunction
 
 
+function! LspCurrentSymbol()
+    if !LangSupport()
+        return ""
+    endif
+    return pyeval("LSP.current_symbol() or ''")
+endfunction
+
+
+function! TdWorkspaceSymbols(query)
+    if a:query ==# ""
+        py LSP.workspace_symbols()
+    else
+        py LSP.workspace_symbols(vim.eval("a:query"))
+    endif
+endfunction
+
+
+function! TdFormat(range, line1, line2)
+    if a:range == 0
+        py LSP.formatting()
+    else
+        py LSP.formatting(int(vim.eval("a:line1")), int(vim.eval("a:line2")))
+    endif
+endfunction
+
+
+function! TdRename(name)
+    let name = a:name ==# "" ? input("Rename to: ", expand("<cword>")) : a:name
+    if name !=# ""
+        py LSP.rename(vim.eval("name"))
+    endif
+endfunction
+
+
 function! TdDiagnostics()
     py LSP.display_diagnostics()
 endfunction
@@ -109,6 +207,28 @@ function! LspProcess(id)
     endif
 endfunction
 
+function! LspSignatureHelpTimer(id)
+    if LangSupport()
+        py LSP.signature_help()
+    endif
+endfunction
+
+function! LspAutoCompleteTimer(id)
+    if LangSupport()
+        py LSP.auto_complete()
+    endif
+endfunction
+
+function! LspDocumentHighlightTimer(id)
+    if LangSupport()
+        py LSP.document_highlight()
+    endif
+endfunction
+
+function! LspQuickfixTick(id)
+    py LSP.quickfix_tick()
+endfunction
+
 function! LspFileType()
     if LangSupport()
         py LSP.add_client()
@@ -118,7 +238,18 @@ function! LspFileType()
     " check again if there is support since the add_client might have failed
     if LangSupport()
 
-        setlocal completeopt=longest,menuone,preview
+        if exists('*popup_findinfo')
+            " Changed to popuphidden when the server resolves documentation lazily, see
+            " use_lazy_completion_info
+            setlocal completeopt=longest,menuone,popup
+        else
+            setlocal completeopt=longest,menuone,preview
+        endif
+        if g:langIQ_autocomplete
+            " Do not insert anything while typing, just show the menu
+            setlocal completeopt-=longest
+            setlocal completeopt+=noinsert,noselect
+        endif
         setlocal omnifunc=LspOmniFunc
 
         call RegisterCommand()
@@ -149,7 +280,26 @@ function! RegisterAutoCmd()
         au BufUnload <buffer> call LangIQ_closefile(expand("<abuf>"), expand("<afile>"))
         au BufWritePost,FileWritePost <buffer> py LSP.td_did_save()
         au BufWinEnter,WinEnter <buffer> py LSP.update_highlight()
+        au BufWinEnter <buffer> py LSP.diagnostics_shown()
         au CursorMoved,CursorMovedI <buffer> py LSP.display_diagnostics_help()
+        if g:langIQ_signature_help
+            " After display_diagnostics_help, which leaves a shown signature alone
+            au TextChangedI,CursorMovedI <buffer> py LSP.signature_help_moved()
+            au InsertLeave <buffer> py LSP.clear_signature_help()
+        endif
+        if g:langIQ_document_highlight
+            au CursorMoved <buffer> py LSP.document_highlight_moved()
+            au BufLeave <buffer> py LSP.document_highlight_leave()
+        endif
+        if g:langIQ_prefetch_definition
+            au CursorHold <buffer> py LSP.prefetch_definition()
+        endif
+        if g:langIQ_autocomplete
+            au TextChangedI <buffer> py LSP.auto_complete_typed()
+        endif
+        if exists('##CompleteChanged')
+            au CompleteChanged <buffer> py LSP.completion_resolve()
+        endif
         " close preview window if visible
         au InsertLeave <buffer> if pumvisible() == 0|pclose|endif
     augroup END
@@ -193,7 +343,12 @@ function! RegisterCommand()
     command! LspReferences call TdReferences()
     command! LspDefinition call TdDefinition()
     command! LspSymbols call TdSymbols()
+    command! LspHover call TdHover()
     command! LspDiagnostics call TdDiagnostics()
+    command! LspRestart py LSP.restart_client()
+    command! -range=% LspFormat call TdFormat(<range>, <line1>, <line2>)
+    command! -nargs=? LspRename call TdRename(<q-args>)
+    command! -nargs=? LspWorkspaceSymbols call TdWorkspaceSymbols(<q-args>)
 endfunction
 
 command! LspLog call PrintLog()
@@ -206,4 +361,5 @@ function! RegisterKeyMap()
     inoremap <silent> <buffer> <C-Space> <C-x><C-o>
     nnoremap <silent> <buffer> <leader>d :call TdDefinition()<CR>
     nnoremap <silent> <buffer> <leader>f :call TdReferences()<CR>
+    nnoremap <silent> <buffer> <leader>h :call TdHover()<CR>
 endfunction
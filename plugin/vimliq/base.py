@@ -59,6 +59,14 @@ class StdIO(object):
         self._server.kill()
         self._server.wait()
 
+    @property
+    def pid(self):
+        return self._server.pid
+
+    def alive(self):
+        """Return True if the server process is running."""
+        return self._server is not None and self._server.poll() is None
+
     def write(self, data):
         """Write data."""
         return self._writer.write(data)
@@ -75,6 +83,14 @@ class StdIO(object):
         """Flush data."""
         self._writer.flush()
 
+    def reader_fileno(self):
+        """Return the file descriptor data is read from."""
+        return self._reader.fileno()
+
+    def writer_fileno(self):
+        """Return the file descriptor data is written to."""
+        return self._writer.fileno()
+
 
 class LspBaseMsg(object):
     """Lsp message.
@@ -104,6 +120,48 @@ class LspBaseMsg(object):
         return "\r\n".join(out).encode("ascii") + self.body.encode("utf8")
 
 
+class FrameParser(object):
+    """Incremental parser of base protocol messages.
+
+    Data is fed in chunks of any size, as it is read, and the bodies of all completed messages
+    are returned. Used for non blocking reads where a read can end anywhere in a message.
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        # Content-Length of the body being read, None while reading headers
+        self._length = None
+
+    def feed(self, data):
+        """Add data and return a list with the bodies of the messages completed by it."""
+        self._buf += data
+        bodies = []
+        pos = 0
+        while True:
+            if self._length is None:
+                end = self._buf.find(b"\r\n\r\n", pos)
+                if end == -1:
+                    break
+                self._length = self._content_length(bytes(self._buf[pos:end]))
+                pos = end + 4
+            if len(self._buf) - pos < self._length:
+                break
+            bodies.append(bytes(self._buf[pos:pos + self._length]).decode("utf-8"))
+            pos += self._length
+            self._length = None
+        # Drop consumed data once per feed, not once per message
+        del self._buf[:pos]
+        return bodies
+
+    @staticmethod
+    def _content_length(headers):
+        for line in headers.decode("ascii").split("\r\n"):
+            key, _, value = line.partition(":")
+            if key.strip().lower() == "content-length":
+                return int(value)
+        raise ServerDead("Message without Content-Length. Headers: {}".format(headers))
+
+
 class LspBase(object):
     """Lsp base protocol implementation."""
     def __init__(self, io, qsize=0, msg_handler=None):
@@ -120,9 +178,15 @@ class LspBase(object):
 
         body (Bytes): Message.
         """
-        msg = LspBaseMsg(body)
+        self.send_many([body])
+
+    def send_many(self, bodies):
+        """Send several messages with one write and flush.
+
+        bodies (list): Message bodies.
+        """
         try:
-            raw = msg.to_bytes()
+            raw = b"".join(LspBaseMsg(body).to_bytes() for body in bodies)
             log.log(5, "Send: %s", raw)
             self._io.write(raw)
             self._io.flush()
@@ -0,0 +1,74 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+"""Caches for server results tied to a document version."""
+import collections
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+class DocumentCache(object):
+    """LRU cache of results for positions in a document.
+
+    Entries are keyed on uri, document version and a caller chosen key (e.g. the range of the
+    word under the cursor). All entries for a document can be dropped at once, e.g. when the
+    document changes.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self._max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        # uri -> set of keys in _entries
+        self._uris = collections.defaultdict(set)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, uri, version, key, default=None):
+        """Return the cached value, or default if not cached."""
+        full_key = (uri, version, key)
+        try:
+            value = self._entries.pop(full_key)
+        except KeyError:
+            return default
+        # Reinsert to mark as most recently used
+        self._entries[full_key] = value
+        return value
+
+    def put(self, uri, version, key, value):
+        full_key = (uri, version, key)
+        self._entries.pop(full_key, None)
+        self._entries[full_key] = value
+        self._uris[uri].add(full_key)
+        while len(self._entries) > self._max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self._discard_key(old_key)
+
+    def invalidate(self, uri):
+        """Drop all entries for uri."""
+        for full_key in self._uris.pop(uri, ()):
+            self._entries.pop(full_key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._uris.clear()
+
+    def _discard_key(self, full_key):
+        keys = self._uris.get(full_key[0])
+        if keys is not None:
+            keys.discard(full_key)
+            if not keys:
+                del self._uris[full_key[0]]
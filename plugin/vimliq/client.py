@@ -15,28 +15,41 @@
 # You should have received a copy of the GNU General Public License
 # along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
 """LSP client module."""
+import collections
 import functools
 import json
 import logging
 import os
 import re
-import time
-try:
-    import Queue as queue
-except ImportError:
-    import queue
 
 
 import vimliq.base as base
+import vimliq.cache as cache
+import vimliq.completion as completion
+import vimliq.diagnostics as diagnostics
+import vimliq.inbox as inbox
+import vimliq.ioloop as ioloop
 import vimliq.jsonrpc as jsonrpc
 import vimliq.lsp as P
+import vimliq.persistent as persistent
+import vimliq.position as position
+import vimliq.quickfix as quickfix
+import vimliq.render as render
+import vimliq.signature as signature
+import vimliq.sourcelines as sourcelines
+import vimliq.symbols as symbols
+import vimliq.textedit as textedit
 import vimliq.vimutils as V
+import vimliq.workspaceedit as workspaceedit
 
 import vim
 
 log = logging.getLogger(__name__)
 log.addHandler(logging.NullHandler())
 
+WS_SYMBOL_LIMIT = 100
+COMPLETION_DOC_CACHE_SIZE = 2000
+
 
 class VimLspError(Exception):
     """Raised on error from this module."""
@@ -59,38 +72,113 @@ class VimLspClient(object):
         self._use_signs = vim.eval("g:langIQ_disablesigns") == "0"
         self._use_highlight = vim.eval("g:langIQ_disablehighlight") == "0"
         self.td_version = 0
-        self._sign_id = 1
+        # Version of each open document, key is the uri
+        self._td_versions = {}
+        # b:changedtick of the text last sent for each open document, key is the uri
+        self._synced_ticks = {}
         self.diagnostics = {}
+        self._renderer = render.DiagnosticRenderer(
+            self.diagnostics, self.update_highlight if self._use_highlight else None,
+            self._use_signs)
         self.completions = "[]"
         self.isinitialized = False
+        self.server_capabilities = {}
+        # Completion items from the last completion, indexed by vim's "user_data"
+        self._completion_items = []
+        self._completion_docs = collections.OrderedDict()
+        self._completion_limit = int(vim.eval("g:langIQ_completion_limit"))
+        self._autocomplete_delay = int(vim.eval("g:langIQ_autocomplete_delay"))
+        self._autocomplete_timer = None
         self._proc_id = os.getpid()
         self.rpc = None
         self.io = None
-        self._event_queue = queue.Queue()
+        self._event_queue = inbox.Inbox(int(vim.eval("g:langIQ_event_queue_size")))
+        self._source_lines = sourcelines.SourceLines()
+        self._positions = position.PositionEncoder()
+        self._ws_symbols = symbols.WorkspaceSymbolIndex()
+        self._doc_symbols = symbols.DocumentSymbolCache()
+        self._doc_symbols_pending = set()
+        self._hover_cache = cache.DocumentCache()
+        self._definition_cache = cache.DocumentCache(max_entries=64)
+        # Prefetch requests in flight, value is True if the user asked to jump meanwhile
+        self._prefetch_inflight = {}
+        self._prefetch_max_inflight = int(vim.eval("g:langIQ_prefetch_max_inflight"))
+        self._doc_hl_delay = int(vim.eval("g:langIQ_document_highlight_delay"))
+        self._doc_hl_timer = None
+        self._doc_hl_request = None
+        # Word currently highlighted, or requested, as (uri, word range)
+        self._doc_hl_word = None
+        # window id -> match ids
+        self._doc_hl_matches = {}
+        self._ws_symbol_min_chars = int(vim.eval("g:langIQ_workspace_symbol_min_chars"))
+        self._sig_delay = int(vim.eval("g:langIQ_signature_help_delay"))
+        self._sig_timer = None
+        self._sig_request = None
+        # (call key, SignatureHelp) of the last reply, see _current_call
+        self._sig_help = None
+        self._sig_shown = False
+        self._persistent = None
+        if vim.eval("g:langIQ_persistent_cache") == "1":
+            self._persistent = persistent.PersistentCache(
+                os.path.join(os.path.expanduser(vim.eval("g:langIQ_cache_dir")), "cache.sqlite"),
+                int(vim.eval("g:langIQ_cache_max_mb")) * 1024 * 1024)
+        # Hash of the text last sent for each open document, only kept for the persistent cache
+        self._content_hashes = {}
 
     def shutdown(self):
         self.io.close()
+        if self._persistent is not None:
+            self._persistent.close()
 
     def process(self):
-        while not self._event_queue.empty():
-            handler, result, exception = self._event_queue.get()
+        # Events arriving meanwhile are handled on the next tick
+        for handler, on_error, result, exception in self._event_queue.get_all():
             # For now just log the error
             if exception:
                 log.warn("Server replied with an error. Error: %s", exception)
-                return
+                if on_error:
+                    on_error(exception)
+                continue
             handler(result)
+        self._renderer.tick()
+
+    def _handler(self, handler, on_error=None, coalesce=None):
+        """Return a callback queueing the reply to be handled by handler in process().
 
-    def _handler(self, handler):
-        return functools.partial(self.handle_msg, self, handler)
+        Args:
+            handler(callable): Called with the result.
+            on_error(callable): Optional, called with the exception if the server replied
+                with an error.
+            coalesce(callable): Optional, return a key for a result. Only the latest of the
+                pending results with the same key is handled.
+        """
+        return functools.partial(self.handle_msg, self, handler, on_error, coalesce)
 
-    def start_server(self):
-        """Start the LSP client and the server."""
-        self.io = base.StdIO(self._start_cmd)
-        self.io.connect()
-        transport = base.LspBase(self.io)
-        self.rpc = jsonrpc.JsonRpc(transport)
+    def start_server(self, io=None):
+        """Start the LSP client and the server.
+
+        Args:
+            io(base.StdIO): Optional, a started but not initialized server, e.g. from the
+                standby pool. If not given a new server is started.
+        """
+        if io is None:
+            io = base.StdIO(self._start_cmd)
+            io.connect()
+        self.io = io
+        if ioloop.available():
+            transport = ioloop.default_loop().connection(
+                self.io.reader_fileno(), self.io.writer_fileno())
+        else:
+            transport = base.LspBase(self.io)
+        self.rpc = jsonrpc.JsonRpc(
+            transport, batch_arrays=vim.eval("g:langIQ_jsonrpc_batch") == "1")
         self.rpc.register_notification_handler(
-            P.M_DIAGNOSTICS, self._handler(self.handle_diagnostics))
+            P.M_DIAGNOSTICS, self._handler(self.handle_diagnostics, coalesce=_diagnostics_key))
+        self.rpc.register_request_handler(P.M_WS_CONFIGURATION, self.handle_configuration)
+        # Dynamic registration and progress are not supported, just acknowledge
+        for method in (P.M_REGISTER_CAPABILITY, P.M_UNREGISTER_CAPABILITY,
+                       P.M_WORK_DONE_PROGRESS_CREATE):
+            self.rpc.register_request_handler(method, lambda params: None)
         self.initialize()
 
     # Request methods
@@ -98,14 +186,54 @@ class VimLspClient(object):
         params = {
             P.K_PROCESS_ID: self._proc_id,
             P.K_ROOT_URI: "file://" + os.getcwd(),
-            P.K_CAPABILITES: {},
+            P.K_CAPABILITES: {
+                P.K_GENERAL: {
+                    P.K_POSITION_ENCODINGS: position.SUPPORTED_ENCODINGS,
+                },
+                P.K_TD: {
+                    P.K_COMPLETION: {
+                        P.K_COMPLETION_ITEM: {
+                            P.K_DOCUMENTATION_FORMAT: ["plaintext"],
+                            # Documentation is fetched with completionItem/resolve when an
+                            # item is selected, see completion_resolve.
+                            P.K_RESOLVE_SUPPORT: {
+                                P.K_PROPERTIES: [P.K_DOCUMENTATION, P.K_DETAIL],
+                            },
+                        },
+                    },
+                    P.K_HOVER: {
+                        P.K_CONTENT_FORMAT: ["plaintext"],
+                    },
+                    P.K_SIGNATURE_HELP: {
+                        P.K_SIGNATURE_INFORMATION: {
+                            P.K_DOCUMENTATION_FORMAT: ["plaintext"],
+                            P.K_PARAMETER_INFORMATION: {
+                                P.K_LABEL_OFFSET_SUPPORT: True,
+                            },
+                        },
+                    },
+                    P.K_DOCUMENT_SYMBOL: {
+                        P.K_HIERARCHICAL_DOCUMENT_SYMBOL_SUPPORT: True,
+                    },
+                },
+                P.K_WORKSPACE: {
+                    P.K_WORKSPACE_EDIT: {
+                        P.K_DOCUMENT_CHANGES: True,
+                    },
+                },
+            },
         }
         self.rpc.call_async(P.M_INITIALIZE, params, callback=self._handler(self.handle_initialize))
 
-    def completion(self):
+    def completion(self, prefix=""):
+        """Blocking completion request.
+
+        Args:
+            prefix(str): Typed text, used to rank and filter the result.
+        """
         if not self.isinitialized:
             return {}
-        row, col = V.cursor()
+        row, col = self._lsp_cursor()
         params = {
             P.K_TD: {
                 P.K_URI: "file://" + V.current_file(),
@@ -120,9 +248,85 @@ class VimLspClient(object):
         except jsonrpc.JsonRpcError as exc:
             log.error("Completion failed. Error: %s", exc)
             completions = {}
-        result = self._parse_completion(completions)
+        result = self._parse_completion(completions, prefix)
         return result
 
+    def auto_complete_typed(self):
+        """Called on TextChangedI when as-you-type completion is enabled.
+
+        Completion is requested directly after a trigger character, and after a pause in
+        typing for other keyword characters.
+        """
+        self._stop_autocomplete_timer()
+        if not self.isinitialized:
+            return
+        before = V.line_before_cursor()
+        if not before:
+            return
+        provider = self.server_capabilities.get(P.K_COMPLETION_PROVIDER) or {}
+        if before[-1] in (provider.get(P.K_TRIGGER_CHARACTERS) or []):
+            self.auto_complete()
+        elif re.match(r"\w", before[-1]):
+            self._autocomplete_timer = vim.eval(
+                "timer_start({}, 'LspAutoCompleteTimer')".format(self._autocomplete_delay))
+
+    def auto_complete(self):
+        """Send an asynchronous completion request for the cursor position.
+
+        The popup is shown from process() when the reply arrives, see handle_auto_complete.
+        """
+        self._autocomplete_timer = None
+        if not self.isinitialized or not V.in_insert_mode():
+            return
+        before = V.line_before_cursor()
+        prefix = re.search(r"\w*$", before).group()
+        startcol = len(before) - len(prefix)
+        if not isinstance(before, bytes):
+            # complete() takes a byte column
+            startcol = len(before[:startcol].encode("utf-8"))
+
+        row, col = self._lsp_cursor()
+        params = {
+            P.K_TD: {
+                P.K_URI: "file://" + V.current_file(),
+            },
+            P.K_POSITION: {
+                P.K_LINE: row,
+                P.K_CHAR: col,
+            }
+        }
+        handler = functools.partial(
+            self.handle_auto_complete, changedtick=V.changedtick(), cursor=V.cursor(),
+            startcol=startcol + 1, prefix=prefix)
+        # The change and the request go out in one write
+        with self.rpc.batch() as batch:
+            self.td_did_change(batch)
+            batch.call_async(P.M_TD_COMPLETION, params, callback=self._handler(handler))
+
+    def completion_resolve(self):
+        """Show documentation for the selected completion item.
+
+        Called on CompleteChanged. The documentation is requested with completionItem/resolve
+        the first time an item is selected, after that it is taken from the cache. Servers
+        without resolve support have the documentation in "info" already.
+        """
+        if not self.isinitialized:
+            return
+        if not self._resolve_provider():
+            V.show_completion_popup()
+            return
+        user_data = V.selected_completion_data()
+        if not user_data.isdigit() or int(user_data) >= len(self._completion_items):
+            return
+        item = self._completion_items[int(user_data)]
+        key = self._completion_key(item)
+        doc = self._completion_docs.get(key)
+        if doc is not None:
+            V.show_completion_info(doc)
+            return
+        handler = functools.partial(self.handle_completion_resolve, key=key, user_data=user_data)
+        self.rpc.call_async(P.M_COMPLETION_RESOLVE, item, callback=self._handler(handler))
+
     # Notifications
     def initialized(self):
         """Send initialized message."""
@@ -131,7 +335,7 @@ class VimLspClient(object):
     def references(self):
         if not self.isinitialized:
             return
-        row, col = V.cursor()
+        row, col = self._lsp_cursor()
         params = {
             P.K_TD: {
                 P.K_URI: "file://" + V.current_file(),
@@ -150,44 +354,261 @@ class VimLspClient(object):
     def definition(self):
         if not self.isinitialized:
             return
-        row, col = V.cursor()
+        key = self._definition_key()
+        if key is not None:
+            cached = self._definition_cache.get(*key)
+            if cached is not None:
+                self.handle_definition(cached)
+                return
+            if key in self._prefetch_inflight:
+                # Jump when the prefetch reply arrives instead of asking again
+                self._prefetch_inflight[key] = True
+                return
+        self.rpc.call_async(
+            P.M_TD_DEFINITION, self._definition_params(),
+            callback=self._handler(self.handle_definition))
+
+    def prefetch_definition(self):
+        """Request the definition of the word under the cursor ahead of time.
+
+        Called on CursorHold. The reply is cached so that definition() can jump at once. At
+        most g:langIQ_prefetch_max_inflight prefetch requests are sent at the same time.
+        """
+        if not self.isinitialized or len(self._prefetch_inflight) >= self._prefetch_max_inflight:
+            return
+        key = self._definition_key()
+        if (key is None or key in self._prefetch_inflight or
+                self._definition_cache.get(*key) is not None):
+            return
+        self._prefetch_inflight[key] = False
+        handler = functools.partial(self.handle_prefetch_definition, key=key)
+        on_error = functools.partial(self._prefetch_failed, key=key)
+        self.rpc.call_async(
+            P.M_TD_DEFINITION, self._definition_params(),
+            callback=self._handler(handler, on_error))
+
+    def symbols(self):
+        if not self.isinitialized:
+            return
+        uri = "file://" + V.current_file()
+        version = self._td_versions.get(uri)
+        cached = self._doc_symbols.get(uri, version)
+        if cached is not None:
+            self._display_symbols(uri, cached)
+            if cached.stale:
+                # From the persistent cache, have the server confirm it
+                self._request_symbols(uri, version, display=False)
+            return
+        self._request_symbols(uri, version, display=True)
+
+    def hover(self):
+        """Show hover information for the word under the cursor.
+
+        The result is cached per document version and word, so asking again anywhere in the
+        same word of an unchanged document does not ask the server.
+        """
+        if not self.isinitialized:
+            return
+        word = V.word_range()
+        if word is None:
+            return
+        uri = "file://" + V.current_file()
+        version = self._td_versions.get(uri)
+        text = self._hover_cache.get(uri, version, word)
+        if text is not None:
+            self._display_hover(text)
+            return
+        row, col = self._lsp_cursor()
         params = {
             P.K_TD: {
-                P.K_URI: "file://" + V.current_file(),
+                P.K_URI: uri,
             },
             P.K_POSITION: {
                 P.K_LINE: row,
                 P.K_CHAR: col,
             },
-            P.K_CONTEXT: {
-                P.K_INCLUDE_DECLARATION: True,
+        }
+        handler = functools.partial(self.handle_hover, uri=uri, version=version, word=word)
+        self.rpc.call_async(P.M_TD_HOVER, params, callback=self._handler(handler))
+
+    def document_highlight_moved(self):
+        """Called on CursorMoved. Schedule a documentHighlight request if the word changed.
+
+        Any request in flight for the previous word is cancelled and its highlight removed.
+        The request is sent after g:langIQ_document_highlight_delay ms without moving.
+        """
+        if not self.isinitialized:
+            return
+        word = V.word_range()
+        key = ("file://" + V.current_file(), word) if word else None
+        if key == self._doc_hl_word:
+            return
+        self._doc_hl_word = key
+        self._cancel_document_highlight()
+        if key is not None:
+            self._doc_hl_timer = vim.eval(
+                "timer_start({}, 'LspDocumentHighlightTimer')".format(self._doc_hl_delay))
+
+    def document_highlight_leave(self):
+        """Called on BufLeave. Remove the highlight and forget the word, nothing is pending."""
+        self._doc_hl_word = None
+        self._cancel_document_highlight()
+
+    def document_highlight(self):
+        """Send a documentHighlight request for the word under the cursor."""
+        self._doc_hl_timer = None
+        if not self.isinitialized or self._doc_hl_word is None:
+            return
+        row, col = self._lsp_cursor()
+        params = {
+            P.K_TD: {
+                P.K_URI: self._doc_hl_word[0],
+            },
+            P.K_POSITION: {
+                P.K_LINE: row,
+                P.K_CHAR: col,
             },
         }
-        self.rpc.call_async(
-            P.M_TD_DEFINITION, params, callback=self._handler(self.handle_definition))
+        handler = functools.partial(self.handle_document_highlight, key=self._doc_hl_word)
+        self._doc_hl_request = self.rpc.call_async(
+            P.M_TD_DOCUMENT_HIGHLIGHT, params, callback=self._handler(handler))
 
-    def symbols(self):
+    def signature_help_moved(self):
+        """Called on TextChangedI and CursorMovedI when signature help is enabled.
+
+        Within the call of the last reply the signature is shown again, with the argument
+        under the cursor as active parameter, without asking the server. After a trigger
+        character in another call, a request is sent once typing has paused for
+        g:langIQ_signature_help_delay ms.
+        """
         if not self.isinitialized:
             return
-        row, col = V.cursor()
+        call = self._current_call()
+        if call is None:
+            self._stop_signature_help_timer()
+            self.clear_signature_help()
+            return
+        key, active = call
+        if self._sig_help is not None and self._sig_help[0] == key:
+            self._display_signature_help(self._sig_help[1], active)
+            return
+        self.clear_signature_help()
+        before = V.line_before_cursor()
+        if before and before[-1] in self._signature_triggers():
+            self._stop_signature_help_timer()
+            self._sig_timer = vim.eval(
+                "timer_start({}, 'LspSignatureHelpTimer')".format(self._sig_delay))
+
+    def signature_help(self):
+        """Send a signatureHelp request for the call around the cursor."""
+        self._sig_timer = None
+        if not self.isinitialized or not V.in_insert_mode():
+            return
+        call = self._current_call()
+        if call is None:
+            return
+        if self._sig_request is not None:
+            self.rpc.cancel(self._sig_request)
+        row, col = self._lsp_cursor()
         params = {
             P.K_TD: {
                 P.K_URI: "file://" + V.current_file(),
             },
+            P.K_POSITION: {
+                P.K_LINE: row,
+                P.K_CHAR: col,
+            },
         }
-        self.rpc.call_async(
-            P.M_TD_SYMBOLS, params, callback=self._handler(self.handle_symbols))
+        handler = functools.partial(self.handle_signature_help, key=call[0])
+        with self.rpc.batch() as batch:
+            self.td_did_change(batch)
+            self._sig_request = batch.call_async(
+                P.M_TD_SIGNATURE_HELP, params, callback=self._handler(handler))
+
+    def clear_signature_help(self):
+        if self._sig_shown:
+            V.echo_highlighted([])
+            self._sig_shown = False
+
+    def clear_document_highlight(self):
+        for winid, match_ids in self._doc_hl_matches.items():
+            for match_id in match_ids:
+                V.match_delete(match_id, winid)
+        self._doc_hl_matches = {}
+
+    def current_symbol(self):
+        """Return the name of the symbol containing the cursor, e.g. for the statusline.
+
+        Only cached symbols are used. If the cache is outdated a new request is sent and an
+        empty string returned until the reply has arrived.
+        """
+        if not self.isinitialized:
+            return ""
+        uri = "file://" + V.current_file()
+        version = self._td_versions.get(uri)
+        cached = self._doc_symbols.get(uri, version)
+        if cached is None or cached.stale:
+            self._request_symbols(uri, version, display=False)
+        if cached is None:
+            return ""
+        line, col = self._lsp_cursor()
+        return cached.containing(line, col) or ""
+
+    def workspace_symbols(self, query=None):
+        """Search symbols in the workspace.
+
+        The server is only asked for the first characters of the query. The rest of the
+        narrowing is done on the locally stored result.
+
+        Args:
+            query(str): Query. If None the query is read interactively, updating the quickfix
+                list on each key press.
+        """
+        if not self.isinitialized:
+            return
+        if query is None:
+            self._workspace_symbols_prompt()
+            return
+        symbols_ = self._workspace_symbol_search(query)
+        if not symbols_:
+            V.warning("No symbols found")
+            return
+        quickfix.display(self._symbol_qf_content(symbols_), "LspWorkspaceSymbols")
 
     def td_did_open(self):
         if not self.isinitialized:
             return
+        uri = "file://" + V.current_file()
+        if self._resolve_provider():
+            V.use_lazy_completion_info()
+        self._send_did_open(uri, V.filetype(), V.changedtick(), V.current_source())
+        if self._persistent is not None:
+            self._content_hashes[uri] = persistent.content_hash(V.current_source_bytes())
+            self._load_persistent(uri)
+
+    def _open_loaded_buffers(self):
+        """Open the other loaded buffers of the current filetype, FileType fired before start."""
+        current = V.current_file()
+        filetype = V.filetype()
+        for name, buf in V.loaded_buffers().items():
+            if name == current or V.buffer_filetype(buf) != filetype:
+                continue
+            uri = "file://" + name
+            self._send_did_open(uri, filetype, V.buffer_changedtick(buf), V.source(buf))
+            if self._persistent is not None:
+                self._content_hashes[uri] = persistent.content_hash(V.source_bytes(buf))
+                self._load_persistent(uri)
+
+    def _send_did_open(self, uri, language_id, changedtick, text):
         self.td_version += 1
+        self._td_versions[uri] = self.td_version
+        self._synced_ticks[uri] = changedtick
         params = {
             P.K_TD: {
-                P.K_URI: "file://" + V.current_file(),
-                P.K_LANG_ID: V.filetype(),
+                P.K_URI: uri,
+                P.K_LANG_ID: language_id,
                 P.K_VERSION: self.td_version,
-                P.K_TEXT: V.current_source()
+                P.K_TEXT: text
             }
         }
         self.rpc.call_async(P.M_TD_DID_OPEN, params, notify=True)
@@ -201,61 +622,266 @@ class VimLspClient(object):
             }
         }
         self.rpc.call_async(P.M_TD_DID_SAVE, params, notify=True)
+        self._ws_symbols.invalidate()
 
     def td_did_close(self, filename=None):
         if not self.isinitialized:
             return
 
         filename = filename or V.current_file()
+        uri = "file://" + filename
+        self._td_versions.pop(uri, None)
+        self._synced_ticks.pop(uri, None)
+        V.forget_source(V.bufnr(filename))
+        self._positions.forget(V.bufnr(filename))
+        self._renderer.unloaded(filename)
+        self._content_hashes.pop(uri, None)
+        self._doc_symbols.invalidate(uri)
+        self._hover_cache.invalidate(uri)
+        self._definition_cache.invalidate(uri)
         params = {
             P.K_TD: {
-                P.K_URI: "file://" + filename,
+                P.K_URI: uri,
             }
         }
         self.rpc.call_async(P.M_TD_DID_CLOSE, params, notify=True)
 
-    def td_did_change(self):
+    def td_did_change(self, rpc=None):
+        """Sync the current buffer if it has changed.
+
+        Args:
+            rpc: Optional, a jsonrpc.Batch to add the notification to.
+        """
         if not self.isinitialized:
             return
-        self.td_version += 1
+        uri = "file://" + V.current_file()
+        changedtick = V.changedtick()
+        if self._synced_ticks.get(uri) == changedtick:
+            # The server already has this text
+            return
         params = {
             P.K_TD: {
-                P.K_URI: "file://" + V.current_file(),
-                P.K_VERSION: self.td_version,
+                P.K_URI: uri,
+                P.K_VERSION: self._next_version(uri, changedtick),
             },
             P.K_CONTENT_CHANGES: [{
                 P.K_TEXT: V.current_source(),
             }],
         }
-        self.rpc.call_async(P.M_TD_DID_CHANGE, params, notify=True)
+        (rpc or self.rpc).call_async(P.M_TD_DID_CHANGE, params, notify=True)
+
+    def formatting(self, first_line=None, last_line=None):
+        """Format the current buffer, or lines first_line to last_line (one based).
+
+        The buffer is synced in the same write as the request. The edits in the reply are
+        applied by handle_formatting.
+        """
+        if not self.isinitialized:
+            return
+        uri = "file://" + V.current_file()
+        params = {
+            P.K_TD: {
+                P.K_URI: uri,
+            },
+            P.K_OPTIONS: {
+                P.K_TAB_SIZE: V.shiftwidth(),
+                P.K_INSERT_SPACES: V.expandtab(),
+            },
+        }
+        method = P.M_TD_FORMATTING
+        if first_line is not None:
+            method = P.M_TD_RANGE_FORMATTING
+            params[P.K_RANGE] = {
+                P.K_START: {P.K_LINE: first_line - 1, P.K_CHAR: 0},
+                P.K_END: {P.K_LINE: last_line, P.K_CHAR: 0},
+            }
+        with self.rpc.batch() as batch:
+            self.td_did_change(batch)
+            handler = functools.partial(
+                self.handle_formatting, uri=uri, changedtick=V.changedtick())
+            batch.call_async(method, params, callback=self._handler(handler))
+
+    # Server request handlers, called from the read thread
+    @staticmethod
+    def handle_configuration(params):
+        """Handle workspace/configuration. No settings are given, one null per item."""
+        return [None] * len((params or {}).get(P.K_ITEMS, []))
 
     # async handlers
     @staticmethod
-    def handle_msg(self, handler, result, exception):
-        self._event_queue.put((handler, result, exception))
+    def handle_msg(self, handler, on_error, coalesce, result, exception):
+        key = coalesce(result) if coalesce and not exception else None
+        self._event_queue.put((handler, on_error, result, exception), key)
 
     def handle_initialize(self, msg):
         """Handle initialize response."""
         log.debug("Initialized.")
         self.isinitialized = True
+        self.server_capabilities = (msg or {}).get(P.K_CAPABILITES, {})
+        self._positions.encoding = self.server_capabilities.get(
+            P.K_POSITION_ENCODING, position.UTF16)
+        log.debug("Position encoding: %s", self._positions.encoding)
         # self.initialized()
-        # TODO: Loop through all open files? And not only current?
         self.td_did_open()
+        self._open_loaded_buffers()
+
+    def handle_auto_complete(self, msg, changedtick, cursor, startcol, prefix):
+        """Handle asynchronous completion response.
+
+        The reply is dropped if the user has typed or moved since the request was sent.
+        """
+        if (not V.in_insert_mode() or V.changedtick() != changedtick or
+                V.cursor() != cursor):
+            log.debug("Dropping outdated completion reply")
+            return
+        completions = self._parse_completion(msg or {}, prefix)
+        if completions != "[]":
+            vim.eval("complete({}, {})".format(startcol, completions))
+
+    def handle_completion_resolve(self, msg, key, user_data):
+        """Handle completionItem/resolve response."""
+        doc = self._cache_completion_doc(key, msg or {})
+        # Only show if the item is still selected
+        if V.selected_completion_data() == user_data:
+            V.show_completion_info(doc)
+
+    def handle_hover(self, msg, uri, version, word):
+        """Handle hover response."""
+        text = self._hover_text((msg or {}).get(P.K_CONTENTS)).strip()
+        self._hover_cache.put(uri, version, word, text)
+        # Only show if the cursor is still on the same word
+        if "file://" + V.current_file() == uri and V.word_range() == word:
+            self._display_hover(text)
+
+    def handle_document_highlight(self, msg, key):
+        """Handle documentHighlight response.
+
+        All occurrences are added with matchaddpos() in each window showing the buffer.
+        """
+        # Also dropped if the buffer was left, the word is then reset
+        if key != self._doc_hl_word or key[0] != "file://" + V.current_file():
+            return
+        self._doc_hl_request = None
+        self.clear_document_highlight()
+        buf = vim.current.buffer
+        cols = self._positions.buffer(buf)
+        positions = []
+        for highlight in msg or []:
+            start = highlight[P.K_RANGE][P.K_START]
+            end = highlight[P.K_RANGE][P.K_END]
+            line = start[P.K_LINE]
+            start_col = cols.to_byte(line, start[P.K_CHAR])
+            if end[P.K_LINE] == line:
+                length = max(cols.to_byte(line, end[P.K_CHAR]) - start_col, 1)
+            else:
+                # Multi line ranges are only highlighted on the first line
+                length = max(len(V.encoded(buf[line])) - start_col, 1)
+            positions.append([line + 1, start_col + 1, length])
+        if not positions:
+            return
+        for winid in V.buffer_windows():
+            self._doc_hl_matches[winid] = V.match_add_pos(
+                "LspDocumentHighlight", positions, winid)
+
+    def rename(self, new_name):
+        """Rename the symbol under the cursor to new_name, see handle_rename."""
+        if not self.isinitialized:
+            return
+        row, col = self._lsp_cursor()
+        params = {
+            P.K_TD: {
+                P.K_URI: "file://" + V.current_file(),
+            },
+            P.K_POSITION: {
+                P.K_LINE: row,
+                P.K_CHAR: col,
+            },
+            P.K_NEW_NAME: new_name,
+        }
+        with self.rpc.batch() as batch:
+            self.td_did_change(batch)
+            batch.call_async(P.M_TD_RENAME, params, callback=self._handler(self.handle_rename))
+
+    def handle_formatting(self, msg, uri, changedtick):
+        """Handle formatting and rangeFormatting response.
+
+        Only the changed lines are replaced and the server is told about them with an
+        incremental didChange, if it supports that, instead of a resync of the whole text.
+        """
+        if "file://" + V.current_file() != uri or V.changedtick() != changedtick:
+            V.warning("Buffer changed while formatting, not applied")
+            return
+        changes = textedit.apply(vim.current.buffer, msg or [], self._positions.encoding)
+        if changes:
+            self._did_change_edited(uri, vim.current.buffer, changes)
+
+    def handle_rename(self, msg):
+        """Handle rename response, a WorkspaceEdit.
+
+        Loaded buffers are edited in place and other files rewritten on disk. The server is
+        then told about all changes in one write: a didChange per open document and one
+        didChangeWatchedFiles for the files on disk. The changed locations are listed in the
+        quickfix window.
+        """
+        edits, versions = workspaceedit.file_edits(msg or {})
+        if not edits:
+            V.warning("Nothing to rename")
+            return
+        for uri, version in versions.items():
+            if version is not None and self._td_versions.get(uri, version) != version:
+                V.warning("Rename not applied, {} has changed".format(self._parse_uri(uri)))
+                return
+
+        buffers = V.loaded_buffers()
+        edited = []
+        on_disk = []
+        locations = []
+        for uri, text_edits in edits.items():
+            filename = self._parse_uri(uri)
+            buf = buffers.get(filename)
+            if buf is not None:
+                changes = textedit.apply(buf, text_edits, self._positions.encoding)
+                if changes and uri in self._td_versions:
+                    edited.append((uri, buf, changes))
+            else:
+                try:
+                    workspaceedit.rewrite_file(filename, text_edits, self._positions.encoding)
+                except (IOError, OSError) as exc:
+                    log.error("Failed to rename in %s. Error: %s", filename, exc)
+                    V.warning("Rename failed in {}".format(filename))
+                    continue
+                on_disk.append({P.K_URI: uri, P.K_TYPE: P.FILE_CHANGED})
+            locations.extend(workspaceedit.locations(uri, text_edits))
+
+        with self.rpc.batch() as batch:
+            for uri, buf, changes in edited:
+                self._did_change_edited(uri, buf, changes, batch)
+            if on_disk:
+                batch.call_async(
+                    P.M_WS_DID_CHANGE_WATCHED_FILES, {P.K_CHANGES: on_disk}, notify=True)
+        self._ws_symbols.invalidate()
+
+        qf_content = self._location_qf_content(locations)
+        self._source_lines.fill_text(qf_content)
+        quickfix.display(qf_content, "LspRename: {} changes in {} files".format(
+            len(qf_content), len(edits)))
+
+    def handle_signature_help(self, msg, key):
+        """Handle signatureHelp response. Shown if the cursor is still in the same call."""
+        self._sig_request = None
+        self._sig_help = (key, msg or {})
+        call = self._current_call()
+        if call is not None and call[0] == key and V.in_insert_mode():
+            self._display_signature_help(msg or {}, call[1])
 
     def handle_references(self, msg):
         """Handle references msg."""
         if not msg:
             V.warning("No references found")
             return
-        qf_content = []
-        for loc in msg:
-            qf_line = {
-                "filename": self._parse_uri(loc[P.K_URI]),
-                "lnum": loc[P.K_RANGE][P.K_START][P.K_LINE] + 1,
-                "col": loc[P.K_RANGE][P.K_START][P.K_CHAR],
-            }
-            qf_content.append(qf_line)
-        V.display_quickfix(qf_content)
+        qf_content = self._location_qf_content(msg)
+        self._source_lines.fill_text(qf_content)
+        quickfix.display(qf_content, "LspReferences")
 
     def handle_definition(self, msg):
         """Handle definition msg."""
@@ -263,48 +889,61 @@ class VimLspClient(object):
         if not msg:
             V.warning("No definition found")
             return
-        qf_content = []
-        for loc in msg:
-            qf_line = {
-                "filename": self._parse_uri(loc[P.K_URI]),
-                "lnum": loc[P.K_RANGE][P.K_START][P.K_LINE],
-                "col": loc[P.K_RANGE][P.K_START][P.K_CHAR],
-            }
-            qf_content.append(qf_line)
-
+        qf_content = self._location_qf_content(msg)
         if len(qf_content) == 1:
             jto = qf_content[0]
-            V.jump_to(jto["filename"], jto["lnum"], jto["col"])
+            V.jump_to(jto["filename"], jto["lnum"] - 1, jto["col"])
         else:
-            V.display_quickfix(qf_content)
+            self._source_lines.fill_text(qf_content)
+            quickfix.display(qf_content, "LspDefinition")
 
-    def handle_symbols(self, msg):
+    def handle_prefetch_definition(self, msg, key):
+        """Handle definition response for a prefetch request."""
+        jump = self._prefetch_inflight.pop(key, False)
+        self._definition_cache.put(key[0], key[1], key[2], msg or [])
+        if jump and self._definition_key() == key:
+            self.handle_definition(msg)
+
+    def handle_symbols(self, msg, uri, version, display=True):
         """Handle symbols response."""
         log.debug(msg)
-        if not msg:
-            V.warning("No symbols found")
-            return
-        qf_content = []
-        for sym in msg:
-            qf_line = {
-                "filename": self._parse_uri(sym[P.K_LOCATION][P.K_URI]),
-                "lnum": sym[P.K_LOCATION][P.K_RANGE][P.K_START][P.K_LINE],
-                "col": sym[P.K_LOCATION][P.K_RANGE][P.K_START][P.K_CHAR],
-                "text": sym[P.K_NAME],
-            }
-            qf_content.append(qf_line)
-
-        V.display_quickfix(qf_content)
+        self._doc_symbols_pending.discard((uri, version))
+        doc_symbols = self._doc_symbols.put(uri, version, msg)
+        if uri in self._content_hashes and version == self._td_versions.get(uri):
+            self._persistent.put(self._parse_uri(uri), self._content_hashes[uri],
+                                 persistent.SYMBOLS, msg)
+        if display:
+            self._display_symbols(uri, doc_symbols)
 
     def handle_diagnostics(self, msg):
         """Handle diagnostics notifications."""
         log.debug("enter")
         local_uri = self._parse_uri(msg[P.K_URI])
-        self.diagnostics[local_uri] = msg[P.K_DIAGNOSTICS]
-        if self._use_signs:
-            self.update_signs(local_uri)
-        if self._use_highlight:
-            self.update_highlight(local_uri)
+        self.diagnostics[local_uri] = diagnostics.FileDiagnostics(msg[P.K_DIAGNOSTICS])
+        self._renderer.update(local_uri)
+        # Assume the diagnostics are for the text last sent, if not they are replaced soon
+        hash_ = self._content_hashes.get(msg[P.K_URI])
+        if hash_ is not None:
+            self._persistent.put(local_uri, hash_, persistent.DIAGNOSTICS, msg[P.K_DIAGNOSTICS])
+
+    def _load_persistent(self, uri):
+        """Show results stored for the current text of a document until the server answers."""
+        filename = self._parse_uri(uri)
+        hash_ = self._content_hashes[uri]
+        current = self.diagnostics.get(filename)
+        if current is None or current.stale:
+            result = self._persistent.get(filename, hash_, persistent.DIAGNOSTICS)
+            if result is not None:
+                log.debug("Diagnostics for %s from the persistent cache", filename)
+                self.diagnostics[filename] = diagnostics.FileDiagnostics(result, stale=True)
+                self._renderer.update(filename)
+        result = self._persistent.get(filename, hash_, persistent.SYMBOLS)
+        if result is not None:
+            self._doc_symbols.put(uri, self._td_versions[uri], result, stale=True)
+
+    def diagnostics_shown(self):
+        """Render diagnostics deferred while the current buffer was hidden."""
+        self._renderer.shown(V.current_file())
 
     # Public functions
     def display_diagnostics(self):
@@ -312,30 +951,34 @@ class VimLspClient(object):
         if filename not in self.diagnostics:
             return
 
-        diagnostics = self.diagnostics[filename]
+        file_diagnostics = self.diagnostics[filename]
+        cols = self._positions.buffer(vim.current.buffer)
         qf_content = []
-        for loc in diagnostics:
+        for diag in file_diagnostics:
             qf_line = {"filename": filename,
-                       "lnum": loc[P.K_RANGE][P.K_START][P.K_LINE] + 1,
-                       "col": loc[P.K_RANGE][P.K_START][P.K_CHAR],
-                       "text": loc[P.K_MESSAGE]}
+                       "lnum": diag.line + 1,
+                       "col": cols.to_byte(diag.line, diag.char),
+                       "text": diag.message}
             qf_content.append(qf_line)
-        V.display_quickfix(qf_content)
+        quickfix.display(qf_content, _title("LspDiagnostics", file_diagnostics.stale))
 
     def display_diagnostics_help(self):
+        if self._sig_shown:
+            # The message line shows the signature of the call being typed
+            return
         filename = V.current_file()
         if filename in self.diagnostics:
             line, _ = V.cursor()
-            # TODO: Improve performance here by indexing on line number as well as filename
-            for diag in self.diagnostics[filename]:
-                if diag[P.K_RANGE][P.K_START][P.K_LINE] == line:
-                    V.warning("LspDiagnostic: {} | col: {} | {}:{}".format(
-                        diag[P.K_MESSAGE],
-                        diag[P.K_RANGE][P.K_START][P.K_CHAR],
-                        diag.get(P.K_SOURCE, ""),
-                        diag.get(P.K_CODE, "")
-                    ))
-                    break
+            file_diagnostics = self.diagnostics[filename]
+            for diag in file_diagnostics.on_line(line):
+                V.warning("{}: {} | col: {} | {}:{}".format(
+                    _title("LspDiagnostic", file_diagnostics.stale),
+                    diag.message,
+                    self._positions.buffer(vim.current.buffer).to_byte(line, diag.char),
+                    diag.source or "",
+                    diag.code if diag.code is not None else ""
+                ))
+                break
             else:
                 # clear
                 V.warning("")
@@ -346,24 +989,23 @@ class VimLspClient(object):
         log.debug("Update highlight for %s", file_)
 
         update_win = []
+        buf = None
         for win in vim.windows:
             if win.buffer.name == file_:
                 update_win.append(win.number)
+                buf = win.buffer
 
         if not update_win:
             return
 
+        cols = self._positions.buffer(buf)
         match_regex = []
-        for diag in self.diagnostics.get(file_, []):
-            line = diag[P.K_RANGE][P.K_START][P.K_LINE] + 1
-            col_start = diag[P.K_RANGE][P.K_START][P.K_CHAR]
-            if col_start < 0:
-                col_start = 0
-            col_end = diag[P.K_RANGE][P.K_END][P.K_CHAR] + 1
-            if col_end < 0:
-                col_end = 0
+        for diag in self.diagnostics.get(file_, diagnostics.EMPTY):
+            line = diag.line + 1
+            col_start = max(cols.to_byte(diag.line, diag.char), 0)
+            col_end = max(cols.to_byte(diag.line, diag.end_char) + 1, 0)
             match_regex.append(r"\%{}l\%1c".format(line))
-            match_regex.append(r"\%{}l\%>{}v.\%<{}v".format(line, col_start, col_end))
+            match_regex.append(r"\%{}l\%>{}c.\%<{}c".format(line, col_start, col_end))
 
         cmd = r"let w:langiq_match=matchadd('ColorColumn', '{}')".format(r"\|".join(match_regex))
         log.debug("Highlight cmd: %s", cmd)
@@ -390,56 +1032,295 @@ class VimLspClient(object):
             return
         # Call did change to make sure server has latest info
         self.td_did_change()
-        completions = self.completion()
+        completions = self.completion(vim.eval("a:base"))
         vim.command("return {}".format(completions))
 
     def update_signs(self, file_=None):
-        """Update signs in current buffer."""
-        # If completion is ongoing to not show signs as it is insanely slow
-        # and causes flickering.
+        """Update signs in file_, default current buffer."""
         if not file_:
             file_ = V.current_file()
         log.debug("Update signs for %s", file_)
-        self.clear_signs()
-        for diag in self.diagnostics.get(file_, []):
-            id_ = self._next_sign_id()
-            vim.command(
-                "sign place {id} line={line} name=LspSign file={file}".format(
-                    id=id_,
-                    line=diag[P.K_RANGE][P.K_START][P.K_LINE] + 1,
-                    file=file_
-                )
-            )
+        self._renderer.render_signs(file_)
+
+    def _cancel_document_highlight(self):
+        """Stop the timer, cancel the request in flight and remove the highlight."""
+        self._stop_document_highlight_timer()
+        if self._doc_hl_request is not None:
+            self.rpc.cancel(self._doc_hl_request)
+            self._doc_hl_request = None
+        self.clear_document_highlight()
+
+    def _stop_document_highlight_timer(self):
+        if self._doc_hl_timer is not None:
+            vim.eval("timer_stop({})".format(self._doc_hl_timer))
+            self._doc_hl_timer = None
+
+    def _stop_signature_help_timer(self):
+        if self._sig_timer is not None:
+            vim.eval("timer_stop({})".format(self._sig_timer))
+            self._sig_timer = None
+
+    def _stop_autocomplete_timer(self):
+        if self._autocomplete_timer is not None:
+            vim.eval("timer_stop({})".format(self._autocomplete_timer))
+            self._autocomplete_timer = None
 
     def clear_signs(self):
         filename = V.current_file()
         V.clear_signs(filename)
 
+    def clear_display(self):
+        """Remove all signs and highlights of the client, e.g. before it is replaced."""
+        self._cancel_document_highlight()
+        for filename in self.diagnostics:
+            V.clear_signs(filename)
+            bufnr = V.bufnr(filename)
+            if bufnr <= 0:
+                continue
+            for winid in V.buffer_windows(bufnr):
+                V.match_delete(V.window_match(winid, "langiq_match"), winid)
+
     # Private functions
     def _get_id(self):
         """Get unique request id."""
         self._id += 1
         return self._id
 
-    def _next_sign_id(self):
-        log.debug("next sign %s", time.time())
-        self._sign_id += 1
-        file_ = V.current_file()
-        all_ids = set(re.findall(r"id=(\d+)", V.vim_command("sign place file={}".format(file_))))
-        while self._sign_id in all_ids:
-            # cap at an arbitrary figure just for the sake of it
-            if self._sign_id > 65000:
-                self._sign_id = 1
-            self._sign_id += 1
+    def _lsp_cursor(self):
+        """Return cursor (line, character), zero based, in the negotiated position encoding."""
+        row, col = V.cursor()
+        return row, self._positions.buffer(vim.current.buffer).to_lsp(row, col)
 
-        log.debug("next sign %s", time.time())
-        return self._sign_id
+    def _did_change_edited(self, uri, buf, changes, rpc=None):
+        """Send changes made to buf by the client, as returned by textedit.apply.
 
-    @staticmethod
-    def _parse_completion(msg):
-        """Parse completion response."""
+        Args:
+            rpc: Optional, a jsonrpc.Batch to add the notification to.
+        """
+        if not self._incremental_sync():
+            changes = [{P.K_TEXT: V.source(buf)}]
+        params = {
+            P.K_TD: {
+                P.K_URI: uri,
+                P.K_VERSION: self._next_version(uri, V.buffer_changedtick(buf), buf),
+            },
+            P.K_CONTENT_CHANGES: changes,
+        }
+        (rpc or self.rpc).call_async(P.M_TD_DID_CHANGE, params, notify=True)
+
+    def _next_version(self, uri, changedtick, buf=None):
+        """Return the version for text at changedtick being sent, and drop outdated results.
+
+        Args:
+            buf: Vim buffer of uri, the current buffer if not given.
+        """
+        self._synced_ticks[uri] = changedtick
+        self.td_version += 1
+        self._td_versions[uri] = self.td_version
+        if self._persistent is not None:
+            text = V.current_source_bytes() if buf is None else V.source_bytes(buf)
+            self._content_hashes[uri] = persistent.content_hash(text)
+        self._ws_symbols.invalidate()
+        self._hover_cache.invalidate(uri)
+        self._definition_cache.invalidate(uri)
+        return self.td_version
+
+    def _incremental_sync(self):
+        """Return True if the server takes didChange with ranges."""
+        sync = self.server_capabilities.get(P.K_TD_SYNC)
+        if isinstance(sync, dict):
+            sync = sync.get(P.K_CHANGE)
+        return sync == P.TD_SYNC_INCREMENTAL
+
+    def _location_qf_content(self, locations):
+        """Convert Location dicts to quickfix dicts with byte columns."""
+        get_line = self._source_lines.reader()
+        qf_content = []
+        for loc in locations:
+            filename = self._parse_uri(loc[P.K_URI])
+            start = loc[P.K_RANGE][P.K_START]
+            qf_content.append({
+                "filename": filename,
+                "lnum": start[P.K_LINE] + 1,
+                "col": self._byte_col(get_line, filename, start),
+            })
+        return qf_content
+
+    def _byte_col(self, get_line, filename, pos):
+        """Return the zero based byte column of Position pos, lines read with get_line."""
+        col = pos[P.K_CHAR]
+        if col and self._positions.encoding != position.UTF8:
+            text = get_line(filename, pos[P.K_LINE])
+            if text is not None:
+                col = self._positions.to_byte(text, col)
+        return col
+
+    def _current_call(self):
+        """Return (key, active argument) for the call around the cursor, None if not in one.
+
+        key is (uri, line, column of the "(", callee) and identifies the call.
+        """
+        row, _ = V.cursor()
+        first = max(row - signature.MAX_LINES, 0)
+        lines = list(vim.current.buffer[first:row]) + [V.line_before_cursor()]
+        found = signature.find_call([V.decoded(line) for line in lines])
+        if found is None:
+            return None
+        (line, col), callee, active = found
+        return ("file://" + V.current_file(), first + line, col, callee), active
+
+    def _signature_triggers(self):
+        """Return the characters after which signature help is requested."""
+        provider = self.server_capabilities.get(P.K_SIGNATURE_HELP_PROVIDER)
+        if not isinstance(provider, dict):
+            return ()
+        return ((provider.get(P.K_TRIGGER_CHARACTERS) or ["(", ","]) +
+                (provider.get(P.K_RETRIGGER_CHARACTERS) or []))
+
+    def _display_signature_help(self, signature_help, active):
+        chunks = signature.chunks(signature_help, active)
+        if not chunks:
+            self.clear_signature_help()
+            return
+        V.echo_highlighted(chunks)
+        self._sig_shown = True
+
+    def _definition_key(self):
+        """Return (uri, version, word range) for the cursor, None if not on a word."""
+        word = V.word_range()
+        if word is None:
+            return None
+        uri = "file://" + V.current_file()
+        return (uri, self._td_versions.get(uri), word)
+
+    def _definition_params(self):
+        row, col = self._lsp_cursor()
+        return {
+            P.K_TD: {
+                P.K_URI: "file://" + V.current_file(),
+            },
+            P.K_POSITION: {
+                P.K_LINE: row,
+                P.K_CHAR: col,
+            },
+            P.K_CONTEXT: {
+                P.K_INCLUDE_DECLARATION: True,
+            },
+        }
+
+    def _prefetch_failed(self, exception, key):
+        if not self._prefetch_inflight.pop(key, False):
+            return
+        # The user asked to jump meanwhile, ask again as a normal request
+        if self._definition_key() == key:
+            self.rpc.call_async(
+                P.M_TD_DEFINITION, self._definition_params(),
+                callback=self._handler(self.handle_definition))
+        else:
+            V.warning("Definition request failed")
+
+    def _request_symbols(self, uri, version, display):
+        """Send a documentSymbol request, unless one is already pending for uri and version."""
+        if not display and (uri, version) in self._doc_symbols_pending:
+            return
+        self._doc_symbols_pending.add((uri, version))
+        params = {
+            P.K_TD: {
+                P.K_URI: uri,
+            },
+        }
+        handler = functools.partial(
+            self.handle_symbols, uri=uri, version=version, display=display)
+        on_error = functools.partial(self._symbols_failed, uri=uri, version=version)
+        self.rpc.call_async(P.M_TD_SYMBOLS, params, callback=self._handler(handler, on_error))
+
+    def _symbols_failed(self, exception, uri, version):
+        # Allow asking again for the same version
+        self._doc_symbols_pending.discard((uri, version))
+
+    def _display_symbols(self, uri, doc_symbols):
+        if not len(doc_symbols):
+            V.warning("No symbols found")
+            return
+        filename = self._parse_uri(uri)
+        buf = V.loaded_buffers().get(filename)
+        cols = self._positions.buffer(buf) if buf is not None else None
+        quickfix.display(doc_symbols.qf_content(filename, cols),
+                         _title("LspSymbols", doc_symbols.stale))
+
+    def _workspace_symbol_search(self, query):
+        """Return the best matching SymbolInformation dicts for query."""
+        if not self._ws_symbols.covers(query):
+            prefix = query[:self._ws_symbol_min_chars]
+            try:
+                result = self.rpc.call(P.M_WS_SYMBOLS, {P.K_QUERY: prefix})
+            except jsonrpc.JsonRpcError as exc:
+                log.error("Workspace symbols failed. Error: %s", exc)
+                return []
+            self._ws_symbols.update(prefix, result)
+        return self._ws_symbols.search(query, WS_SYMBOL_LIMIT)
+
+    def _workspace_symbols_prompt(self):
+        """Read a query key by key and show the matching symbols while typing."""
+        query = ""
+        shown = False
+        while True:
+            vim.command("redraw")
+            vim.command("echo 'LspWorkspaceSymbols> {}'".format(V.vimstr(query)))
+            char = V.getchar()
+            if char == "\r":
+                if shown:
+                    vim.command("cfirst")
+                break
+            elif char == "\x1b":
+                if shown:
+                    vim.command("cclose")
+                break
+            elif char in ("\x08", "\x7f"):
+                query = query[:-1]
+            elif char:
+                query += char
+
+            if len(query) < self._ws_symbol_min_chars:
+                continue
+            qf_content = self._symbol_qf_content(self._workspace_symbol_search(query))
+            V.set_quickfix(qf_content, action="r" if shown else " ", title="LspWorkspaceSymbols")
+            if not shown:
+                V.open_quickfix()
+                vim.command("wincmd p")
+                shown = True
+        vim.command("redraw")
+
+    def _symbol_qf_content(self, symbols_):
+        """Convert SymbolInformation dicts to quickfix dicts with one based byte columns."""
+        get_line = self._source_lines.reader()
+        qf_content = []
+        for sym in symbols_:
+            text = sym[P.K_NAME]
+            if sym.get(P.K_CONTAINER_NAME):
+                text = "{} [{}]".format(text, sym[P.K_CONTAINER_NAME])
+            filename = self._parse_uri(sym[P.K_LOCATION][P.K_URI])
+            start = sym[P.K_LOCATION][P.K_RANGE][P.K_START]
+            qf_content.append({
+                "filename": filename,
+                "lnum": start[P.K_LINE] + 1,
+                "col": self._byte_col(get_line, filename, start) + 1,
+                "text": text,
+            })
+        return qf_content
+
+    def _parse_completion(self, msg, prefix=""):
+        """Parse completion response.
+
+        Only the best self._completion_limit items matching prefix are converted, see
+        vimliq.completion.
+        """
+        lazy_doc = self._resolve_provider()
+        items = msg.get(P.K_ITEMS, []) if isinstance(msg, dict) else msg or []
+        items = completion.rank(items, prefix, self._completion_limit)
+        self._completion_items = items
         content = []
-        for comp in msg.get(P.K_ITEMS, []):
+        for idx, comp in enumerate(items):
             comp_line = {"word": comp[P.K_LABEL]}
             kind = comp.get(P.K_KIND)
             if kind:
@@ -457,16 +1338,72 @@ class VimLspClient(object):
             if detail:
                 comp_line["menu"] = detail
 
-            doc = comp.get(P.K_DOCUMENTATION, "")
-            if doc:
-                comp_line["info"] = doc
+            if lazy_doc:
+                # Used to find the item again on CompleteChanged
+                comp_line["user_data"] = str(idx)
+                # Some servers send documentation anyway, keep it instead of resolving
+                if comp.get(P.K_DOCUMENTATION):
+                    self._cache_completion_doc(self._completion_key(comp), comp)
+            else:
+                doc = self._documentation_text(comp.get(P.K_DOCUMENTATION))
+                if doc:
+                    comp_line["info"] = doc
 
             content.append(comp_line)
 
         # Vim list/dict just so happen to map to a json string
         return json.dumps(content, separators=(",", ":"))
 
+    @staticmethod
+    def _display_hover(text):
+        if not text:
+            V.warning("No hover information found")
+            return
+        V.display_popup(text)
+
+    @classmethod
+    def _hover_text(cls, contents):
+        """Return hover contents, MarkedString(s) or MarkupContent, as a string."""
+        if isinstance(contents, list):
+            return "\n\n".join(cls._hover_text(content) for content in contents)
+        return cls._documentation_text(contents)
+
+    def _resolve_provider(self):
+        """Return True if the server supports completionItem/resolve."""
+        provider = self.server_capabilities.get(P.K_COMPLETION_PROVIDER) or {}
+        return bool(provider.get(P.K_RESOLVE_PROVIDER))
+
+    def _cache_completion_doc(self, key, item):
+        """Cache and return the documentation text of a (resolved) completion item."""
+        parts = [item.get(P.K_DETAIL), self._documentation_text(item.get(P.K_DOCUMENTATION))]
+        doc = "\n\n".join(part for part in parts if part)
+        self._completion_docs.pop(key, None)
+        self._completion_docs[key] = doc
+        while len(self._completion_docs) > COMPLETION_DOC_CACHE_SIZE:
+            self._completion_docs.popitem(last=False)
+        return doc
+
+    @staticmethod
+    def _completion_key(item):
+        return (item.get(P.K_LABEL), item.get(P.K_KIND), item.get(P.K_DETAIL))
+
+    @staticmethod
+    def _documentation_text(doc):
+        """Return documentation, which is either a string or MarkupContent, as a string."""
+        if isinstance(doc, dict):
+            return doc.get(P.K_VALUE, "")
+        return doc or ""
+
     @staticmethod
     def _parse_uri(uri):
         """Parse uri."""
         return re.sub("file://", "", uri)
+
+
+def _diagnostics_key(msg):
+    return (P.M_DIAGNOSTICS, msg[P.K_URI])
+
+
+def _title(title, stale):
+    """Mark results from the persistent cache."""
+    return title + " (cached)" if stale else title
@@ -22,6 +22,8 @@ import logging
 import shlex
 
 from . import client
+from . import quickfix
+from . import standby as standby_pool
 from . import vimutils as V
 
 log = logging.getLogger(__name__)
@@ -45,17 +47,23 @@ def handle_error(func):
 class ClientManager(object):
     """Class managing all clients."""
 
-    def __init__(self, supported_clients):
+    def __init__(self, supported_clients, standby=None):
         """Initialize object.
 
         Args:
             supported_clients(dict): See supported_clients.json
+            standby(standby.StandbyPool): Optional, pool of standby servers. Servers for all
+                supported languages are started right away.
 
         Attributes:
             clients(dict): Dict where key is the language and value is the client object.
         """
         self._supported_clients = supported_clients
+        self._standby = standby or standby_pool.StandbyPool()
         self.clients = {}
+        if self._standby.enabled:
+            for ft in supported_clients:
+                self._standby.fill(self._start_cmd(ft))
 
     def lang_supported(self):
         ft = V.filetype()
@@ -68,12 +76,12 @@ class ClientManager(object):
         ft = V.filetype()
         # Only add if supported and not already added
         if ft in self._supported_clients and ft not in self.clients:
-            start_cmd = shlex.split(self._supported_clients[ft]["cmd"])
+            start_cmd = self._start_cmd(ft)
 
             log.debug("Starting client, start_cmd: %s", start_cmd)
             try:
                 l_client = client.VimLspClient(start_cmd)
-                l_client.start_server()
+                l_client.start_server(self._standby.take(start_cmd))
                 self.clients[ft] = l_client
                 log.debug("Added client for %s", ft)
 
@@ -83,16 +91,45 @@ class ClientManager(object):
                 # remove client from supported to avoid further calls
                 del self._supported_clients[ft]
 
+    @handle_error
+    def restart_client(self):
+        """Restart the server of the current filetype, with a standby server if there is one.
+
+        The loaded buffers of the filetype are opened on the new server once it is initialized.
+        """
+        old_client = self.clients.pop(V.filetype(), None)
+        if old_client is not None:
+            old_client.clear_display()
+            old_client.shutdown()
+        self.add_client()
+
     @handle_error
     def shutdown_all(self):
         """Called when vim closes."""
         for lang, l_client in self.clients.items():
             log.debug("Shutdown client for language, %s", lang)
             l_client.shutdown()
+        self._standby.close()
+
+    @handle_error
+    def process(self):
+        """Handle messages from the server of the current filetype. Called from a vim timer."""
+        self._standby.check()
+        l_client = self.clients.get(V.filetype())
+        if l_client is not None:
+            l_client.process()
+
+    @handle_error
+    def quickfix_tick(self):
+        """Continue streaming results to the quickfix list. Called from a vim timer."""
+        quickfix.tick()
 
     def getclient(self, filetype):
         return self.clients[filetype]
 
+    def _start_cmd(self, filetype):
+        return shlex.split(self._supported_clients[filetype]["cmd"])
+
     def __getattr__(self, name):
         """Forward function call to the correct lsp client."""
         filetype = V.filetype()
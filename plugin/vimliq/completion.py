@@ -0,0 +1,70 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+"""Completion item ranking.
+
+Completion items are fuzzy matched against the typed prefix, see vimliq.fuzzy. Items the server
+preselects get a bonus and sortText from the server breaks ties. Only the best items are kept,
+using a heap, so large completion lists never have to be sorted or converted to vim data in
+full.
+"""
+import heapq
+
+import vimliq.fuzzy as fuzzy
+import vimliq.lsp as P
+
+DEFAULT_LIMIT = 200
+SCORE_PRESELECT = 20
+
+
+class _Reversed(object):
+    """Wrap a value to invert its ordering, lower sortText should rank higher."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def rank(items, prefix, limit=DEFAULT_LIMIT):
+    """Return the best matching completion items for prefix, best first.
+
+    Args:
+        items(list): CompletionItem dicts.
+        prefix(str): The typed text the items should match.
+        limit(int): Max number of items returned.
+
+    Returns:
+        list: CompletionItem dicts.
+    """
+    def scored():
+        for idx, item in enumerate(items):
+            label = item[P.K_LABEL]
+            value = fuzzy.score(prefix, item.get(P.K_FILTER_TEXT) or label)
+            if value is None:
+                continue
+            if item.get(P.K_PRESELECT):
+                value += SCORE_PRESELECT
+            # -idx keeps server order as the last tie breaker and avoids comparing the items
+            yield (value, _Reversed(item.get(P.K_SORT_TEXT) or label), -idx, item)
+
+    return [entry[-1] for entry in heapq.nlargest(limit, scored())]
@@ -0,0 +1,120 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compact diagnostic storage.
+
+Diagnostics are converted once, when published, from the nested json dicts to records with
+__slots__. Message, source and code strings are interned, since the same messages repeat
+throughout a workspace. The records of a file are sorted on position, with the start lines in
+a separate list for binary search.
+"""
+import bisect
+import sys
+
+import vimliq.lsp as P
+
+try:
+    _intern = sys.intern
+except AttributeError:
+    _intern = intern  # noqa: F821  pylint: disable=undefined-variable
+
+
+class Diagnostic(object):
+    """One diagnostic. Lines and characters are zero based, as sent by the server."""
+
+    __slots__ = ("line", "char", "end_line", "end_char", "severity", "message", "source",
+                 "code")
+
+    def __init__(self, line, char, end_line, end_char, severity=None, message="",
+                 source=None, code=None):
+        self.line = line
+        self.char = char
+        self.end_line = end_line
+        self.end_char = end_char
+        self.severity = severity
+        self.message = message
+        self.source = source
+        self.code = code
+
+    @classmethod
+    def from_lsp(cls, diag):
+        """Create from a Diagnostic dict."""
+        range_ = diag[P.K_RANGE]
+        start = range_[P.K_START]
+        end = range_[P.K_END]
+        return cls(start[P.K_LINE], start[P.K_CHAR], end[P.K_LINE], end[P.K_CHAR],
+                   diag.get(P.K_SEVERITY), _maybe_intern(diag.get(P.K_MESSAGE, "")),
+                   _maybe_intern(diag.get(P.K_SOURCE)), _maybe_intern(diag.get(P.K_CODE)))
+
+    def __repr__(self):
+        return "Diagnostic({}:{} {!r})".format(self.line, self.char, self.message)
+
+
+class FileDiagnostics(object):
+    """The diagnostics of one file, sorted on start position."""
+
+    __slots__ = ("_diagnostics", "_lines", "stale")
+
+    def __init__(self, diagnostics=(), stale=False):
+        """Initialize.
+
+        Args:
+            diagnostics(list): Diagnostic dicts from publishDiagnostics.
+            stale(bool): True for diagnostics from the persistent cache, not yet confirmed
+                by the server.
+        """
+        self.stale = stale
+        self._diagnostics = sorted((Diagnostic.from_lsp(diag) for diag in diagnostics),
+                                   key=lambda diag: (diag.line, diag.char))
+        self._lines = [diag.line for diag in self._diagnostics]
+
+    def __len__(self):
+        return len(self._diagnostics)
+
+    def __iter__(self):
+        return iter(self._diagnostics)
+
+    def __getitem__(self, idx):
+        return self._diagnostics[idx]
+
+    def on_line(self, line):
+        """Return the diagnostics starting on line."""
+        return self.in_range(line, line)
+
+    def in_range(self, first, last):
+        """Return the diagnostics starting on lines first to last, inclusive."""
+        start = bisect.bisect_left(self._lines, first)
+        end = bisect.bisect_right(self._lines, last, start)
+        return self._diagnostics[start:end]
+
+    def lines(self):
+        """Return the sorted, unique, lines with diagnostics."""
+        lines = []
+        for line in self._lines:
+            if not lines or lines[-1] != line:
+                lines.append(line)
+        return lines
+
+
+EMPTY = FileDiagnostics()
+
+
+def _maybe_intern(value):
+    # Only str can be interned, e.g. not unicode in python 2 or int codes
+    if type(value) is str:  # pylint: disable=unidiomatic-typecheck
+        return _intern(value)
+    return value
@@ -0,0 +1,133 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+"""Fuzzy matching and ranking.
+
+A pattern matches a candidate if the pattern characters appear, in order and ignoring case, in
+the candidate. Matches are scored higher when they start the candidate, start a "word" (camel
+case hump or after a separator like "_"), are consecutive or have the same case as the pattern.
+"""
+import heapq
+
+SCORE_PREFIX = 8
+SCORE_START = 12
+SCORE_BOUNDARY = 10
+SCORE_CONSECUTIVE = 6
+SCORE_CASE = 1
+PENALTY_GAP = 1
+PENALTY_GAP_MAX = 5
+
+SEPARATORS = frozenset("_-./: ")
+
+
+def is_boundary(text, idx):
+    """Return True if idx is the start of a word in text."""
+    if idx == 0:
+        return True
+    prev = text[idx - 1]
+    return prev in SEPARATORS or (prev.islower() and text[idx].isupper())
+
+
+def score(pattern, candidate):
+    """Score candidate against pattern.
+
+    Args:
+        pattern(str): The typed pattern.
+        candidate(str): Text to match.
+
+    Returns:
+        int: Score, higher is better. None if the pattern does not match.
+    """
+    if not pattern:
+        return 0
+    lower = candidate.lower()
+    lower_pattern = pattern.lower()
+    # Quick reject, the first character must exist
+    pos = lower.find(lower_pattern[0])
+    if pos == -1:
+        return None
+
+    total = 0
+    prev = -2
+    for i, char in enumerate(lower_pattern):
+        idx = lower.find(char, pos)
+        if idx == -1:
+            return None
+        if idx != prev + 1:
+            # Prefer a word start over a match in the middle of a word, as long as the rest
+            # of the pattern still matches after it
+            start = idx
+            while start != -1 and not is_boundary(candidate, start):
+                start = lower.find(char, start + 1)
+            if start != -1 and _is_subsequence(lower_pattern, i + 1, lower, start + 1):
+                idx = start
+        if idx == 0:
+            total += SCORE_START
+        elif idx == prev + 1:
+            total += SCORE_CONSECUTIVE
+        elif is_boundary(candidate, idx):
+            total += SCORE_BOUNDARY
+        if prev >= 0:
+            total -= min((idx - prev - 1) * PENALTY_GAP, PENALTY_GAP_MAX)
+        if candidate[idx] == pattern[i]:
+            total += SCORE_CASE
+        prev = idx
+        pos = idx + 1
+
+    if lower.startswith(lower_pattern):
+        total += SCORE_PREFIX
+    # Shorter candidates are closer matches
+    return total - (len(candidate) - len(pattern)) // 4
+
+
+def _is_subsequence(pattern, pattern_start, text, text_start):
+    """Return True if pattern[pattern_start:] is a subsequence of text[text_start:]."""
+    pos = text_start
+    for char in pattern[pattern_start:]:
+        pos = text.find(char, pos)
+        if pos == -1:
+            return False
+        pos += 1
+    return True
+
+
+def rank(pattern, items, key, limit, bonus=None):
+    """Return the limit best matching items, best first.
+
+    Only the best limit items are kept while scoring, using a heap, so the cost of the
+    remaining items is the scoring alone.
+
+    Args:
+        pattern(str): The typed pattern.
+        items(iterable): Items to rank.
+        key(callable): Return the text to match for an item.
+        limit(int): Max number of items returned.
+        bonus(callable): Optional, return extra score for a matching item.
+
+    Returns:
+        list: Matching items. Items with equal score keep their original order.
+    """
+    def scored():
+        for idx, item in enumerate(items):
+            value = score(pattern, key(item))
+            if value is None:
+                continue
+            if bonus:
+                value += bonus(item)
+            # -idx keeps the order stable and avoids comparing the items themselves
+            yield (value, -idx, item)
+
+    return [item for _, _, item in heapq.nlargest(limit, scored())]
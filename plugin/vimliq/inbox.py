@@ -0,0 +1,98 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Event inbox between the read thread and vim.
+
+Replies and notifications are put in the inbox by the read thread and handled by vim in
+process(). Events given a key replace a pending event with the same key, so only the latest
+e.g. diagnostics for a file are handled, however often the server publishes them. The inbox is
+bounded, when full the oldest keyed event is dropped. Events without a key, e.g. replies the
+client waits for, are never dropped, so with only those the inbox can grow past the bound.
+"""
+import collections
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+DEFAULT_MAX_SIZE = 1000
+
+
+class Inbox(object):
+    """Bounded, thread safe event queue with coalescing on key."""
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        """Initialize.
+
+        Args:
+            max_size(int): Max number of pending events.
+        """
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        # Entries are [key, event] lists so a pending event can be replaced in place
+        self._entries = collections.deque()
+        self._keyed = {}
+        self.coalesced = 0
+        self.dropped = 0
+
+    def put(self, event, key=None):
+        """Add an event.
+
+        Args:
+            event: The event.
+            key: Optional, hashable. Replaces a pending event with the same key, which keeps
+                its place in the queue.
+        """
+        with self._lock:
+            if key is not None:
+                entry = self._keyed.get(key)
+                if entry is not None:
+                    entry[1] = event
+                    self.coalesced += 1
+                    return
+            entry = [key, event]
+            self._entries.append(entry)
+            if key is not None:
+                self._keyed[key] = entry
+            if len(self._entries) > self._max_size:
+                self._drop_keyed()
+
+    def _drop_keyed(self):
+        """Drop the oldest keyed event, if any."""
+        for idx, (old_key, _) in enumerate(self._entries):
+            if old_key is not None:
+                del self._entries[idx]
+                del self._keyed[old_key]
+                self.dropped += 1
+                log.warning("Inbox full, dropped oldest keyed event. Dropped in total: %s",
+                            self.dropped)
+                return
+
+    def get_all(self):
+        """Remove and return all pending events, oldest first."""
+        with self._lock:
+            events = [event for _, event in self._entries]
+            self._entries.clear()
+            self._keyed.clear()
+        return events
+
+    def empty(self):
+        return not self._entries
+
+    def __len__(self):
+        return len(self._entries)
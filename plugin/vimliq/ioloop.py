@@ -0,0 +1,332 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Single I/O loop serving all server connections.
+
+All connections are multiplexed with selectors on one background thread, using non blocking
+reads and writes, instead of one blocked reader thread per server. Received messages are handed
+to the connection callback on the loop thread, which for the client means JsonRpc putting them
+in the client inbox. Vim picks them up from there in process(), which is the only way back to
+vim.
+
+Writes are made directly from the calling thread while the pipe accepts data. What does not fit
+is buffered and written by the loop when the pipe is writable, so a slow server never blocks
+vim. Messages from an outbox.Outbox are written by the loop, which takes everything added since
+the last wakeup in one write, and only when the pipe has room, letting the outbox order them
+until then.
+
+selectors is not available in python 2, os.set_blocking not before python 3.5 and pipes can not
+be selected on Windows. Check available() and fall back to base.LspBase with a reader thread per
+connection.
+"""
+import errno
+import logging
+import os
+import threading
+
+try:
+    import selectors
+except ImportError:
+    selectors = None
+
+import vimliq.base as base
+
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+READ_SIZE = 65536
+
+_READ = "read"
+_WRITE = "write"
+
+_default_loop = None
+
+
+def available():
+    """Return True if the I/O loop can be used."""
+    return selectors is not None and hasattr(os, "set_blocking") and os.name != "nt"
+
+
+def default_loop():
+    """Return the shared IOLoop, created on first use."""
+    global _default_loop  # pylint: disable=global-statement
+    if _default_loop is None:
+        _default_loop = IOLoop()
+    return _default_loop
+
+
+class Connection(object):
+    """A server connection served by an IOLoop.
+
+    Implements the transport interface of jsonrpc.JsonRpc. Messages are delivered by calling
+    the function passed to start from the loop thread.
+    """
+
+    def __init__(self, loop, read_fd, write_fd):
+        self.read_fd = read_fd
+        self.write_fd = write_fd
+        self.closed = False
+        self._loop = loop
+        self._parser = base.FrameParser()
+        self._out = bytearray()
+        self._lock = threading.Lock()
+        self._on_message = None
+        self._on_close = None
+        self._outbox = None
+        # True while the loop has been asked to write from the outbox
+        self._write_wanted = False
+
+    def start(self, on_message, on_close=None, outbox=None):
+        """Start reading.
+
+        Args:
+            on_message(callable): Called with each message body.
+            on_close(callable): Optional, called with the reason when the connection closes.
+            outbox(outbox.Outbox): Optional, write the messages added to it.
+        """
+        self._on_message = on_message
+        self._on_close = on_close
+        self._outbox = outbox
+        if outbox is not None:
+            outbox.set_listener(self._pump)
+        self._loop.add(self)
+
+    def send(self, body):
+        """Send message."""
+        self.send_many([body])
+
+    def send_many(self, bodies):
+        """Send several messages, written together."""
+        with self._lock:
+            if self.closed:
+                raise base.ServerDead("Connection is closed.")
+            waiting = bool(self._out)
+            self._out += _frames(bodies)
+            if waiting:
+                # The loop is already waiting for the pipe to become writable
+                return
+            self._write_or_wait()
+
+    def _pump(self):
+        """Have the loop write the messages added to the outbox.
+
+        Not written directly, so a burst of messages ends up in a few writes instead of one
+        write, and one wakeup of the server, per message.
+        """
+        with self._lock:
+            if self.closed or self._write_wanted:
+                return
+            self._write_wanted = True
+        self._loop.want_write(self)
+
+    def _write_or_wait(self):
+        """Write what the pipe takes, let the loop write the rest. Call with _lock held."""
+        try:
+            remaining = self._write_pending()
+        except OSError as exc:
+            log.error("Write to pipe failed. Exception: %s", exc)
+            raise base.ServerDead(exc)
+        if remaining:
+            self._loop.want_write(self)
+
+    def _write_pending(self):
+        """Write buffered data, then messages from the outbox, until the pipe is full.
+
+        Call with _lock held. Returns True if data remains to be written.
+        """
+        while True:
+            self._flush()
+            if self._out or self._outbox is None:
+                break
+            bodies = self._outbox.take()
+            if not bodies:
+                break
+            self._out += _frames(bodies)
+        return bool(self._out)
+
+    def _flush(self):
+        """Write as much as possible of the buffered data. Call with _lock held."""
+        while self._out:
+            try:
+                written = os.write(self.write_fd, self._out)
+            except OSError as exc:
+                if exc.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return
+                raise
+            del self._out[:written]
+
+    def _received(self, data):
+        for body in self._parser.feed(data):
+            log.log(5, "Recv: %s", body)
+            try:
+                self._on_message(body)
+            except Exception:  # pylint: disable=broad-except
+                log.exception("Message handler failed")
+
+
+class IOLoop(object):
+    """Selector loop running on a daemon thread, started with the first connection."""
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = os.pipe()
+        for fd in (self._wake_r, self._wake_w):
+            _set_nonblocking(fd)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        # Functions to run on the loop thread, added from other threads
+        self._pending = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def connection(self, read_fd, write_fd):
+        """Return a Connection for a server, call its start method to start reading."""
+        return Connection(self, read_fd, write_fd)
+
+    def add(self, conn):
+        """Start serving conn."""
+        _set_nonblocking(conn.read_fd)
+        _set_nonblocking(conn.write_fd)
+        self._call_soon(lambda: self._selector.register(
+            conn.read_fd, selectors.EVENT_READ, (conn, _READ)))
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="vimliq-ioloop")
+            self._thread.daemon = True
+            self._thread.start()
+
+    def want_write(self, conn):
+        """Write the data buffered in conn once the pipe is writable."""
+        self._call_soon(lambda: self._register_write(conn))
+
+    def _call_soon(self, func):
+        with self._lock:
+            self._pending.append(func)
+            if len(self._pending) > 1:
+                # A wakeup is pending already
+                return
+        try:
+            os.write(self._wake_w, b"x")
+        except OSError as exc:
+            # Full means a wakeup is pending already
+            if exc.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise
+
+    def _run(self):
+        while True:
+            self._run_pending()
+            for key, _ in self._selector.select():
+                if key.data is None:
+                    self._drain_wakeup()
+                    continue
+                conn, kind = key.data
+                if kind == _READ:
+                    self._read(conn)
+                else:
+                    self._write(conn)
+
+    def _run_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for func in pending:
+            try:
+                func()
+            except Exception:  # pylint: disable=broad-except
+                log.exception("I/O loop callback failed")
+
+    def _drain_wakeup(self):
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except OSError as exc:
+            if exc.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise
+
+    def _register_write(self, conn):
+        # pylint: disable=protected-access
+        with conn._lock:
+            conn._write_wanted = False
+            if conn.closed:
+                return
+            try:
+                remaining = conn._write_pending()
+            except OSError as exc:
+                error = exc
+            else:
+                error = None
+        if error is not None:
+            self._close(conn, error)
+            return
+        if not remaining:
+            return
+        try:
+            self._selector.register(conn.write_fd, selectors.EVENT_WRITE, (conn, _WRITE))
+        except KeyError:
+            # Already registered
+            pass
+
+    def _read(self, conn):
+        try:
+            data = os.read(conn.read_fd, READ_SIZE)
+        except OSError as exc:
+            if exc.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return
+            self._close(conn, exc)
+            return
+        if not data:
+            self._close(conn, "EOF from server.")
+            return
+        try:
+            conn._received(data)  # pylint: disable=protected-access
+        except (base.ServerDead, ValueError) as exc:
+            self._close(conn, exc)
+
+    def _write(self, conn):
+        # pylint: disable=protected-access
+        with conn._lock:
+            try:
+                remaining = conn._write_pending()
+            except OSError as exc:
+                error = exc
+            else:
+                error = None
+                if not remaining:
+                    self._selector.unregister(conn.write_fd)
+        if error is not None:
+            self._close(conn, error)
+
+    def _close(self, conn, reason):
+        # pylint: disable=protected-access
+        log.error("Connection closed. Reason: %s", reason)
+        with conn._lock:
+            conn.closed = True
+            del conn._out[:]
+        for fd in (conn.read_fd, conn.write_fd):
+            try:
+                self._selector.unregister(fd)
+            except (KeyError, ValueError, OSError):
+                pass
+        if conn._on_close:
+            conn._on_close(reason)
+
+
+def _frames(bodies):
+    raw = b"".join(base.LspBaseMsg(body).to_bytes() for body in bodies)
+    log.log(5, "Send: %s", raw)
+    return raw
+
+
+def _set_nonblocking(fd):
+    os.set_blocking(fd, False)
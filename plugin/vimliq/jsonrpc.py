@@ -17,6 +17,8 @@
 import json
 import logging
 import threading
+
+import vimliq.outbox as outbox
 try:
     import Queue as queue
 except ImportError:
@@ -32,6 +34,12 @@ ID = "id"
 RESULT = "result"
 ERROR = "error"
 
+CANCEL_REQUEST = "$/cancelRequest"
+
+# Error codes
+INTERNAL_ERROR = -32603
+METHOD_NOT_FOUND = -32601
+
 
 class JsonRpcException(Exception):
     """Raise on failures."""
@@ -49,52 +57,111 @@ class JsonRpc(object):
 
     Streaming json rpc class. The class supports both blocking and non blocking calls.
     Non blocking calls requires a callback to be passed in. The callback is called from
-    the "read thread".
+    the "read thread", or from the I/O loop thread for transports served by ioloop.IOLoop.
     """
 
-    def __init__(self, transport):
+    def __init__(self, transport, batch_arrays=False):
         """Create a JsonRpc object.
 
         Args:
-            transport: A object implementing "send(msg: str) and "recv() -> str". Where
-                str in both cases represents a json rpc message as a string.
+            transport: A object implementing "send_many(msgs: list)" and "recv() -> str".
+                Where str in both cases represents a json rpc message as a string. Messages
+                are written from a writer thread. Transports delivering and writing messages
+                themselves implement "start(on_message, on_close, outbox)" instead, see
+                ioloop.Connection.
+            batch_arrays(bool): If True batches are sent as one json rpc batch array. Only
+                use if the server supports it. Otherwise the messages of a batch are sent as
+                separate messages, but still in one write.
         """
         self._io = transport
+        self._batch_arrays = batch_arrays
         self._id = 34
         # _sync_id, _resp_map, _notification_map and _sync_id are all used in multiple threads
         # This is done since the read and write operations used are atomic.
         # See https://docs.python.org/3.7/faq/library.html#id17 for details.
         self._resp_map = {}
         self._notification_map = {}
-        self._read_thread = threading.Thread(target=self._msg_handler)
-        self._read_thread.daemon = True
-        self._read_thread.start()
+        self._request_map = {}
+        self._cancelled = set()
         self._sync_queue = queue.Queue()
         self._sync_id = None
+        # Set to the reason when the connection is lost
+        self._dead = None
+        # Messages are written by the transport or a writer thread, never by the caller
+        self._outbox = outbox.Outbox()
+        if hasattr(transport, "start"):
+            self._read_thread = None
+            transport.start(self._receive, self._closed, self._outbox)
+        else:
+            self._read_thread = threading.Thread(target=self._msg_handler)
+            self._read_thread.daemon = True
+            self._read_thread.start()
+            outbox.WriterThread(self._outbox, transport, self._closed).start()
 
     def register_notification_handler(self, method, handler):
         self._notification_map[method] = handler
 
+    def register_request_handler(self, method, handler):
+        """Register a handler for requests sent by the server.
+
+        The handler is called from the read thread with the request params and its return
+        value is sent back as the result. If it raises, an error is sent back. Requests
+        without a handler get a MethodNotFound error, so the server never waits for a reply.
+
+        Args:
+            method(str): The request method.
+            handler(callable): handler(params) -> result. Must not block.
+        """
+        self._request_map[method] = handler
+
     def call(self, method, params, notify=False):
         id_ = None if notify else self._get_id()
-        self._send(method, params, id_)
+        # Set before queueing, the reply may be received before _send returns
         self._sync_id = id_
         try:
-            response = self._sync_queue.get()
-        except queue.Empty:
-            response = (None, JsonRpcException("Timeout while waiting for sync reply"))
+            self._send(method, params, id_)
+            try:
+                response = self._sync_queue.get()
+            except queue.Empty:
+                response = (None, JsonRpcException("Timeout while waiting for sync reply"))
+        finally:
+            self._sync_id = None
         # If an exception is set raise it
         # See msg_handler for details
         if response[1]:
             raise response[1]
-        self._sync_id = None
         return response[0]
 
     def call_async(self, method, params, notify=False, callback=None):
+        """Send a request without waiting for the reply.
+
+        Returns:
+            int: The request id, None for notifications.
+        """
         id_ = None if notify else self._get_id()
         if callback:
             self._resp_map[id_] = callback
         self._send(method, params, id_)
+        return id_
+
+    def batch(self):
+        """Return a Batch, for sending several messages at once.
+
+        Example::
+
+            with rpc.batch() as batch:
+                batch.call_async("textDocument/didChange", params, notify=True)
+                batch.call_async("textDocument/completion", params, callback=callback)
+        """
+        return Batch(self)
+
+    def cancel(self, id_):
+        """Cancel an asynchronous request. Its callback will not be called."""
+        if self._resp_map.pop(id_, None) is None:
+            # Already replied
+            return
+        self._cancelled.add(id_)
+        self._send(CANCEL_REQUEST, {ID: id_})
 
     def _send(self, method, params, id_=None):
         """Send a message.
@@ -109,6 +176,56 @@ class JsonRpc(object):
             params (dict): JSON RPC params as a dict.
 
         """
+        self._send_messages([self._message(method, params, id_)])
+
+    def _send_messages(self, messages):
+        """Queue a list of messages, they are written together."""
+        if not messages:
+            return
+        if self._dead is not None:
+            raise JsonRpcException("Connection lost. Reason: {}".format(self._dead))
+        if len(messages) > 1 and self._batch_arrays:
+            messages = [messages]
+        self._outbox.put(messages)
+
+    def _reply(self, id_, result=None, error=None):
+        """Send the response to a server request."""
+        msg = {
+            "jsonrpc": "2.0",
+            "id": id_,
+        }
+        if error:
+            msg[ERROR] = error
+        else:
+            msg[RESULT] = result
+        try:
+            self._send_messages([msg])
+        except Exception as exc:  # pylint: disable=broad-except
+            log.error("Failed to reply to request %s. Exception: %s", id_, exc)
+
+    def _handle_request(self, msg):
+        """Call the registered handler for a server request and reply."""
+        id_ = msg[ID]
+        method = msg[METHOD]
+        handler = self._request_map.get(method)
+        if handler is None:
+            log.info("Unsupported request received. msg=%s", msg)
+            self._reply(id_, error={
+                "code": METHOD_NOT_FOUND,
+                "message": "Method not found: {}".format(method),
+            })
+            return
+        try:
+            result = handler(msg.get(PARAMS))
+        except Exception as exc:  # pylint: disable=broad-except
+            log.exception("Request handler for %s failed", method)
+            self._reply(id_, error={"code": INTERNAL_ERROR, "message": str(exc)})
+            return
+        self._reply(id_, result=result)
+
+    @staticmethod
+    def _message(method, params, id_=None):
+        """Return a json rpc message dict. See _send for args."""
         msg = {
             "jsonrpc": "2.0",
             "method": method,
@@ -116,45 +233,114 @@ class JsonRpc(object):
         }
         if id_:
             msg["id"] = id_
-
-        self._io.send(json.dumps(msg))
+        return msg
 
     def _msg_handler(self):
         """Msg handler."""
         while True:
             try:
-                msg = json.loads(self._io.recv())
+                raw = self._io.recv()
             except Exception as exc:  # pylint: disable=broad-except
-                log.error("Got exception from when reading. Giving up. Exception: %s", exc)
+                self._closed(exc)
                 # Returning will end the read thread
                 return
-            id_ = msg.get(ID)
-            # Requese
-            if id_:
-                result = msg.get(RESULT)
-                error = msg.get(ERROR)
-                exception = JsonRpcError(error) if error else None
+            self._receive(raw)
 
-                if id_ == self._sync_id:
-                    self._sync_queue.put((result, exception))
+    def _closed(self, reason):
+        log.error("Connection lost. Giving up. Exception: %s", reason)
+        self._dead = reason
+        if self._sync_id is not None:
+            # Do not leave a blocking call waiting forever
+            self._sync_queue.put((None, JsonRpcException("Connection lost.")))
 
-                else:
-                    handler = self._resp_map.pop(id_, None)
-                    if not handler:
-                        log.warning("Unsolisitated response. id=%s, msg=%s", id_, msg)
-                    else:
-                        handler(result, exception)
+    def _receive(self, raw):
+        """Decode and dispatch a received message."""
+        try:
+            msg = json.loads(raw)
+        except ValueError as exc:
+            log.error("Invalid json received. Exception: %s, msg=%s", exc, raw)
+            return
+        # A batch is an array of messages
+        if isinstance(msg, list):
+            for batch_msg in msg:
+                self._dispatch(batch_msg)
+        else:
+            self._dispatch(msg)
+
+    def _dispatch(self, msg):
+        """Dispatch one decoded message."""
+        if not isinstance(msg, dict):
+            log.warning("Invalid message. msg=%s", msg)
+            return
+        id_ = msg.get(ID)
+        # Request from the server, responses have no method
+        if METHOD in msg and ID in msg:
+            self._handle_request(msg)
+
+        # Response
+        elif id_:
+            result = msg.get(RESULT)
+            error = msg.get(ERROR)
+            exception = JsonRpcError(error) if error else None
+
+            if id_ == self._sync_id:
+                self._sync_queue.put((result, exception))
 
-            # Notification
             else:
-                method = msg.get(METHOD)
-                try:
-                    self._notification_map[method](msg[PARAMS], None)
-                except KeyError:
-                    log.info("Unsupported notification received. msg=%s", msg)
+                handler = self._resp_map.pop(id_, None)
+                if id_ in self._cancelled:
+                    self._cancelled.discard(id_)
+                elif not handler:
+                    log.warning("Unsolisitated response. id=%s, msg=%s", id_, msg)
+                else:
+                    handler(result, exception)
+
+        # Notification
+        else:
+            method = msg.get(METHOD)
+            try:
+                self._notification_map[method](msg[PARAMS], None)
+            except KeyError:
+                log.info("Unsupported notification received. msg=%s", msg)
 
     # Private functions
     def _get_id(self):
         """Get unique request id."""
         self._id += 1
         return self._id
+
+
+class Batch(object):
+    """Requests and notifications sent together when the batch is closed.
+
+    Created with JsonRpc.batch and used as a context manager. Nothing is sent if the with
+    block raises.
+    """
+
+    def __init__(self, rpc):
+        self._rpc = rpc
+        self._messages = []
+        self._ids = []
+
+    def call_async(self, method, params, notify=False, callback=None):
+        """Add a message to the batch, see JsonRpc.call_async."""
+        # pylint: disable=protected-access
+        id_ = None if notify else self._rpc._get_id()
+        if callback:
+            self._rpc._resp_map[id_] = callback
+            self._ids.append(id_)
+        self._messages.append(self._rpc._message(method, params, id_))
+        return id_
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # pylint: disable=protected-access
+        if exc_type is None:
+            self._rpc._send_messages(self._messages)
+        else:
+            for id_ in self._ids:
+                self._rpc._resp_map.pop(id_, None)
+        self._messages = []
+        self._ids = []
@@ -32,6 +32,7 @@ K_ERROR = "error"
 K_RESULT = "result"
 
 # Methods
+M_CANCEL_REQUEST = "$/cancelRequest"
 M_INITIALIZE = "initialize"
 M_INITIALIZED = "initialized"
 M_TD_DID_OPEN = "textDocument/didOpen"
@@ -40,15 +41,31 @@ M_TD_DID_CHANGE = "textDocument/didChange"
 M_TD_DID_CLOSE = "textDocument/didClose"
 M_DIAGNOSTICS = "textDocument/publishDiagnostics"
 M_TD_COMPLETION = "textDocument/completion"
+M_COMPLETION_RESOLVE = "completionItem/resolve"
 M_TD_REFERENCES = "textDocument/references"
 M_TD_DEFINITION = "textDocument/definition"
 M_TD_SYMBOLS = "textDocument/documentSymbol"
+M_WS_SYMBOLS = "workspace/symbol"
+M_TD_HOVER = "textDocument/hover"
+M_TD_DOCUMENT_HIGHLIGHT = "textDocument/documentHighlight"
+M_TD_FORMATTING = "textDocument/formatting"
+M_TD_RANGE_FORMATTING = "textDocument/rangeFormatting"
+M_TD_SIGNATURE_HELP = "textDocument/signatureHelp"
+M_TD_RENAME = "textDocument/rename"
+M_WS_DID_CHANGE_WATCHED_FILES = "workspace/didChangeWatchedFiles"
+M_WS_CONFIGURATION = "workspace/configuration"
+M_REGISTER_CAPABILITY = "client/registerCapability"
+M_UNREGISTER_CAPABILITY = "client/unregisterCapability"
+M_WORK_DONE_PROGRESS_CREATE = "window/workDoneProgress/create"
 
 # LSP Keys
 K_PROCESS_ID = "processId"
 K_ROOT_PATH = "rootPath"
 K_ROOT_URI = "rootUri"
 K_CAPABILITES = "capabilities"
+K_GENERAL = "general"
+K_POSITION_ENCODINGS = "positionEncodings"
+K_POSITION_ENCODING = "positionEncoding"
 
 K_TD = "textDocument"
 K_CONTENT_CHANGES = "contentChanges"
@@ -65,6 +82,7 @@ K_CHAR = "character"
 K_MESSAGE = "message"
 K_SOURCE = "source"
 K_CODE = "code"
+K_SEVERITY = "severity"
 K_POSITION = "position"
 K_ITEMS = "items"
 K_LABEL = "label"
@@ -73,6 +91,55 @@ K_DOCUMENTATION = "documentation"
 K_KIND = "kind"
 K_LOCATION = "location"
 K_NAME = "name"
+K_CONTAINER_NAME = "containerName"
+K_CHILDREN = "children"
+K_DOCUMENT_SYMBOL = "documentSymbol"
+K_HIERARCHICAL_DOCUMENT_SYMBOL_SUPPORT = "hierarchicalDocumentSymbolSupport"
+K_COMPLETION = "completion"
+K_COMPLETION_ITEM = "completionItem"
+K_COMPLETION_PROVIDER = "completionProvider"
+K_RESOLVE_PROVIDER = "resolveProvider"
+K_RESOLVE_SUPPORT = "resolveSupport"
+K_PROPERTIES = "properties"
+K_DOCUMENTATION_FORMAT = "documentationFormat"
+K_VALUE = "value"
+K_FILTER_TEXT = "filterText"
+K_SORT_TEXT = "sortText"
+K_PRESELECT = "preselect"
+K_TRIGGER_CHARACTERS = "triggerCharacters"
+K_CONTENTS = "contents"
+K_HOVER = "hover"
+K_CONTENT_FORMAT = "contentFormat"
+K_QUERY = "query"
+
+K_NEW_TEXT = "newText"
+K_OPTIONS = "options"
+K_TAB_SIZE = "tabSize"
+K_INSERT_SPACES = "insertSpaces"
+K_NEW_NAME = "newName"
+K_CHANGES = "changes"
+K_DOCUMENT_CHANGES = "documentChanges"
+K_EDITS = "edits"
+K_TYPE = "type"
+K_WORKSPACE = "workspace"
+K_WORKSPACE_EDIT = "workspaceEdit"
+K_SIGNATURE_HELP = "signatureHelp"
+K_SIGNATURE_HELP_PROVIDER = "signatureHelpProvider"
+K_RETRIGGER_CHARACTERS = "retriggerCharacters"
+K_SIGNATURE_INFORMATION = "signatureInformation"
+K_PARAMETER_INFORMATION = "parameterInformation"
+K_LABEL_OFFSET_SUPPORT = "labelOffsetSupport"
+K_SIGNATURES = "signatures"
+K_ACTIVE_SIGNATURE = "activeSignature"
+K_PARAMETERS = "parameters"
+K_TD_SYNC = "textDocumentSync"
+K_CHANGE = "change"
 
 K_CONTEXT = "context"
 K_INCLUDE_DECLARATION = "includeDeclaration"
+
+# TextDocumentSyncKind
+TD_SYNC_INCREMENTAL = 2
+
+# FileChangeType
+FILE_CHANGED = 2
@@ -0,0 +1,213 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Outgoing message queue.
+
+Messages wait here until the pipe to the server can take them, so callers never block on a busy
+server. The writer, the I/O loop or a writer thread, takes messages in this order:
+
+* Requests, replies and $/cancelRequest go ahead of other notifications. Notifications pending
+  for the same document as a request, or any request of a batch array, are sent right before
+  it, so the server has the current text.
+* Notifications are sent in the order they were added.
+
+A full text didChange replaces a didChange for the same document that has not been sent yet,
+since only the latest text matters.
+"""
+import collections
+import json
+import threading
+
+import vimliq.lsp as P
+
+# Max size of the bodies taken at once, on top of the first message
+TAKE_SIZE = 65536
+
+
+class _Entry(object):
+    __slots__ = ("method", "uri", "body", "uris")
+
+    def __init__(self, method, uri, body, uris=()):
+        self.method = method
+        self.uri = uri
+        self.body = body
+        # For urgent entries, the documents of all messages in the entry
+        self.uris = uris
+
+
+class Outbox(object):
+    """Thread safe priority queue of outgoing messages."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._urgent = collections.deque()
+        self._bulk = collections.deque()
+        # uri -> last notification entry for the uri in _bulk
+        self._last_bulk = {}
+        self._listener = None
+        self.collapsed = 0
+
+    def set_listener(self, listener):
+        """Call listener() after messages have been added."""
+        self._listener = listener
+
+    def put(self, messages):
+        """Add messages.
+
+        Args:
+            messages(list): Json rpc message dicts, or lists of dicts for batch arrays.
+        """
+        with self._cond:
+            for msg in messages:
+                self._put(msg)
+            self._cond.notify()
+        if self._listener:
+            self._listener()
+
+    def _put(self, msg):
+        body = json.dumps(msg)
+        if isinstance(msg, list):
+            # A batch array is sent as is
+            urgent = any(_urgent(item) for item in msg)
+            method = uri = None
+            uris = [item_uri for item_uri in (_uri(item) for item in msg) if item_uri]
+        else:
+            urgent = _urgent(msg)
+            method = msg.get(P.K_METHOD)
+            uri = _uri(msg)
+            uris = [uri] if uri else []
+        if urgent:
+            self._urgent.append(_Entry(method, uri, body, uris))
+            return
+
+        last = self._last_bulk.get(uri)
+        if (last is not None and method == last.method == P.M_TD_DID_CHANGE and
+                _full_text(msg)):
+            last.body = body
+            self.collapsed += 1
+            return
+        entry = _Entry(method, uri, body)
+        self._bulk.append(entry)
+        if uri is not None:
+            self._last_bulk[uri] = entry
+
+    def take(self):
+        """Remove and return message bodies to write next, in send order.
+
+        All pending requests are taken, but notifications only up to about TAKE_SIZE bytes so
+        requests added meanwhile can still go ahead of the rest.
+        """
+        with self._cond:
+            return self._take()
+
+    def wait_take(self, timeout=None):
+        """Like take, but wait up to timeout seconds for messages."""
+        with self._cond:
+            if not self._urgent and not self._bulk:
+                self._cond.wait(timeout)
+            return self._take()
+
+    def _take(self):
+        bodies = []
+        while self._urgent:
+            entry = self._urgent.popleft()
+            for uri in entry.uris:
+                if uri in self._last_bulk:
+                    bodies.extend(self._take_bulk(uri))
+            bodies.append(entry.body)
+        size = 0
+        while self._bulk and (size < TAKE_SIZE or not bodies):
+            entry = self._bulk.popleft()
+            self._forget(entry)
+            bodies.append(entry.body)
+            size += len(entry.body)
+        return bodies
+
+    def _take_bulk(self, uri):
+        """Remove and return pending notifications for uri."""
+        bodies = []
+        keep = collections.deque()
+        for entry in self._bulk:
+            if entry.uri == uri:
+                bodies.append(entry.body)
+            else:
+                keep.append(entry)
+        self._bulk = keep
+        del self._last_bulk[uri]
+        return bodies
+
+    def _forget(self, entry):
+        if entry.uri is not None and self._last_bulk.get(entry.uri) is entry:
+            del self._last_bulk[entry.uri]
+
+    def __len__(self):
+        return len(self._urgent) + len(self._bulk)
+
+
+class WriterThread(object):
+    """Write messages from an Outbox to a blocking transport on a daemon thread."""
+
+    def __init__(self, outbox, transport, on_error=None):
+        """Initialize.
+
+        Args:
+            outbox(Outbox): Messages to write.
+            transport: Object with a send_many(bodies) method.
+            on_error(callable): Optional, called with the exception if writing fails, which
+                also stops the thread.
+        """
+        self._outbox = outbox
+        self._transport = transport
+        self._on_error = on_error
+        self._thread = threading.Thread(target=self._run, name="vimliq-writer")
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            bodies = self._outbox.wait_take()
+            if not bodies:
+                continue
+            try:
+                self._transport.send_many(bodies)
+            except Exception as exc:  # pylint: disable=broad-except
+                if self._on_error:
+                    self._on_error(exc)
+                return
+
+
+def _urgent(msg):
+    """Return True for requests, replies and cancellations."""
+    return P.K_ID in msg or msg.get(P.K_METHOD, P.M_CANCEL_REQUEST) == P.M_CANCEL_REQUEST
+
+
+def _uri(msg):
+    params = msg.get(P.K_PARAMS)
+    if not isinstance(params, dict):
+        return None
+    text_document = params.get(P.K_TD)
+    if not isinstance(text_document, dict):
+        return None
+    return text_document.get(P.K_URI)
+
+
+def _full_text(msg):
+    """Return True if msg is a didChange replacing the whole text."""
+    changes = msg[P.K_PARAMS].get(P.K_CONTENT_CHANGES, [])
+    return bool(changes) and all(P.K_RANGE not in change for change in changes)
@@ -0,0 +1,163 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Persistent cache of server results, for a warm start.
+
+Results like diagnostics and document symbols are stored in a sqlite database keyed on file
+path and a hash of the file content. When a file is opened with the same content again the
+stored results can be shown at once, marked stale until the server has sent new ones.
+
+The cache is limited in size, the least recently used entries are evicted first. Failures only
+disable the cache, they never stop the client.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+DIAGNOSTICS = "diagnostics"
+SYMBOLS = "symbols"
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+# Entries evicted at a time when the cache is full
+EVICT_BATCH = 50
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (path, kind)
+)
+"""
+_INDEX = "CREATE INDEX IF NOT EXISTS entries_used ON entries (used)"
+
+
+def content_hash(data):
+    """Return the hash of file content data (bytes)."""
+    return hashlib.sha1(data).hexdigest()
+
+
+class PersistentCache(object):
+    """sqlite backed store of json results per (path, kind), valid for one content hash."""
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        """Open, or create, the cache.
+
+        Args:
+            path(str): Database file.
+            max_bytes(int): Max total size of the stored results.
+        """
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._db = None
+        try:
+            directory = os.path.dirname(path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            # A lost write only costs a cache miss
+            self._db.execute("PRAGMA synchronous=OFF")
+            self._db.execute(_SCHEMA)
+            self._db.execute(_INDEX)
+            self._size = self._db.execute(
+                "SELECT COALESCE(SUM(LENGTH(data)), 0) FROM entries").fetchone()[0]
+        except (sqlite3.Error, OSError) as exc:
+            self._disable(exc)
+
+    @property
+    def enabled(self):
+        return self._db is not None
+
+    def get(self, path, hash_, kind):
+        """Return the result stored for path and kind if stored for content hash_, else None."""
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT data FROM entries WHERE path=? AND kind=? AND hash=?",
+                (path, kind, hash_)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE entries SET used=? WHERE path=? AND kind=?",
+                             (time.time(), path, kind))
+            self._db.commit()
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as exc:
+            self._disable(exc)
+            return None
+
+    def put(self, path, hash_, kind, result):
+        """Store result for path and kind, replacing what was stored for other content."""
+        if self._db is None:
+            return
+        data = json.dumps(result, separators=(",", ":"))
+        if len(data) > self._max_bytes:
+            return
+        try:
+            old = self._db.execute("SELECT LENGTH(data) FROM entries WHERE path=? AND kind=?",
+                                   (path, kind)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                             (path, kind, hash_, data, time.time()))
+            self._size += len(data) - (old[0] if old else 0)
+            if self._size > self._max_bytes:
+                self._evict()
+            self._db.commit()
+        except sqlite3.Error as exc:
+            self._disable(exc)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __len__(self):
+        if self._db is None:
+            return 0
+        return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _evict(self):
+        """Delete least recently used entries until the size limit is met."""
+        while self._size > self._max_bytes:
+            rows = self._db.execute(
+                "SELECT path, kind, LENGTH(data) FROM entries ORDER BY used LIMIT ?",
+                (EVICT_BATCH,)).fetchall()
+            if not rows:
+                self._size = 0
+                return
+            for path, kind, size in rows:
+                self._db.execute("DELETE FROM entries WHERE path=? AND kind=?", (path, kind))
+                self._size -= size
+                if self._size <= self._max_bytes:
+                    break
+        log.debug("Evicted cache entries, size is now %s bytes", self._size)
+
+    def _disable(self, exc):
+        log.error("Persistent cache disabled. Error: %s", exc)
+        if self._db is not None:
+            try:
+                self._db.close()
+            except sqlite3.Error:
+                pass
+        self._db = None
@@ -0,0 +1,170 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+"""Conversion between vim byte columns and LSP characters.
+
+Vim columns are byte offsets in the UTF-8 encoded line while LSP positions count UTF-16 code
+units, unless another position encoding has been negotiated. For ASCII lines the two are the
+same, for other lines a table with the offsets of every character is built. Tables for buffer
+lines are cached until b:changedtick changes.
+"""
+import bisect
+
+import vim
+
+UTF8 = "utf-8"
+UTF16 = "utf-16"
+UTF32 = "utf-32"
+# In order of preference, UTF-8 needs no conversion at all
+SUPPORTED_ENCODINGS = [UTF8, UTF16, UTF32]
+
+
+class _LineTable(object):
+    """Byte and code unit offset of the start of every character in a line."""
+
+    __slots__ = ("bytes", "units")
+
+    def __init__(self, text, encoding):
+        self.bytes = [0]
+        self.units = [0]
+        for char in text:
+            code = ord(char)
+            if code < 0x80:
+                size = 1
+            elif code < 0x800:
+                size = 2
+            elif code < 0x10000:
+                size = 3
+            else:
+                size = 4
+            self.bytes.append(self.bytes[-1] + size)
+            if encoding == UTF16 and code >= 0x10000:
+                self.units.append(self.units[-1] + 2)
+            else:
+                self.units.append(self.units[-1] + 1)
+
+    def to_byte(self, character):
+        idx = bisect.bisect_left(self.units, character)
+        if idx >= len(self.units):
+            # Past end of line, keep the overshoot
+            return self.bytes[-1] + character - self.units[-1]
+        return self.bytes[idx]
+
+    def to_lsp(self, byte_col):
+        idx = bisect.bisect_right(self.bytes, byte_col) - 1
+        if idx == len(self.bytes) - 1:
+            return self.units[-1] + byte_col - self.bytes[-1]
+        return self.units[idx]
+
+
+def line_table(text, encoding):
+    """Return the conversion table for text, None if no conversion is needed.
+
+    Args:
+        text(str|bytes): Line text, bytes are decoded as UTF-8.
+        encoding(str): The negotiated position encoding.
+    """
+    if encoding == UTF8:
+        return None
+    if isinstance(text, bytes):
+        decoded = text.decode("utf-8", "replace")
+        if len(decoded) == len(text):
+            return None
+        text = decoded
+    elif len(text.encode("utf-8")) == len(text):
+        return None
+    return _LineTable(text, encoding)
+
+
+def to_byte(text, character, encoding):
+    """Convert an LSP character offset in text to a byte column."""
+    table = line_table(text, encoding)
+    return character if table is None else table.to_byte(character)
+
+
+def to_lsp(text, byte_col, encoding):
+    """Convert a byte column in text to an LSP character offset."""
+    table = line_table(text, encoding)
+    return byte_col if table is None else table.to_lsp(byte_col)
+
+
+class _BufferTables(object):
+    """Lazily built line tables for one buffer at one changedtick."""
+
+    def __init__(self, buf, changedtick, encoding):
+        self.changedtick = changedtick
+        self._buf = buf
+        self._encoding = encoding
+        self._tables = {}
+
+    def to_byte(self, line, character):
+        table = self._table(line)
+        return character if table is None else table.to_byte(character)
+
+    def to_lsp(self, line, byte_col):
+        table = self._table(line)
+        return byte_col if table is None else table.to_lsp(byte_col)
+
+    def _table(self, line):
+        try:
+            return self._tables[line]
+        except KeyError:
+            pass
+        table = None
+        if 0 <= line < len(self._buf):
+            table = line_table(self._buf[line], self._encoding)
+        self._tables[line] = table
+        return table
+
+
+class PositionEncoder(object):
+    """Position conversion for the negotiated position encoding."""
+
+    def __init__(self, encoding=UTF16):
+        self._buffers = {}
+        self.encoding = encoding
+
+    @property
+    def encoding(self):
+        return self._encoding
+
+    @encoding.setter
+    def encoding(self, encoding):
+        self._encoding = encoding if encoding in SUPPORTED_ENCODINGS else UTF16
+        self._buffers = {}
+
+    def buffer(self, buf):
+        """Return converter for lines of vim buffer buf.
+
+        The returned object has to_byte(line, character) and to_lsp(line, byte_col), with
+        zero based lines, and is valid until the buffer changes.
+        """
+        changedtick = vim.eval("getbufvar({}, 'changedtick')".format(buf.number))
+        tables = self._buffers.get(buf.number)
+        if tables is None or tables.changedtick != changedtick:
+            tables = _BufferTables(buf, changedtick, self._encoding)
+            self._buffers[buf.number] = tables
+        return tables
+
+    def forget(self, bufnr):
+        """Drop cached tables for a buffer, e.g. when it is unloaded."""
+        self._buffers.pop(bufnr, None)
+
+    def to_byte(self, text, character):
+        return to_byte(text, character, self._encoding)
+
+    def to_lsp(self, text, byte_col):
+        return to_lsp(text, byte_col, self._encoding)
@@ -0,0 +1,138 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+"""Streamed quickfix population.
+
+Large location lists (e.g. references to a commonly used symbol) are written to the quickfix
+list in fixed size chunks, one chunk per timer tick, instead of as one huge setqflist() call.
+The quickfix list is global in vim, hence there is only one stream shared by all clients.
+"""
+import logging
+
+import vim
+
+import vimliq.vimutils as V
+
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_INTERVAL = 20
+
+
+class QuickfixStream(object):
+    """Fill the quickfix list chunk by chunk.
+
+    The window is opened as soon as the first chunk is set. The remaining chunks are appended
+    from a vim timer calling tick(). Starting a new stream, or anyone else creating a new
+    quickfix list, cancels the ongoing population.
+    """
+
+    def __init__(self, chunk_size=None, interval=None):
+        """Initialize.
+
+        Args:
+            chunk_size(int): Items per setqflist() call. Read from g:langIQ_quickfix_chunk
+                if not provided.
+            interval(int): Milliseconds between chunks. Read from g:langIQ_quickfix_interval
+                if not provided.
+        """
+        self._chunk_size = chunk_size
+        self._interval = interval
+        self._items = None
+        self._pos = 0
+        self._qf_id = None
+        self._timer = None
+
+    @property
+    def active(self):
+        """True if there are still items left to add."""
+        return self._items is not None
+
+    def start(self, items, title=""):
+        """Replace the quickfix list with items and open the quickfix window.
+
+        Args:
+            items(list): List of quickfix dicts.
+            title(str): Title of the quickfix list.
+        """
+        self.cancel()
+        chunk_size = self._get_chunk_size()
+        V.set_quickfix(items[:chunk_size], title=title)
+        V.open_quickfix()
+        if len(items) <= chunk_size:
+            return
+
+        self._qf_id = V.quickfix_id()
+        self._items = items
+        self._pos = chunk_size
+        interval = self._interval or _setting("g:langIQ_quickfix_interval", DEFAULT_INTERVAL)
+        self._timer = vim.eval(
+            "timer_start({}, 'LspQuickfixTick', {{'repeat': -1}})".format(interval))
+        log.debug("Streaming %s items to quickfix list %s", len(items), self._qf_id)
+
+    def tick(self):
+        """Append the next chunk. Called from a vim timer."""
+        if not self.active:
+            self._stop_timer()
+            return
+
+        # Someone else created a new list, the result we are adding is no longer wanted
+        if V.quickfix_id() != self._qf_id:
+            log.debug("Quickfix list %s replaced, cancel population", self._qf_id)
+            self.cancel()
+            return
+
+        end = self._pos + self._get_chunk_size()
+        V.set_quickfix(self._items[self._pos:end], action="a", qf_id=self._qf_id)
+        self._pos = end
+        if self._pos >= len(self._items):
+            self.cancel()
+
+    def cancel(self):
+        """Stop adding items to the quickfix list."""
+        self._items = None
+        self._pos = 0
+        self._qf_id = None
+        self._stop_timer()
+
+    def _stop_timer(self):
+        if self._timer is not None:
+            vim.eval("timer_stop({})".format(self._timer))
+            self._timer = None
+
+    def _get_chunk_size(self):
+        return self._chunk_size or _setting("g:langIQ_quickfix_chunk", DEFAULT_CHUNK_SIZE)
+
+
+def _setting(name, default):
+    """Return integer setting name, or default if it is not set."""
+    if vim.eval("exists('{}')".format(name)) == "1":
+        return int(vim.eval(name))
+    return default
+
+
+stream = QuickfixStream()
+
+
+def display(items, title=""):
+    """Display items in the quickfix window, streaming large lists."""
+    stream.start(items, title)
+
+
+def tick():
+    """Append next chunk of the ongoing population, if any."""
+    stream.tick()
@@ -0,0 +1,141 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Deferred rendering of diagnostics.
+
+Diagnostics for buffers not shown in any window are only stored, and rendered when the buffer
+is shown (BufWinEnter). For shown buffers the signs on the lines visible in a window are placed
+at once, the rest a chunk per tick. Placing a sign is one vim command, which adds up for files
+with many diagnostics.
+"""
+import collections
+import logging
+
+import vimliq.diagnostics as diagnostics
+import vimliq.vimutils as V
+
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+SIGN_NAME = "LspSign"
+SIGNS_PER_TICK = 200
+MAX_SIGN_ID = 65000
+
+
+class DiagnosticRenderer(object):
+    """Render signs and highlights for diagnostics when, and where, they can be seen."""
+
+    def __init__(self, file_diagnostics, highlight=None, use_signs=True, per_tick=SIGNS_PER_TICK):
+        """Initialize.
+
+        Args:
+            file_diagnostics(dict): filename -> diagnostics.FileDiagnostics, shared with the
+                client.
+            highlight(callable): Optional, highlight(filename) highlights the diagnostics in
+                the windows showing filename.
+            use_signs(bool): Place signs.
+            per_tick(int): Max number of signs placed per tick.
+        """
+        self._diagnostics = file_diagnostics
+        self._highlight = highlight
+        self._use_signs = use_signs
+        self._per_tick = per_tick
+        # Files with diagnostics not rendered since they are not shown
+        self._hidden = set()
+        # filename -> lines still without sign
+        self._pending_signs = collections.OrderedDict()
+        self._sign_id = 0
+
+    def update(self, filename):
+        """Render the diagnostics of filename, or defer until it is shown."""
+        bufnr = V.bufnr(filename)
+        ranges = V.visible_ranges(bufnr) if bufnr > 0 else []
+        if not ranges:
+            log.debug("Defer diagnostics for hidden %s", filename)
+            self._hidden.add(filename)
+            self._pending_signs.pop(filename, None)
+            return
+        self._hidden.discard(filename)
+        if self._highlight:
+            self._highlight(filename)
+        if self._use_signs:
+            self._render_signs(filename, ranges)
+
+    def shown(self, filename):
+        """Render deferred diagnostics, call when filename is shown in a window."""
+        if filename in self._hidden:
+            self.update(filename)
+
+    def unloaded(self, filename):
+        """Signs go with an unloaded buffer, render again when it is shown."""
+        self._pending_signs.pop(filename, None)
+        if filename in self._diagnostics:
+            self._hidden.add(filename)
+
+    def tick(self):
+        """Place the next chunk of pending signs."""
+        budget = self._per_tick
+        while self._pending_signs and budget > 0:
+            filename, lines = next(iter(self._pending_signs.items()))
+            self._place_signs(filename, lines[:budget])
+            if len(lines) > budget:
+                self._pending_signs[filename] = lines[budget:]
+            else:
+                del self._pending_signs[filename]
+            budget -= len(lines)
+
+    def render_signs(self, filename):
+        """Place all signs for filename at once."""
+        self._pending_signs.pop(filename, None)
+        V.clear_signs(filename)
+        self._place_signs(filename, self._lines(filename))
+
+    def _render_signs(self, filename, ranges):
+        V.clear_signs(filename)
+        visible = []
+        rest = []
+        for line in self._lines(filename):
+            if any(top <= line <= bottom for top, bottom in ranges):
+                visible.append(line)
+            else:
+                rest.append(line)
+        self._place_signs(filename, visible)
+        # Replaces signs pending from older diagnostics
+        self._pending_signs.pop(filename, None)
+        if rest:
+            self._pending_signs[filename] = rest
+
+    def _lines(self, filename):
+        """Return sorted one based lines with diagnostics, one sign per line is enough."""
+        return [line + 1 for line in self._diagnostics.get(filename, diagnostics.EMPTY).lines()]
+
+    def _place_signs(self, filename, lines):
+        if not lines:
+            return
+        used = V.placed_sign_ids(filename)
+        for line in lines:
+            V.place_sign(self._next_sign_id(used), line, SIGN_NAME, filename)
+
+    def _next_sign_id(self, used):
+        self._sign_id += 1
+        while self._sign_id in used:
+            self._sign_id += 1
+        # cap at an arbitrary figure just for the sake of it
+        if self._sign_id > MAX_SIGN_ID:
+            self._sign_id = 1
+            return self._next_sign_id(used)
+        return self._sign_id
@@ -0,0 +1,127 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+"""Signature help.
+
+The call around the cursor, and the argument the cursor is in, are found locally from the text
+before the cursor. A signatureHelp result is kept for its call, so moving between the arguments
+of that call only moves the highlight of the active parameter.
+"""
+import re
+
+import vimliq.lsp as P
+
+# Lines before the cursor searched for the start of the call
+MAX_LINES = 20
+ACTIVE_GROUP = "LspSignatureActiveParameter"
+
+_OPEN = "([{"
+_CLOSE = ")]}"
+_QUOTES = "'\""
+_CALLEE = re.compile(r"([\w.]*)\s*$")
+
+
+def find_call(lines):
+    """Find the innermost call containing the end of lines.
+
+    Brackets and commas in string literals are skipped. A "(" is a call if it follows a name,
+    or a closing bracket as in "f()(x)".
+
+    Args:
+        lines(list): Lines up to the cursor, the last line ends at the cursor.
+
+    Returns:
+        tuple: ((line index, column) of the "(", callee text, active argument index), or None
+            if the cursor is not in a call.
+    """
+    # Open brackets as [bracket, line index, column, comma count]
+    stack = []
+    for line_idx, line in enumerate(lines):
+        quote = None
+        escaped = False
+        for col, char in enumerate(line):
+            if quote:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == quote:
+                    quote = None
+            elif char in _QUOTES:
+                quote = char
+            elif char in _OPEN:
+                stack.append([char, line_idx, col, 0])
+            elif char in _CLOSE:
+                if stack:
+                    stack.pop()
+            elif char == "," and stack:
+                stack[-1][3] += 1
+
+    for bracket, line_idx, col, commas in reversed(stack):
+        if bracket != "(":
+            continue
+        before = lines[line_idx][:col]
+        callee = _CALLEE.search(before).group(1)
+        if callee or before.rstrip()[-1:] in (")", "]"):
+            return (line_idx, col), callee, commas
+    return None
+
+
+def chunks(signature_help, active):
+    """Return the signature as (text, highlight group or None) chunks.
+
+    Args:
+        signature_help(dict): SignatureHelp result.
+        active(int): Index of the argument the cursor is in.
+
+    Returns:
+        list: Chunks with the active parameter in ACTIVE_GROUP. Empty if there is no signature.
+    """
+    signatures = signature_help.get(P.K_SIGNATURES) or []
+    if not signatures:
+        return []
+    index = min(signature_help.get(P.K_ACTIVE_SIGNATURE) or 0, len(signatures) - 1)
+    # Overloads: prefer one with enough parameters for the argument typed
+    if len(signatures[index].get(P.K_PARAMETERS) or []) <= active:
+        for idx, sig in enumerate(signatures):
+            if len(sig.get(P.K_PARAMETERS) or []) > active:
+                index = idx
+                break
+    signature = signatures[index]
+    label = signature[P.K_LABEL].replace("\n", " ")
+    found = _parameter_range(label, signature.get(P.K_PARAMETERS) or [], active)
+    if found is None:
+        return [(label, None)]
+    start, end = found
+    return [(label[:start], None), (label[start:end], ACTIVE_GROUP), (label[end:], None)]
+
+
+def _parameter_range(label, parameters, active):
+    """Return (start, end) of parameter active in the signature label, None if not found."""
+    if active >= len(parameters):
+        return None
+    pos = label.find("(") + 1
+    for param in parameters[:active + 1]:
+        param_label = param[P.K_LABEL]
+        if isinstance(param_label, list):
+            start, end = param_label
+        else:
+            start = label.find(param_label, pos)
+            if start == -1:
+                return None
+            end = start + len(param_label)
+        pos = end
+    return start, end
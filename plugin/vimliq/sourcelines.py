@@ -0,0 +1,175 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+"""Source line lookup.
+
+Used to add the text of a line to quickfix entries. Files are memory mapped and the line
+offsets are indexed lazily, only as far as the highest line asked for. Mapped files are kept in
+a small LRU cache and are invalidated when mtime or size changes. Files loaded in vim are read
+from the buffer instead, since the buffer might differ from what is on disk.
+"""
+import array
+import collections
+import logging
+import mmap
+import os
+
+import vimliq.vimutils as V
+
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+DEFAULT_MAX_FILES = 64
+
+
+class _MappedFile(object):
+    """A memory mapped file with a lazily built line offset index."""
+
+    __slots__ = ("mtime", "size", "_map", "_offsets", "_indexed")
+
+    def __init__(self, path, stat):
+        self.mtime = stat.st_mtime
+        self.size = stat.st_size
+        self._map = None
+        # _offsets[i] is the offset where line i starts
+        self._offsets = array.array("l", [0])
+        self._indexed = True
+        if self.size:
+            with open(path, "rb") as file_:
+                self._map = mmap.mmap(file_.fileno(), 0, access=mmap.ACCESS_READ)
+            self._indexed = False
+
+    def line(self, lnum):
+        """Return line lnum (zero based) as bytes, or None if there is no such line."""
+        if self._map is None:
+            return None
+        offsets = self._offsets
+        # Index up to and including the start of the line after lnum
+        while not self._indexed and len(offsets) <= lnum + 1:
+            pos = self._map.find(b"\n", offsets[-1])
+            if pos == -1:
+                self._indexed = True
+            else:
+                offsets.append(pos + 1)
+
+        if lnum >= len(offsets) or offsets[lnum] >= self.size:
+            return None
+        end = offsets[lnum + 1] if lnum + 1 < len(offsets) else self.size
+        return self._map[offsets[lnum]:end].rstrip(b"\r\n")
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class SourceLines(object):
+    """Line lookup for files on disk and in loaded vim buffers."""
+
+    def __init__(self, max_files=DEFAULT_MAX_FILES):
+        """Initialize.
+
+        Args:
+            max_files(int): Max number of files kept mapped.
+        """
+        self._max_files = max_files
+        self._files = collections.OrderedDict()
+
+    def fill_text(self, qf_content):
+        """Set "text" on quickfix items lacking it.
+
+        Args:
+            qf_content(list): Quickfix dicts with "filename" and one based "lnum".
+        """
+        get_line = self.reader()
+        for item in qf_content:
+            if "text" in item:
+                continue
+            text = get_line(item["filename"], item["lnum"] - 1)
+            if text is not None:
+                item["text"] = text.strip()
+
+    def get_line(self, filename, lnum):
+        """Return line lnum (zero based) of filename, or None if not available."""
+        return self.reader()(filename, lnum)
+
+    def reader(self):
+        """Return a function(filename, lnum) -> line, for many lookups in a row.
+
+        Loaded buffers are looked up once, so the function should not be kept around.
+        """
+        buffers = V.loaded_buffers()
+        mapped_files = {}
+
+        def get_line(filename, lnum):
+            if lnum < 0:
+                return None
+            buf = buffers.get(filename)
+            if buf is not None:
+                return _decode(buf[lnum]) if lnum < len(buf) else None
+            if filename not in mapped_files:
+                mapped_files[filename] = self._get_file(filename)
+            mapped = mapped_files[filename]
+            line = mapped.line(lnum) if mapped is not None else None
+            return _decode(line) if line is not None else None
+
+        return get_line
+
+    def clear(self):
+        """Unmap all files."""
+        for mapped in self._files.values():
+            mapped.close()
+        self._files.clear()
+
+    def _get_file(self, filename):
+        """Return the mapped file, remapping it if it has changed on disk."""
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            self._evict(filename)
+            return None
+
+        mapped = self._files.get(filename)
+        if mapped is not None:
+            if mapped.mtime == stat.st_mtime and mapped.size == stat.st_size:
+                # Mark as most recently used
+                del self._files[filename]
+                self._files[filename] = mapped
+                return mapped
+            self._evict(filename)
+
+        try:
+            mapped = _MappedFile(filename, stat)
+        except (OSError, IOError, ValueError) as exc:
+            log.debug("Failed to map %s. Error: %s", filename, exc)
+            return None
+
+        self._files[filename] = mapped
+        while len(self._files) > self._max_files:
+            _, oldest = self._files.popitem(last=False)
+            oldest.close()
+        return mapped
+
+    def _evict(self, filename):
+        mapped = self._files.pop(filename, None)
+        if mapped is not None:
+            mapped.close()
+
+
+def _decode(text):
+    if isinstance(text, bytes) and str is not bytes:
+        return text.decode("utf-8", "replace")
+    return text
@@ -0,0 +1,133 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq.is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq.is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Pool of pre-spawned standby servers.
+
+Starting a server process and having it import everything takes seconds. The pool keeps started,
+but not initialized, server processes ready for each configured language. A new client takes a
+standby server, which is then replaced by starting a new process, warming up while vim goes on.
+
+The resident memory of the standby servers is checked on every tick, and standby servers are
+stopped while the total exceeds the memory cap. Memory is read from /proc, where that is not
+available the cap is not enforced.
+"""
+import logging
+import time
+
+import vimliq.base as base
+
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+DEFAULT_MAX_MB = 500
+# Seconds between memory checks
+CHECK_INTERVAL = 10
+
+
+class StandbyPool(object):
+    """Started, not initialized, servers per start command."""
+
+    def __init__(self, size=0, max_mb=DEFAULT_MAX_MB):
+        """Initialize.
+
+        Args:
+            size(int): Number of standby servers per start command, 0 disables the pool.
+            max_mb(int): Max total resident memory, in MB, of all standby servers.
+        """
+        self._size = size
+        self._max_bytes = max_mb * 1024 * 1024
+        # tuple(start_cmd) -> list of connected base.StdIO
+        self._standby = {}
+        # (tuple(start_cmd), base.StdIO) of all standby servers, in the order started
+        self._started = []
+        self._last_check = 0
+
+    @property
+    def enabled(self):
+        return self._size > 0
+
+    def fill(self, start_cmd):
+        """Start servers until there are size standby servers for start_cmd."""
+        if not self.enabled:
+            return
+        servers = self._standby.setdefault(tuple(start_cmd), [])
+        while len(servers) < self._size:
+            if self._max_bytes and self.memory() >= self._max_bytes:
+                log.info("Standby servers use %s bytes, not starting more", self.memory())
+                return
+            io = base.StdIO(start_cmd)
+            try:
+                io.connect()
+            except (OSError, IOError) as exc:
+                log.error("Failed to start standby server %s. Error: %s", start_cmd, exc)
+                return
+            log.debug("Started standby server %s, pid %s", start_cmd, io.pid)
+            servers.append(io)
+            self._started.append((tuple(start_cmd), io))
+
+    def take(self, start_cmd):
+        """Return a connected standby server for start_cmd, or None, and start a replacement."""
+        if not self.enabled:
+            return None
+        servers = self._standby.get(tuple(start_cmd), [])
+        io = None
+        while servers and io is None:
+            io = servers.pop(0)
+            self._started.remove((tuple(start_cmd), io))
+            if not io.alive():
+                log.warning("Standby server %s, pid %s, has died", start_cmd, io.pid)
+                io.close()
+                io = None
+        self.fill(start_cmd)
+        return io
+
+    def check(self):
+        """Stop the most recently started standby servers while over the memory cap."""
+        now = time.time()
+        if not self.enabled or not self._max_bytes or now - self._last_check < CHECK_INTERVAL:
+            return
+        self._last_check = now
+        while self._started and self.memory() > self._max_bytes:
+            key, io = self._started.pop()
+            self._standby[key].remove(io)
+            log.info("Stopping standby server pid %s, over the memory cap", io.pid)
+            io.close()
+
+    def memory(self):
+        """Return total resident memory in bytes of the standby servers."""
+        return sum(rss(io.pid) for servers in self._standby.values() for io in servers)
+
+    def close(self):
+        """Stop all standby servers."""
+        for servers in self._standby.values():
+            for io in servers:
+                io.close()
+        self._standby = {}
+        self._started = []
+
+
+def rss(pid):
+    """Return the resident memory of process pid in bytes, 0 if not known."""
+    try:
+        with open("/proc/{}/status".format(pid)) as file_:
+            for line in file_:
+                if line.startswith("VmRSS:"):
+                    # E.g. "VmRSS:     12345 kB"
+                    return int(line.split()[1]) * 1024
+    except (IOError, OSError, ValueError):
+        pass
+    return 0
@@ -0,0 +1,206 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+"""Client side symbol storage."""
+import bisect
+import collections
+import logging
+
+import vimliq.fuzzy as fuzzy
+import vimliq.lsp as P
+
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+DEFAULT_MAX_DOCUMENTS = 100
+
+
+class WorkspaceSymbolIndex(object):
+    """Local index of a workspace/symbol result.
+
+    The server is asked once for a query prefix. Any query starting with that prefix is then
+    answered by fuzzy filtering the stored result.
+    """
+
+    def __init__(self):
+        self._query = None
+        self._symbols = []
+
+    def covers(self, query):
+        """Return True if query can be answered without asking the server."""
+        return self._query is not None and query.lower().startswith(self._query)
+
+    def update(self, query, symbols):
+        """Store the server result for query.
+
+        Args:
+            query(str): Query sent to the server.
+            symbols(list): List of SymbolInformation dicts.
+        """
+        self._query = query.lower()
+        self._symbols = symbols or []
+        log.debug("Indexed %s workspace symbols for %r", len(self._symbols), query)
+
+    def search(self, query, limit):
+        """Return the limit best matching SymbolInformation dicts for query."""
+        return fuzzy.rank(query, self._symbols, key=lambda sym: sym[P.K_NAME], limit=limit)
+
+    def invalidate(self):
+        """Drop the stored result, e.g. since the workspace has changed."""
+        self._query = None
+        self._symbols = []
+
+
+class DocumentSymbols(object):
+    """Symbols of one version of a document.
+
+    Accepts both the flat SymbolInformation list and the hierarchical DocumentSymbol form. The
+    symbols are stored sorted on start position together with the index of the closest
+    enclosing symbol, which makes finding the symbol containing a position a binary search
+    followed by a walk up through the parents.
+    """
+
+    def __init__(self, version, result, stale=False):
+        """Initialize.
+
+        Args:
+            version(int): Document version the result is valid for.
+            result(list): documentSymbol response.
+            stale(bool): True for a result from the persistent cache, not yet confirmed by
+                the server.
+        """
+        self.version = version
+        self.stale = stale
+        entries = []
+        _flatten(result or [], entries)
+        # Sort on start, and let the outer of two symbols starting at the same place go first
+        entries.sort(key=lambda entry: (entry[0], _negate(entry[1])))
+
+        self._starts = []
+        self._ends = []
+        self._names = []
+        self._containers = []
+        self._parents = []
+        stack = []
+        for start, end, name, container in entries:
+            while stack and self._ends[stack[-1]] < end:
+                stack.pop()
+            self._parents.append(stack[-1] if stack else -1)
+            stack.append(len(self._starts))
+            self._starts.append(start)
+            self._ends.append(end)
+            self._names.append(name)
+            self._containers.append(container)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def containing(self, line, char):
+        """Return the full name of the innermost symbol containing the position, or None."""
+        pos = (line, char)
+        idx = bisect.bisect_right(self._starts, pos) - 1
+        while idx >= 0 and self._ends[idx] < pos:
+            idx = self._parents[idx]
+        if idx < 0:
+            return None
+        return self._full_name(idx)
+
+    def qf_content(self, filename, cols=None):
+        """Return symbols as quickfix dicts.
+
+        Args:
+            filename(str): File of the symbols.
+            cols: Optional, object with to_byte(line, character) converting the positions to
+                byte columns, see vimliq.position. Without it characters are used as is.
+        """
+        qf_content = []
+        for idx, start in enumerate(self._starts):
+            col = cols.to_byte(start[0], start[1]) if cols is not None else start[1]
+            qf_content.append({
+                "filename": filename,
+                "lnum": start[0] + 1,
+                "col": col + 1,
+                "text": self._full_name(idx),
+            })
+        return qf_content
+
+    def _full_name(self, idx):
+        names = [self._names[idx]]
+        container = self._containers[idx]
+        parent = self._parents[idx]
+        while parent >= 0 and container is None:
+            names.append(self._names[parent])
+            container = self._containers[parent]
+            parent = self._parents[parent]
+        if container:
+            names.append(container)
+        return ".".join(reversed(names))
+
+
+class DocumentSymbolCache(object):
+    """documentSymbol results per uri, valid for one document version."""
+
+    def __init__(self, max_documents=DEFAULT_MAX_DOCUMENTS):
+        self._max_documents = max_documents
+        self._documents = collections.OrderedDict()
+
+    def get(self, uri, version):
+        """Return DocumentSymbols for uri if cached for version, else None."""
+        symbols = self._documents.get(uri)
+        if symbols is None or symbols.version != version:
+            return None
+        # Mark as most recently used
+        del self._documents[uri]
+        self._documents[uri] = symbols
+        return symbols
+
+    def put(self, uri, version, result, stale=False):
+        """Store a documentSymbol result and return it as DocumentSymbols."""
+        symbols = DocumentSymbols(version, result, stale)
+        self._documents.pop(uri, None)
+        self._documents[uri] = symbols
+        while len(self._documents) > self._max_documents:
+            self._documents.popitem(last=False)
+        return symbols
+
+    def invalidate(self, uri):
+        self._documents.pop(uri, None)
+
+
+def _flatten(result, entries):
+    """Append (start, end, name, container) for all symbols in result to entries.
+
+    container is only set for SymbolInformation, for DocumentSymbol the parent is given by the
+    nesting of the ranges.
+    """
+    for sym in result:
+        container = None
+        if P.K_LOCATION in sym:
+            range_ = sym[P.K_LOCATION][P.K_RANGE]
+            container = sym.get(P.K_CONTAINER_NAME) or None
+        else:
+            range_ = sym[P.K_RANGE]
+        entries.append((_position(range_[P.K_START]), _position(range_[P.K_END]),
+                        sym[P.K_NAME], container))
+        _flatten(sym.get(P.K_CHILDREN, []), entries)
+
+
+def _position(pos):
+    return (pos[P.K_LINE], pos[P.K_CHAR])
+
+
+def _negate(pos):
+    return (-pos[0], -pos[1])
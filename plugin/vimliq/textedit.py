@@ -0,0 +1,200 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+"""Application of TextEdits to buffer lines.
+
+All edits are merged into the new lines of the document first, applied last to first so the
+ranges of the remaining edits stay valid. The new lines are then compared with the old and only
+the line slices that differ are assigned to the buffer. Servers often send the whole formatted
+document as one edit, this way unchanged lines are never touched, which keeps undo, marks, signs
+and folds on them.
+
+The changes made are returned as line based TextDocumentContentChangeEvents, to be sent to the
+server as an incremental didChange. Line ranges starting at character 0 are the same in every
+position encoding.
+"""
+import bisect
+import collections
+import difflib
+
+import vimliq.lsp as P
+import vimliq.position as position
+
+
+def apply(buf, edits, encoding):
+    """Apply TextEdits to buf.
+
+    Args:
+        buf: Vim buffer, or any list like object of lines supporting slice assignment.
+        edits(list): TextEdit dicts, ranges are in the document text of buf.
+        encoding(str): The negotiated position encoding.
+
+    Returns:
+        list: TextDocumentContentChangeEvent dicts for the changes made, in the order they
+            should be sent. Empty if nothing changed.
+    """
+    old = buf[:]
+    new = merge(old, edits, encoding)
+    changes = []
+    # Last to first, so the line numbers of the remaining slices stay valid
+    for start, end, lines in reversed(diff(old, new)):
+        buf[start:end] = lines
+        changes.append({
+            P.K_RANGE: {
+                P.K_START: {P.K_LINE: start, P.K_CHAR: 0},
+                P.K_END: {P.K_LINE: end, P.K_CHAR: 0},
+            },
+            P.K_TEXT: "".join(_decode(line) + "\n" for line in lines),
+        })
+    return changes
+
+
+def merge(lines, edits, encoding):
+    """Return lines with all edits applied, lines is not modified."""
+    lines = list(lines)
+    # Inserts at the same position are applied in reverse too, ending up in the given order
+    ordered = sorted((_position(edit[P.K_RANGE][P.K_START]), idx, edit)
+                     for idx, edit in enumerate(edits))
+    for _, _, edit in reversed(ordered):
+        start = edit[P.K_RANGE][P.K_START]
+        end = edit[P.K_RANGE][P.K_END]
+        start_line = min(start[P.K_LINE], len(lines))
+        end_line = min(end[P.K_LINE], len(lines))
+        # Line len(lines) is the empty "line" after the last newline
+        first = lines[start_line] if start_line < len(lines) else _empty(lines)
+        last = lines[end_line] if end_line < len(lines) else _empty(lines)
+        text = edit[P.K_NEW_TEXT]
+        if isinstance(first, bytes):
+            text = text.encode("utf-8")
+        region = (first[:_index(first, start[P.K_CHAR], encoding)] + text +
+                  last[_index(last, end[P.K_CHAR], encoding):])
+        new_lines = region.split(b"\n" if isinstance(region, bytes) else "\n")
+        if end_line == len(lines) and not new_lines[-1]:
+            # The text still ends with a newline
+            new_lines.pop()
+        lines[start_line:end_line + 1] = new_lines
+    return lines
+
+
+def diff(old, new):
+    """Return (start, end, lines) for the slices of old to replace with lines to get new.
+
+    Lines found exactly once in both old and new are matched first, as in patience diff, and
+    only the gaps between them are compared line by line. Slices are in order and do not
+    overlap.
+    """
+    slices = []
+    old_pos = new_pos = 0
+    for old_idx, new_idx in _anchors(old, new) + [(len(old), len(new))]:
+        _diff_gap(old[old_pos:old_idx], new[new_pos:new_idx], old_pos, slices)
+        old_pos, new_pos = old_idx + 1, new_idx + 1
+    return slices
+
+
+def _diff_gap(old, new, offset, slices):
+    """Append the slices turning old into new, at offset in the whole document, to slices."""
+    # Most lines are usually unchanged, skip the common start and end before diffing
+    prefix = 0
+    limit = min(len(old), len(new))
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    old = old[prefix:len(old) - suffix]
+    new = new[prefix:len(new) - suffix]
+    offset += prefix
+    if not old or not new:
+        if old or new:
+            slices.append((offset, offset + len(old), new))
+        return
+
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            slices.append((offset + i1, offset + i2, new[j1:j2]))
+
+
+def _anchors(old, new):
+    """Return (old index, new index) pairs of lines found once in each, in order in both."""
+    counts = collections.Counter(old)
+    new_index = {}
+    for idx, line in enumerate(new):
+        if counts[line] == 1:
+            # -1 marks lines found more than once in new
+            new_index[line] = -1 if line in new_index else idx
+    pairs = [(idx, new_index[line]) for idx, line in enumerate(old)
+             if new_index.get(line, -1) >= 0]
+    return _longest_increasing(pairs)
+
+
+def _longest_increasing(pairs):
+    """Return the longest subsequence of pairs where the second items increase."""
+    # tails[n] is the smallest last value of an increasing run of length n + 1
+    tails = []
+    tail_idx = []
+    prev = []
+    for idx, (_, value) in enumerate(pairs):
+        pos = bisect.bisect_left(tails, value)
+        if pos == len(tails):
+            tails.append(value)
+            tail_idx.append(idx)
+        else:
+            tails[pos] = value
+            tail_idx[pos] = idx
+        prev.append(tail_idx[pos - 1] if pos else -1)
+    result = []
+    idx = tail_idx[-1] if tail_idx else -1
+    while idx >= 0:
+        result.append(pairs[idx])
+        idx = prev[idx]
+    result.reverse()
+    return result
+
+
+def _index(text, character, encoding):
+    """Return the index in text of the LSP character offset, bytes are indexed by byte."""
+    if isinstance(text, bytes):
+        return min(position.to_byte(text, character, encoding), len(text))
+    if encoding == position.UTF32:
+        return min(character, len(text))
+    encoded = text.encode("utf-8")
+    if len(encoded) == len(text):
+        return min(character, len(text))
+    if encoding == position.UTF8:
+        return len(encoded[:character].decode("utf-8", "ignore"))
+    units = 0
+    for idx, char in enumerate(text):
+        if units >= character:
+            return idx
+        # Characters outside the BMP are two UTF-16 code units
+        units += 2 if ord(char) > 0xFFFF else 1
+    return len(text)
+
+
+def _empty(lines):
+    return b"" if lines and isinstance(lines[0], bytes) else ""
+
+
+def _decode(line):
+    if isinstance(line, bytes):
+        return line.decode("utf-8", "replace")
+    return line
+
+
+def _position(pos):
+    return (pos[P.K_LINE], pos[P.K_CHAR])
@@ -14,14 +14,23 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+import collections
 import json
 import logging
+import re
 
 import vim
 
 log = logging.getLogger(__name__)
 log.addHandler(logging.NullHandler())
 
+MAX_SNAPSHOTS = 16
+# matchaddpos() takes at most 8 positions before vim 9.0.0620
+MATCH_POSITIONS = 8
+
+# Buffer text per buffer number, see _snapshot
+_snapshots = collections.OrderedDict()
+
 
 # Vim commands
 def current_file():
@@ -29,13 +38,116 @@ def current_file():
 
 
 def current_source():
-    return "{}\n".format("\n".join(vim.current.buffer))
+    """Return the text of the current buffer.
+
+    The text is only joined again if the buffer has changed since last call.
+    """
+    return source(vim.current.buffer)
+
+
+def current_source_bytes():
+    """Return the text of the current buffer as UTF-8 encoded bytes."""
+    return source_bytes(vim.current.buffer)
+
+
+def source(buf):
+    """Return the text of vim buffer buf, see current_source."""
+    return _snapshot(buf)[1]
+
+
+def source_bytes(buf):
+    """Return the text of vim buffer buf as UTF-8 encoded bytes."""
+    snapshot = _snapshot(buf)
+    if snapshot[2] is None:
+        snapshot[2] = encoded(snapshot[1])
+    return snapshot[2]
+
+
+def forget_source(bufnr):
+    """Drop the cached text of buffer bufnr."""
+    _snapshots.pop(bufnr, None)
+
+
+def _snapshot(buf):
+    """Return [changedtick, text, encoded text or None] for buf.
+
+    Snapshots are cached per buffer and reused as long as b:changedtick is unchanged.
+    """
+    tick = vim.eval("getbufvar({}, 'changedtick')".format(buf.number))
+    snapshot = _snapshots.pop(buf.number, None)
+    if snapshot is None or snapshot[0] != tick:
+        snapshot = [tick, "{}\n".format("\n".join(buf)), None]
+    _snapshots[buf.number] = snapshot
+    while len(_snapshots) > MAX_SNAPSHOTS:
+        _snapshots.popitem(last=False)
+    return snapshot
+
+
+def encoded(text):
+    """Return text as UTF-8 encoded bytes. Vim lines are bytes in python 2 but not in 3."""
+    if isinstance(text, bytes):
+        return text
+    return text.encode("utf-8")
+
+
+def decoded(text):
+    """Return text as a unicode string, see encoded."""
+    if isinstance(text, bytes):
+        return text.decode("utf-8", "replace")
+    return text
 
 
 def filetype():
     return vim.eval("&filetype")
 
 
+def bufnr(filename):
+    """Return buffer number of filename, -1 if there is no such buffer."""
+    return int(vim.eval("bufnr('{}')".format(vimstr(filename))))
+
+
+def changedtick():
+    """Return b:changedtick of the current buffer."""
+    return int(vim.eval("b:changedtick"))
+
+
+def buffer_changedtick(buf):
+    """Return b:changedtick of vim buffer buf."""
+    return int(vim.eval("getbufvar({}, 'changedtick')".format(buf.number)))
+
+
+def buffer_filetype(buf):
+    """Return &filetype of vim buffer buf."""
+    return vim.eval("getbufvar({}, '&filetype')".format(buf.number))
+
+
+def loaded_buffers():
+    """Return dict with buffer name as key and vim buffer as value for loaded buffers."""
+    buffers = {}
+    for buf in vim.buffers:
+        if buf.name and vim.eval("bufloaded({})".format(buf.number)) == "1":
+            buffers[buf.name] = buf
+    return buffers
+
+
+def shiftwidth():
+    """Return the indent width of the current buffer."""
+    return int(vim.eval("shiftwidth()"))
+
+
+def expandtab():
+    return vim.eval("&expandtab") == "1"
+
+
+def line_before_cursor():
+    """Return the text of the current line before the cursor."""
+    return vim.eval("strpart(getline('.'), 0, col('.') - 1)")
+
+
+def in_insert_mode():
+    return vim.eval("mode()") == "i"
+
+
 def cursor():
     """Return row, col zero based."""
     row, col = vim.current.window.cursor
@@ -44,6 +156,32 @@ def cursor():
     return (row - 1, col)
 
 
+def getchar():
+    """Wait for a key press and return it.
+
+    Backspace is returned as "\\x08" and other special keys as "".
+    """
+    vim.command("let lsp_char = getchar()")
+    return vim.eval(
+        'type(lsp_char) == type(0) ? nr2char(lsp_char) : '
+        '(lsp_char ==# "\\<BS>" ? "\\<C-h>" : "")')
+
+
+def word_range():
+    """Return (row, start, end) of the word under the cursor, None if not on a word.
+
+    row is zero based and start, end are zero based byte columns, end exclusive.
+    """
+    row, col = cursor()
+    line = encoded(vim.current.line)
+    for match in re.finditer(br"\w+", line):
+        if match.start() <= col < match.end():
+            return (row, match.start(), match.end())
+        if match.start() > col:
+            break
+    return None
+
+
 def vim_command(cmd):
     """Run cmd and return output."""
     vim.command("redir => lsp_cmd_var")
@@ -79,6 +217,120 @@ def warning(msg):
     vim.command("let &showcmd = {}".format(old_showcmd))
 
 
+def echo_highlighted(chunks):
+    """Echo (text, highlight group or None) chunks on one line, cut to fit. [] clears."""
+    # Leave room for the mode message, e.g. "-- INSERT --"
+    width = int(vim.eval("&columns")) - 15
+    cmds = ["echo ''"]
+    for text, group in chunks:
+        text = text[:max(width, 0)]
+        width -= len(text)
+        cmds.append("echohl {}".format(group or "None"))
+        cmds.append("echon '{}'".format(vimstr(text)))
+    cmds.append("echohl None")
+    vim.command(" | ".join(cmds))
+
+
+def selected_completion_data():
+    """Return "user_data" of the selected item in the completion popup, or ""."""
+    return _selected_completion_field("user_data")
+
+
+def _selected_completion_field(name):
+    return vim.eval(
+        "pumvisible() && complete_info(['selected']).selected >= 0 ? "
+        "get(complete_info(['items', 'selected']).items[complete_info(['selected']).selected], "
+        "'{}', '') : ''".format(name))
+
+
+def use_lazy_completion_info():
+    """Keep the info popup of the completion menu hidden until show_completion_info.
+
+    Only done if vim has popup support, for the current buffer.
+    """
+    if vim.eval("exists('*popup_findinfo')") == "1":
+        vim.command("setlocal completeopt-=popup completeopt+=popuphidden")
+
+
+def show_completion_popup():
+    """Show the info popup of the completion menu if the selected item has "info"."""
+    popup = vim.eval("exists('*popup_findinfo') ? popup_findinfo() : 0")
+    if popup != "0" and _selected_completion_field("info"):
+        vim.command("call popup_show({})".format(popup))
+
+
+def show_completion_info(text):
+    """Show text in the info popup of the completion menu.
+
+    Requires vim with popup support and "popuphidden" in 'completeopt', see
+    use_lazy_completion_info.
+    """
+    popup = vim.eval("exists('*popup_findinfo') ? popup_findinfo() : 0")
+    if popup == "0":
+        return
+    if not text:
+        vim.command("call popup_hide({})".format(popup))
+        return
+    lines = json.dumps(text.split("\n"))
+    vim.command("call popup_settext({}, {})".format(popup, lines))
+    vim.command("call popup_show({})".format(popup))
+
+
+def buffer_windows(bufnr=None):
+    """Return window ids of all windows showing buffer bufnr, default current buffer."""
+    if bufnr is None:
+        bufnr = vim.current.buffer.number
+    return [int(winid) for winid in vim.eval("win_findbuf({})".format(bufnr))]
+
+
+def visible_ranges(bufnr):
+    """Return (top, bottom) one based line ranges shown of buffer bufnr, one per window."""
+    ranges = []
+    for info in vim.eval("getwininfo()"):
+        if int(info["bufnr"]) == bufnr:
+            ranges.append((int(info["topline"]), int(info["botline"])))
+    return ranges
+
+
+def placed_sign_ids(filename):
+    """Return set of the ids of signs placed in filename."""
+    placed = vim_command("sign place file={}".format(filename))
+    return set(int(id_) for id_ in re.findall(r"id=(\d+)", placed))
+
+
+def place_sign(id_, line, name, filename):
+    vim.command("sign place {} line={} name={} file={}".format(id_, line, name, filename))
+
+
+def match_add_pos(group, positions, winid):
+    """Highlight positions in window winid, one matchaddpos() call per MATCH_POSITIONS.
+
+    Args:
+        group(str): Highlight group.
+        positions(list): [line, col, length] lists, one based byte columns.
+        winid(int): Window id.
+
+    Returns:
+        list: Match ids.
+    """
+    match_ids = []
+    for idx in range(0, len(positions), MATCH_POSITIONS):
+        chunk = positions[idx:idx + MATCH_POSITIONS]
+        match_ids.append(int(vim.eval("matchaddpos('{}', {}, 0, -1, {{'window': {}}})".format(
+            group, json.dumps(chunk, separators=(",", ":")), winid))))
+    return match_ids
+
+
+def window_match(winid, name):
+    """Return the match id stored in window variable name of window winid, -1 if not set."""
+    return int(vim.eval("getwinvar({}, '{}', -1)".format(winid, name)))
+
+
+def match_delete(match_id, winid):
+    """Delete match match_id in window winid, ignoring already deleted matches."""
+    vim.command("silent! call matchdelete({}, {})".format(match_id, winid))
+
+
 def clear_quickfix():
     vim.eval("setqflist([], 'r')")
 
@@ -88,7 +340,6 @@ def clear_signs(filename):
 
 
 def display_preview(text):
-    # Function is unused but kept for future use
     prev_window = vim.eval("win_getid()")
     # Create new window
     # TODO: do not hardcode height
@@ -98,18 +349,54 @@ def display_preview(text):
     vim.command("setlocal bufhidden=delete")
     vim.command("setlocal noswapfile")
     new_buf = vim.current.buffer
-    if new_buf:
+    if len(new_buf) > 1 or new_buf[0]:
         # Buffer not empty something has gone wrong
         log.debug("Newly created buffer not empty. %s", new_buf)
     else:
-        new_buf = text.split("\n")
+        new_buf[:] = text.split("\n")
     vim.eval("win_gotoid({})".format(prev_window))
 
 
+def display_popup(text):
+    """Display text in a popup at the cursor, or in a preview window if popups are missing."""
+    if vim.eval("exists('*popup_atcursor')") != "1":
+        display_preview(text)
+        return
+    lines = json.dumps(text.split("\n"))
+    vim.eval("popup_atcursor({}, {{'moved': 'any', 'padding': [0, 1, 0, 1]}})".format(lines))
+
+
 def display_quickfix(qf_content):
     # Vim list/dict just so happen to map to a json string
     cmd = "setqflist({})".format(json.dumps(qf_content, separators=(",", ":")))
     log.debug(cmd)
     vim.eval(cmd)
+    open_quickfix()
+
+
+def set_quickfix(qf_content, action=" ", qf_id=None, title=None):
+    """Set quickfix items using setqflist([], action, what).
+
+    Args:
+        qf_content(list): List of quickfix dicts.
+        action(str): setqflist action. " " creates a new list, "a" appends to qf_id.
+        qf_id(int): Id of the list to modify.
+        title(str): Title of the list.
+    """
+    what = {"items": qf_content}
+    if qf_id is not None:
+        what["id"] = qf_id
+    if title is not None:
+        what["title"] = title
+    # Vim list/dict just so happen to map to a json string
+    vim.eval("setqflist([], '{}', {})".format(action, json.dumps(what, separators=(",", ":"))))
+
+
+def quickfix_id():
+    """Return the id of the current quickfix list."""
+    return int(vim.eval("getqflist({'id': 0}).id"))
+
+
+def open_quickfix():
     # TODO: To not hard code height of quickfix window
     vim.command("rightbelow copen 5")
@@ -0,0 +1,185 @@
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+"""WorkspaceEdit helpers.
+
+Files loaded in vim are edited in their buffers with vimliq.textedit. Other files are rewritten
+on disk here, without loading them in vim. A file is streamed line by line to a temporary file
+next to it, only the lines touched by edits are changed, and the temporary file then replaces
+the original.
+"""
+import collections
+import logging
+import os
+import shutil
+import tempfile
+
+import vimliq.lsp as P
+import vimliq.textedit as textedit
+
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+# os.replace is missing in python 2, where rename replaces the target on posix
+_replace = getattr(os, "replace", os.rename)
+
+
+def file_edits(workspace_edit):
+    """Return the TextEdits of workspace_edit per document.
+
+    Returns:
+        tuple: (OrderedDict of uri -> list of TextEdit dicts, dict of uri -> version). The
+            version is only given for documentChanges, and may be None.
+    """
+    edits = collections.OrderedDict()
+    versions = {}
+    for change in workspace_edit.get(P.K_DOCUMENT_CHANGES) or []:
+        if P.K_KIND in change:
+            log.warning("Resource operation %s is not supported, skipped", change[P.K_KIND])
+            continue
+        uri = change[P.K_TD][P.K_URI]
+        edits.setdefault(uri, []).extend(change[P.K_EDITS])
+        versions[uri] = change[P.K_TD].get(P.K_VERSION)
+    if not edits:
+        for uri, text_edits in (workspace_edit.get(P.K_CHANGES) or {}).items():
+            edits[uri] = list(text_edits)
+    return edits, versions
+
+
+def rewrite_file(path, edits, encoding):
+    """Apply TextEdits to the file at path on disk.
+
+    Args:
+        path(str): File to change.
+        edits(list): TextEdit dicts.
+        encoding(str): The negotiated position encoding.
+    """
+    groups = _line_groups(edits)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".liq-")
+    try:
+        # Owns fd from here, also if opening path fails
+        with os.fdopen(fd, "wb") as dst, open(path, "rb") as src:
+            _stream(src, dst, groups, encoding)
+        shutil.copymode(path, tmp_path)
+        _replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def locations(uri, edits):
+    """Return Location dicts for where edits start in the edited document."""
+    result = []
+    line_delta = 0
+    # Shift of characters after the end of the previous edit, on its last line
+    char_delta = 0
+    prev_end_line = -1
+    ordered = sorted((_position(edit[P.K_RANGE][P.K_START]), idx, edit)
+                     for idx, edit in enumerate(edits))
+    for (line, char), _, edit in ordered:
+        if line == prev_end_line:
+            char += char_delta
+        result.append({
+            P.K_URI: uri,
+            P.K_RANGE: {
+                P.K_START: {P.K_LINE: line + line_delta, P.K_CHAR: char},
+                P.K_END: {P.K_LINE: line + line_delta, P.K_CHAR: char},
+            },
+        })
+        end = edit[P.K_RANGE][P.K_END]
+        parts = edit[P.K_NEW_TEXT].split("\n")
+        new_end_char = len(parts[-1]) + (char if len(parts) == 1 else 0)
+        char_delta = new_end_char - end[P.K_CHAR]
+        prev_end_line = end[P.K_LINE]
+        line_delta += len(parts) - 1 - (end[P.K_LINE] - line)
+    return result
+
+
+def _line_groups(edits):
+    """Return [first line, last line, edits] for edits touching the same lines, in order.
+
+    The ranges of the edits in a group are made relative to its first line.
+    """
+    groups = []
+    ordered = sorted((_position(edit[P.K_RANGE][P.K_START]), idx, edit)
+                     for idx, edit in enumerate(edits))
+    for (start_line, _), _, edit in ordered:
+        end_line = edit[P.K_RANGE][P.K_END][P.K_LINE]
+        if groups and start_line <= groups[-1][1]:
+            group = groups[-1]
+            group[1] = max(group[1], end_line)
+        else:
+            group = [start_line, end_line, []]
+            groups.append(group)
+        group[2].append(edit)
+    for group in groups:
+        group[2] = [_shifted(edit, -group[0]) for edit in group[2]]
+    return groups
+
+
+def _stream(src, dst, groups, encoding):
+    """Copy lines from src to dst, replacing the lines of each group with the edited lines."""
+    groups = iter(groups)
+    group = next(groups, None)
+    pending = []
+    for lnum, line in enumerate(src):
+        if group is None or lnum < group[0]:
+            dst.write(line)
+            continue
+        pending.append(line)
+        if lnum == group[1]:
+            dst.write(_merge(pending, group[2], encoding))
+            pending = []
+            group = next(groups, None)
+    # Edits at or after the end of the file
+    while group is not None:
+        dst.write(_merge(pending, group[2], encoding))
+        pending = []
+        group = next(groups, None)
+
+
+def _merge(raw_lines, edits, encoding):
+    """Return raw_lines, with line endings, with edits applied as bytes."""
+    newline = b"\r\n" if raw_lines and raw_lines[0].endswith(b"\r\n") else b"\n"
+    ends_with_newline = not raw_lines or raw_lines[-1].endswith(b"\n")
+    lines = [line.rstrip(b"\r\n") for line in raw_lines]
+    new_lines = [_encoded(line) for line in textedit.merge(lines, edits, encoding)]
+    text = newline.join(new_lines)
+    if new_lines and ends_with_newline:
+        text += newline
+    return text
+
+
+def _shifted(edit, lines):
+    """Return a copy of edit with its range moved lines lines."""
+    range_ = edit[P.K_RANGE]
+    return {
+        P.K_RANGE: {
+            P.K_START: {P.K_LINE: range_[P.K_START][P.K_LINE] + lines,
+                        P.K_CHAR: range_[P.K_START][P.K_CHAR]},
+            P.K_END: {P.K_LINE: range_[P.K_END][P.K_LINE] + lines,
+                      P.K_CHAR: range_[P.K_END][P.K_CHAR]},
+        },
+        P.K_NEW_TEXT: edit[P.K_NEW_TEXT],
+    }
+
+
+def _encoded(text):
+    return text if isinstance(text, bytes) else text.encode("utf-8")
+
+
+def _position(pos):
+    return (pos[P.K_LINE], pos[P.K_CHAR])
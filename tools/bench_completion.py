@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+"""Benchmark completion ranking on large synthetic completion lists.
+
+Compares converting every item to vim data (the behavior before ranking was added) with ranking
+the items against a typed prefix and converting only the best ones.
+
+Example::
+
+    tools/bench_completion.py --sizes 10000 50000 --limit 200
+"""
+
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../plugin"))
+
+import vimliq.completion  # noqa: E402  pylint: disable=wrong-import-position
+
+PREFIXES = ["", "g", "get", "gv", "xyzzy"]
+
+
+def make_items(count, seed=0):
+    """Create count CompletionItem dicts with identifier like labels."""
+    rand = random.Random(seed)
+    words = ["get", "set", "value", "item", "list", "array", "to", "from", "numpy", "data",
+             "frame", "index", "load", "save", "mean", "sum", "max", "min", "shape", "type"]
+    items = []
+    for idx in range(count):
+        parts = rand.sample(words, rand.randint(1, 3))
+        if rand.random() < 0.5:
+            label = "_".join(parts)
+        else:
+            label = parts[0] + "".join(part.title() for part in parts[1:])
+        label += rand.choice(["", "".join(rand.choice(string.ascii_lowercase) for _ in range(2))])
+        items.append({
+            "label": label,
+            "kind": rand.randint(1, 25),
+            "detail": "{}(self, *args)".format(label),
+            "sortText": "{:06d}".format(idx),
+        })
+    return items
+
+
+def convert(items):
+    """Convert items to the json string handed to vim."""
+    return json.dumps([{"word": item["label"], "menu": item["detail"]} for item in items],
+                      separators=(",", ":"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 20000, 50000])
+    parser.add_argument("--limit", type=int, default=vimliq.completion.DEFAULT_LIMIT)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print("{:>8} {:>8} {:>14} {:>14}".format("items", "prefix", "convert all", "rank+convert"))
+    for size in args.sizes:
+        items = make_items(size)
+        for prefix in PREFIXES:
+            all_time = min(timeit.repeat(lambda: convert(items), number=1, repeat=args.repeat))
+            rank_time = min(timeit.repeat(
+                lambda: convert(vimliq.completion.rank(items, prefix, args.limit)),
+                number=1, repeat=args.repeat))
+            print("{:>8} {:>8} {:>12.1f}ms {:>12.1f}ms".format(
+                size, repr(prefix), all_time * 1000, rank_time * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# Copyright 2017 Kristopher Heijari
+#
+# This file is part of vim-liq.
+#
+# vim-liq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# vim-liq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
+"""Benchmark reading from many servers, thread per client against the single I/O loop.
+
+Fake servers are started as subprocesses of this script. Each replies to every request with
+its params as result, followed by a diagnostics notification, like a chatty server would. The
+time is measured from sending the first request until all replies and notifications from all
+servers have been received. The CPU time used by this process, i.e. the client side, is
+reported too since the wall time mostly depends on how fast the fake servers are.
+
+Example::
+
+    tools/bench_io.py --servers 1 4 16 --requests 2000
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../plugin"))
+
+# pylint: disable=wrong-import-position
+import vimliq.base  # noqa: E402
+import vimliq.ioloop  # noqa: E402
+import vimliq.jsonrpc  # noqa: E402
+
+
+def serve():
+    """Fake server, reply to requests on stdin until EOF."""
+    class Pipes(object):
+        read = sys.stdin.buffer.read
+        readline = sys.stdin.buffer.readline
+        write = sys.stdout.buffer.write
+        flush = sys.stdout.buffer.flush
+
+    base = vimliq.base.LspBase(Pipes())
+    while True:
+        try:
+            msg = json.loads(base.recv())
+        except vimliq.base.ServerDead:
+            return
+        base.send_many([
+            json.dumps({"jsonrpc": "2.0", "id": msg["id"], "result": msg["params"]}),
+            json.dumps({"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics",
+                        "params": {"uri": "file:///fake.py", "diagnostics": []}}),
+        ])
+
+
+def cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run(mode, servers, requests):
+    """Return (wall, cpu) seconds until all replies from all servers have been received."""
+    loop = vimliq.ioloop.IOLoop() if mode == "loop" else None
+    procs = []
+    rpcs = []
+    remaining = [servers * requests * 2]
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def received(result, exception):
+        with lock:
+            remaining[0] -= 1
+            if not remaining[0]:
+                done.set()
+
+    for _ in range(servers):
+        io = vimliq.base.StdIO([sys.executable, os.path.abspath(__file__), "--serve"])
+        io.connect()
+        procs.append(io)
+        if loop:
+            transport = loop.connection(io.reader_fileno(), io.writer_fileno())
+        else:
+            transport = vimliq.base.LspBase(io)
+        rpc = vimliq.jsonrpc.JsonRpc(transport)
+        rpc.register_notification_handler("textDocument/publishDiagnostics", received)
+        rpcs.append(rpc)
+
+    params = {"textDocument": {"uri": "file:///fake.py"}, "position": {"line": 1, "character": 2}}
+    start = time.time()
+    start_cpu = cpu_time()
+    for _ in range(requests):
+        for rpc in rpcs:
+            rpc.call_async("textDocument/hover", params, callback=received)
+    if not done.wait(120):
+        raise RuntimeError("Timeout, {} messages missing".format(remaining[0]))
+    elapsed = (time.time() - start, cpu_time() - start_cpu)
+    for io in procs:
+        io.close()
+    return elapsed
+
+
+def main():
+    if "--serve" in sys.argv:
+        serve()
+        return
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--servers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("{:>8} {:>10} {:>8} {:>12} {:>12}".format(
+        "servers", "messages", "mode", "wall", "client cpu"))
+    for servers in args.servers:
+        for mode in ("thread", "loop"):
+            wall, cpu = min(run(mode, servers, args.requests) for _ in range(args.repeat))
+            print("{:>8} {:>10} {:>8} {:>10.1f}ms {:>10.1f}ms".format(
+                servers, servers * args.requests * 2, mode, wall * 1000, cpu * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -15,21 +15,34 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with vim-liq.  If not, see <http://www.gnu.org/licenses/>.
-"""Install the palantir python lsp server.  """
+"""Install the palantir python lsp server.
+
+The server is installed for both python 2 and 3 and its modules are compiled to bytecode for
+both at install time, so server starts never compile or write .pyc files. The launcher has the
+site-packages paths resolved at install time. The cold start time of the server, until it has
+replied to initialize, is measured at the end.
+"""
 
 import argparse
+import glob
+import json
 import logging
 import os
 import shutil
 import subprocess
 import sys
 import tempfile
+import time
 try:
     from urllib import urlretrieve as http_download
 except ImportError:
     from urllib.request import urlretrieve as http_download
 import zipfile
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../plugin"))
+
+import vimliq.base  # noqa: E402  pylint: disable=wrong-import-position
+
 log = logging.getLogger(__name__)
 log.addHandler(logging.NullHandler())
 
@@ -41,32 +54,101 @@ DEFAULT_TARGET_DIR = os.path.join(
     os.path.dirname(os.path.abspath(__file__)), "../plugin/servers/python/")
 
 
+# (python, pip) per major version
+INTERPRETERS = {
+    2: ("python2.7", "pip2.7"),
+    3: ("python3", "pip3"),
+}
+
 BACKPORTS_INIT = "__path__ = __import__('pkgutil').extend_path(__path__, __name__)\n"
 
+# The site-packages paths, relative to the launcher, are filled in at install time
 PYLS_MAIN = """#!/usr/bin/env python
-import glob
 import os
-import re
 import sys
 
-f_path = os.path.dirname(os.path.abspath(__file__))
-
-if sys.version_info[0] >= 3:
-    sitepack = glob.glob(os.path.join(f_path, "lib/python3.[0-9]/site-packages"))[0]
-else:
-    sitepack = os.path.join(f_path, "lib/python2.7/site-packages")
+SITE_PACKAGES = {site_packages!r}
 
-sys.path.insert(0, sitepack)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                SITE_PACKAGES[sys.version_info[0]]))
 
 from pyls.__main__ import main
 
 if __name__ == '__main__':
-    sys.argv[0] = re.sub(r'(-script\.pyw?|\.exe)?$', '', sys.argv[0])
     sys.exit(main())
 """
 
-
-def install(dest_dir, zipapp=False):
+COLD_START_RUNS = 3
+
+
+def site_packages(install_dir):
+    """Return dict with major version as key and site-packages, relative to install_dir."""
+    paths = {}
+    for version in INTERPRETERS:
+        pattern = "lib/python{}.*/site-packages".format(version)
+        found = glob.glob(os.path.join(install_dir, pattern))
+        if found:
+            paths[version] = os.path.relpath(found[0], install_dir)
+    return paths
+
+
+def precompile(install_dir, paths, legacy):
+    """Compile all modules to bytecode for the interpreter of each site-packages.
+
+    Args:
+        install_dir(str): Install directory.
+        paths(dict): See site_packages.
+        legacy(bool): Write python 3 .pyc files next to the sources instead of in
+            __pycache__. Needed for a zipapp, since zipimport only looks for them there.
+    """
+    for version, path in sorted(paths.items()):
+        python = INTERPRETERS[version][0]
+        cmd = [python, "-m", "compileall", "-q"]
+        if version >= 3:
+            cmd += ["-j", "0"]
+            if legacy:
+                cmd.append("-b")
+        log.debug("Compiling %s", path)
+        # Some packages ship files that do not compile, e.g. python 3 only test data, they
+        # are just left uncompiled
+        if subprocess.call(cmd + [os.path.join(install_dir, path)]) != 0:
+            log.warning("Not all modules in %s could be compiled", path)
+
+
+def measure_cold_start(cmd, runs=COLD_START_RUNS):
+    """Return best of runs seconds from starting the server until it replied to initialize."""
+    times = []
+    initialize = json.dumps({
+        "jsonrpc": "2.0", "id": 1, "method": "initialize",
+        "params": {"processId": os.getpid(), "rootUri": None, "capabilities": {}},
+    })
+    for _ in range(runs):
+        io = vimliq.base.StdIO(cmd)
+        start = time.time()
+        io.connect()
+        try:
+            base = vimliq.base.LspBase(io)
+            base.send(initialize)
+            base.recv()
+            times.append(time.time() - start)
+        finally:
+            io.close()
+    return min(times)
+
+
+def report_cold_start(path, versions):
+    """Log the cold start time with each interpreter."""
+    for version in sorted(versions):
+        python = INTERPRETERS[version][0]
+        try:
+            seconds = measure_cold_start([python, path])
+        except (OSError, vimliq.base.ServerDead) as exc:
+            log.warning("Could not start the server with %s: %s", python, exc)
+            continue
+        log.info("Cold start with %s: %.0f ms", python, seconds * 1000)
+
+
+def install(dest_dir, zipapp=False, compile_=True, timing=True):
     """Install python lsp server from palantir."""
 
     tempdir = tempfile.mkdtemp()
@@ -82,14 +164,12 @@ def install(dest_dir, zipapp=False):
             unzipit.extractall(path=tempdir)
 
         extras = "[rope,yapf,mccabe,pyflakes,pycodestyle,pydocstyle]"
-        # install for py2
-        subprocess.check_call(
-            ["pip2.7", "install", "--no-compile", "--prefix", install_dir, "--ignore-installed",
-             "--upgrade", os.path.join(tempdir, UNZIPPED_NAME) + extras])
-        # install for py3
-        subprocess.check_call(
-            ["pip3", "install", "--no-compile", "--prefix", install_dir, "--ignore-installed",
-             "--upgrade", os.path.join(tempdir, UNZIPPED_NAME) + extras])
+        # Compiled separately below, pip can not write the legacy layout needed for zipapps
+        for _, pip in sorted(INTERPRETERS.values()):
+            subprocess.check_call(
+                [pip, "install", "--no-compile", "--prefix", install_dir, "--ignore-installed",
+                 "--upgrade", os.path.join(tempdir, UNZIPPED_NAME) + extras])
+        paths = site_packages(install_dir)
 
         # We need to create this init file since the import for configparser for python2
         # otherwise fails. Since the pth file in site-packages is not read. Note that adding the
@@ -103,17 +183,25 @@ def install(dest_dir, zipapp=False):
             file_.write(BACKPORTS_INIT)
 
         with open(pyls_main, "w") as file_:
-            file_.write(PYLS_MAIN)
+            file_.write(PYLS_MAIN.format(site_packages=paths))
+
+        if compile_:
+            precompile(install_dir, paths, legacy=zipapp)
 
         if zipapp:
+            target = os.path.join(dest_dir, "pyls.pyz")
             subprocess.check_call(
-                ["python3", "-m", "zipapp", "-o", os.path.join(dest_dir, pylz.pyz),
-                 "-p", "/usr/bin/env python", install_dir])
+                ["python3", "-m", "zipapp", "-o", target, "-p", "/usr/bin/env python",
+                 install_dir])
         else:
-            pyls_dir = os.path.join(dest_dir, "pyls")
-            if os.path.exists(pyls_dir):
-                shutil.rmtree(pyls_dir)
-            shutil.copytree(install_dir, pyls_dir)
+            target = os.path.join(dest_dir, "pyls")
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            shutil.copytree(install_dir, target)
+        log.info("Installed %s", target)
+
+        if timing:
+            report_cold_start(target, paths)
 
     finally:
         # Always delete tempdir after finishing
@@ -124,13 +212,17 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--zipapp", action="store_true", help="Create a zipapp")
     parser.add_argument("--target", help="Target directory.", default=DEFAULT_TARGET_DIR)
+    parser.add_argument("--no-compile", action="store_true",
+                        help="Do not compile the modules to bytecode")
+    parser.add_argument("--no-timing", action="store_true",
+                        help="Do not measure the cold start time")
     args = parser.parse_args()
     log.setLevel(logging.DEBUG)
     handler = logging.StreamHandler(stream=sys.stdout)
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     handler.setFormatter(formatter)
     log.addHandler(handler)
-    install(args.target, args.zipapp)
+    install(args.target, args.zipapp, not args.no_compile, not args.no_timing)
 
 if __name__ == "__main__":
     main()